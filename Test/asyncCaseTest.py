@@ -0,0 +1,79 @@
+import unittest
+
+from harness.asyncCase import AsyncCRMTestCase, run_concurrently
+from harness.logConfig import configure_logging
+
+# Configure logging
+configure_logging()
+
+
+class RunConcurrentlyCleanupTestCase(unittest.TestCase):
+    """run_concurrently() runs addCleanup and addAsyncCleanup callbacks as unittest does."""
+
+    def run_case(self, case, *names):
+        suite = unittest.TestSuite(case(name) for name in names)
+        return run_concurrently(suite)
+
+    def test_cleanups_run_last_registered_first_after_teardown(self):
+        calls = []
+
+        class Case(AsyncCRMTestCase):
+            async def asyncSetUp(self):
+                await super().asyncSetUp()
+                self.addCleanup(calls.append, "sync")
+
+                async def async_cleanup(label):
+                    calls.append(label)
+
+                self.addAsyncCleanup(async_cleanup, "async")
+
+            async def asyncTearDown(self):
+                calls.append("teardown")
+                await super().asyncTearDown()
+
+            async def test_passes(self):
+                calls.append("test")
+
+        result = self.run_case(Case, "test_passes")
+        self.assertTrue(result.wasSuccessful())
+        self.assertEqual(calls, ["test", "teardown", "async", "sync"])
+
+    def test_cleanups_run_when_setup_fails(self):
+        calls = []
+
+        class Case(AsyncCRMTestCase):
+            async def asyncSetUp(self):
+                await super().asyncSetUp()
+                self.addCleanup(calls.append, "cleanup")
+                raise RuntimeError("setUp failed")
+
+            async def test_never_runs(self):
+                calls.append("test")
+
+        result = self.run_case(Case, "test_never_runs")
+        self.assertEqual(calls, ["cleanup"])
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn("setUp failed", result.errors[0][1])
+
+    def test_failing_cleanup_is_an_error_and_the_rest_still_run(self):
+        calls = []
+
+        class Case(AsyncCRMTestCase):
+            async def test_registers_cleanups(self):
+                self.addCleanup(calls.append, "first")
+
+                async def broken():
+                    raise RuntimeError("cleanup failed")
+
+                self.addAsyncCleanup(broken)
+
+        result = self.run_case(Case, "test_registers_cleanups")
+        self.assertEqual(calls, ["first"])
+        self.assertEqual(result.testsRun, 1)
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn("cleanup failed", result.errors[0][1])
+        self.assertFalse(result.wasSuccessful())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import logging
+
+from harness.asyncCase import AsyncCRMTestCase, main
+from harness.fixtures import unique
+from harness.logConfig import configure_logging
+
+# Configure logging
+configure_logging()
+
+
+class AsyncCustomerTestCase(AsyncCRMTestCase):
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        # Setup code to create a new customer for testing
+        self.customer_id = await self.create("/customers", {
+            "name": unique("Async Test Customer"),
+            "email": unique("asynctestcustomer@example.com"),
+            "phone": "1234567890"
+        })
+        logging.info("Set up test customer with ID: %s", self.customer_id)
+
+    async def asyncTearDown(self):
+        # Cleanup code to delete the created customer
+        await self.delete("/customers", self.customer_id)
+        logging.info("Cleaned up test customer with ID: %s", self.customer_id)
+        await super().asyncTearDown()
+
+    async def test_get_and_list_customers(self):
+        # The single-customer read and the collection read are independent
+        customer_response, list_response = await self.gather(
+            self.client.get(f"/customers/{self.customer_id}"),
+            self.client.get("/customers"),
+        )
+        self.assertEqual(customer_response.status_code, 200)
+        customer_data = customer_response.json()
+        self.assertEqual(customer_data["name"], unique("Async Test Customer"))
+        self.assertEqual(customer_data["email"], unique("asynctestcustomer@example.com"))
+        self.assertEqual(list_response.status_code, 200)
+        self.assertGreater(len(list_response.json()), 0)
+        logging.debug("Retrieved customer data: %s", customer_data)
+
+    async def test_customer_sub_resources(self):
+        # Interactions, notes and custom fields hang off the same customer but
+        # do not depend on each other, so all three writes go out together
+        interaction_data = {"type": "Email", "content": "Sent product catalog", "date": "2023-10-10"}
+        note_data = {"content": "Customer prefers email communication", "date": "2023-10-15"}
+        custom_field_data = {"field_name": "Preferred Language", "field_value": "English"}
+        responses = await self.gather(
+            self.client.post(f"/customers/{self.customer_id}/interactions", json=interaction_data),
+            self.client.post(f"/customers/{self.customer_id}/notes", json=note_data),
+            self.client.post(f"/customers/{self.customer_id}/custom_fields", json=custom_field_data),
+        )
+        for response in responses:
+            self.assertEqual(response.status_code, 201)
+        logging.info("Added interaction, note and custom field to customer %s", self.customer_id)
+
+        responses = await self.gather(
+            self.client.get(f"/customers/{self.customer_id}/interactions"),
+            self.client.get(f"/customers/{self.customer_id}/notes"),
+            self.client.get(f"/customers/{self.customer_id}/custom_fields"),
+        )
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(len(response.json()), 0)
+        logging.info("Listed sub-resources for customer %s", self.customer_id)
+
+    async def test_delete_customer(self):
+        customer_id = await self.create("/customers", {
+            "name": unique("Async Delete Test Customer"),
+            "email": unique("asyncdeletetestcustomer@example.com"),
+            "phone": "1234567890"
+        })
+        await self.delete("/customers", customer_id)
+
+        response = await self.client.get(f"/customers/{customer_id}")
+        self.assertEqual(response.status_code, 404)
+        logging.info("Verified customer with ID %s no longer exists", customer_id)
+
+
+class AsyncProductManagementTestCase(AsyncCRMTestCase):
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.product_id = await self.create("/products", {
+            "name": unique("Async Test Product"),
+            "description": "This is a test product",
+            "price": 99.99,
+            "stock": 100,
+            "category": "Electronics"
+        })
+        logging.info("Set up test product with ID: %s", self.product_id)
+
+    async def asyncTearDown(self):
+        await self.delete("/products", self.product_id)
+        logging.info("Cleaned up test product with ID: %s", self.product_id)
+        await super().asyncTearDown()
+
+    async def test_get_and_list_products(self):
+        product_response, list_response = await self.gather(
+            self.client.get(f"/products/{self.product_id}"),
+            self.client.get("/products"),
+        )
+        self.assertEqual(product_response.status_code, 200)
+        product_data = product_response.json()
+        self.assertEqual(product_data["name"], unique("Async Test Product"))
+        self.assertEqual(product_data["price"], 99.99)
+        self.assertEqual(list_response.status_code, 200)
+        self.assertGreater(len(list_response.json()), 0)
+        logging.debug("Retrieved product data: %s", product_data)
+
+    async def test_update_product(self):
+        updated_data = {
+            "name": unique("Async Updated Test Product"),
+            "description": "Updated description",
+            "price": 89.99,
+            "stock": 150,
+            "category": "Gadgets"
+        }
+        response = await self.client.put(f"/products/{self.product_id}", json=updated_data)
+        self.assertEqual(response.status_code, 200)
+        logging.debug("Updated product with ID %s to: %s", self.product_id, updated_data)
+
+        response = await self.client.get(f"/products/{self.product_id}")
+        self.assertEqual(response.status_code, 200)
+        product_data = response.json()
+        self.assertEqual(product_data["name"], unique("Async Updated Test Product"))
+        self.assertEqual(product_data["price"], 89.99)
+        logging.debug("Verified updated product data: %s", product_data)
+
+
+class AsyncSalesOpportunityTestCase(AsyncCRMTestCase):
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.customer_id = await self.create("/customers", {
+            "name": unique("Async Test Customer for Sales Opportunity"),
+            "email": unique("asyncsalesopportunity@example.com"),
+            "phone": "1234567890"
+        })
+        logging.info("Set up test customer with ID: %s", self.customer_id)
+
+    async def asyncTearDown(self):
+        await self.delete("/customers", self.customer_id)
+        logging.info("Cleaned up test customer with ID: %s", self.customer_id)
+        await super().asyncTearDown()
+
+    async def test_list_sales_opportunities(self):
+        opportunity_data_1 = {
+            "customer_id": self.customer_id,
+            "title": "First Sales Opportunity",
+            "description": "First deal",
+            "value": 20000,
+            "status": "Open"
+        }
+        opportunity_data_2 = {
+            "customer_id": self.customer_id,
+            "title": "Second Sales Opportunity",
+            "description": "Second deal",
+            "value": 40000,
+            "status": "Open"
+        }
+        opportunity_id_1, opportunity_id_2 = await self.gather(
+            self.create("/opportunities", opportunity_data_1),
+            self.create("/opportunities", opportunity_data_2),
+        )
+
+        # List opportunities
+        response = await self.client.get("/opportunities")
+        self.assertEqual(response.status_code, 200)
+        opportunities = response.json()
+        self.assertGreater(len(opportunities), 0)
+        logging.debug("Listed sales opportunities: %s", opportunities)
+
+        # Cleanup
+        await self.gather(
+            self.delete("/opportunities", opportunity_id_1),
+            self.delete("/opportunities", opportunity_id_2),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import unittest
+
+import requests
+
+from harness.asyncClient import AsyncResponse
+from harness.cache import ResponseCache
+from harness.httpClient import CRMSession, _cached_response
+from harness.logConfig import configure_logging
+from harness.standIn import StandInAdapter, StandInApp
+
+# Configure logging
+configure_logging()
+
+OTHER_URL = "http://cache-crm.local/api"
+
+
+class ResponseCacheStandInTestCase(unittest.TestCase):
+    """GETs of a caching CRMSession answered by a stand-in that counts the calls reaching it."""
+
+    def setUp(self):
+        self.app = StandInApp()
+        self.calls = []
+        handle = self.app.handle
+
+        def counting_handle(method, path, *args, **kwargs):
+            self.calls.append((method, path))
+            return handle(method, path, *args, **kwargs)
+
+        self.app.handle = counting_handle
+        self.session = CRMSession(base_url=OTHER_URL, max_retries=0, cache=True)
+        self.session.auth = None
+        self.session.mount(OTHER_URL, StandInAdapter(self.app))
+        response = self.session.post("/customers", json={"name": "Cached Customer"})
+        self.customer_id = response.json()["id"]
+        self.calls.clear()
+
+    def test_fresh_hit_is_a_requests_response_without_a_call(self):
+        first = self.session.get(f"/customers/{self.customer_id}")
+        second = self.session.get(f"/customers/{self.customer_id}")
+        self.assertEqual(len(self.calls), 1)
+        self.assertIsInstance(second, requests.Response)
+        self.assertTrue(second.ok)
+        second.raise_for_status()
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.headers["etag"], first.headers["ETag"])
+        self.assertEqual(self.session.cache.stats()["hits"], 1)
+
+    def test_stale_entry_is_revalidated_with_its_etag(self):
+        self.session.cache = ResponseCache(ttl=0)
+        first = self.session.get(f"/customers/{self.customer_id}")
+        second = self.session.get(f"/customers/{self.customer_id}")
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()["name"], "Cached Customer")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(self.session.cache.stats()["revalidated"], 1)
+
+    def test_write_drops_the_record_and_its_list(self):
+        self.session.get("/customers")
+        self.session.get(f"/customers/{self.customer_id}")
+        self.session.put(f"/customers/{self.customer_id}", json={"name": "Renamed Customer"})
+        self.assertEqual(self.session.get(f"/customers/{self.customer_id}").json()["name"], "Renamed Customer")
+        self.assertIn("Renamed Customer", [customer["name"] for customer in self.session.get("/customers").json()])
+        self.assertEqual([method for method, _ in self.calls], ["GET", "GET", "PUT", "GET", "GET"])
+
+
+class ResponseCacheTypeTestCase(unittest.TestCase):
+    """One cache shared by the sync and async clients hands each its own response type."""
+
+    def setUp(self):
+        self.cache = ResponseCache(ttl=60)
+        self.url = f"{OTHER_URL}/customers/1"
+        self.body = b'{"id": 1, "name": "Shared Customer"}'
+
+    def store(self, response):
+        self.cache.store(self.cache.key(self.url), response, self.cache.generation)
+
+    def test_entry_stored_by_the_async_client_is_a_requests_response_for_the_session(self):
+        self.store(AsyncResponse(200, {"Content-Length": str(len(self.body)), "ETag": '"v1"'}, self.body, self.url))
+        cached, _ = self.cache.lookup(self.cache.key(self.url), _cached_response)
+        self.assertIsInstance(cached, requests.Response)
+        self.assertTrue(cached.ok)
+        cached.raise_for_status()
+        self.assertEqual(cached.json()["name"], "Shared Customer")
+        self.assertEqual(cached.url, self.url)
+
+    def test_entry_stored_by_the_session_is_an_async_response_for_the_async_client(self):
+        self.store(_cached_response(200, {"Content-Length": str(len(self.body))}, self.body, self.url))
+        cached, _ = self.cache.lookup(self.cache.key(self.url), AsyncResponse)
+        self.assertIsInstance(cached, AsyncResponse)
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.json()["id"], 1)
+
+    def test_hits_do_not_share_mutable_headers(self):
+        self.store(AsyncResponse(200, {"Content-Length": str(len(self.body))}, self.body, self.url))
+        first, _ = self.cache.lookup(self.cache.key(self.url), _cached_response)
+        first.headers["X-Changed"] = "1"
+        second, _ = self.cache.lookup(self.cache.key(self.url), _cached_response)
+        self.assertNotIn("X-Changed", second.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
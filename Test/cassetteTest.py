@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from harness import cassette, codec
+from harness.logConfig import configure_logging
+from harness.runner import ROOT, discover_modules
+
+# Configure logging
+configure_logging()
+
+# Every suite but this one, whose workers create identical session fixtures and customers
+SUITES = [module for module in discover_modules() if module != "Test.cassetteTest"]
+
+
+def record(directory, shard, exchanges):
+    """Write one segment of ``(method, url, request body, status, response body)`` exchanges for ``shard``."""
+    cassette.set_shard(shard)
+    writer = cassette.SegmentWriter(os.path.join(directory, f"{shard}.cas"))
+    try:
+        for method, url, body, status, content in exchanges:
+            writer.append({"key": cassette.request_key(method, url), "seq": cassette.next_sequence(),
+                           "shard": shard, "body": cassette.body_digest(body), "method": method, "url": url,
+                           "status": status, "headers": {}, "elapsed": 0.001}, body or b"", content)
+    finally:
+        writer.close()
+        cassette.set_shard(None)
+
+
+class CassetteSegmentTestCase(unittest.TestCase):
+    """Workers that created records from the same body each replay the IDs they were given."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory(prefix="crm-cassette-")
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        # unique() tags are ignored when matching, so both workers' creates look alike
+        record(self.directory, "a.FirstTestCase", [
+            ("POST", "http://crm/api/customers", b'{"name": "Base-w1"}', 201, b'{"id": 1}'),
+            ("GET", "http://crm/api/customers/1", None, 200, b'{"id": 1, "name": "Base-w1"}'),
+        ])
+        record(self.directory, "b.SecondTestCase", [
+            ("POST", "http://crm/api/customers", b'{"name": "Base-w2"}', 201, b'{"id": 7}'),
+            ("POST", "http://crm/api/orders", b'{"customer_id": 7}', 201, b'{"id": 3}'),
+        ])
+        self.cassette = cassette.Cassette(self.directory)
+
+    def created_id(self):
+        meta, content = self.cassette.lookup("POST", "http://crm/api/customers", b'{"name": "Base-w9"}')
+        self.assertEqual(meta["status"], 201)
+        return codec.loads(content)["id"]
+
+    def test_selected_segment_answers_with_its_own_ids(self):
+        self.cassette.select(os.path.join(self.directory, "b.SecondTestCase.cas"))
+        self.assertEqual(self.created_id(), 7)
+        # Nothing in this segment fetched customer 1
+        self.assertIsNone(self.cassette.lookup("GET", "http://crm/api/customers/1", None))
+
+        self.cassette.select(None)
+        self.assertEqual(self.cassette.lookup("GET", "http://crm/api/customers/1", None)[0]["status"], 200)
+
+    def test_shard_groups_follow_the_recording_workers(self):
+        groups = self.cassette.shard_groups(["b.SecondTestCase", "c.NewTestCase", "a.FirstTestCase"])
+        self.assertEqual(groups, [(os.path.join(self.directory, "a.FirstTestCase.cas"), ["a.FirstTestCase"]),
+                                  (os.path.join(self.directory, "b.SecondTestCase.cas"), ["b.SecondTestCase"]),
+                                  (None, ["c.NewTestCase"])])
+
+    def test_selecting_an_unknown_segment_fails(self):
+        with self.assertRaises(cassette.CassetteError):
+            self.cassette.select(os.path.join(self.directory, "missing.cas"))
+
+
+class CassetteRoundTripTestCase(unittest.TestCase):
+    """A recording of the suites on two workers replays on two workers without a server."""
+
+    def run_suites(self, mode, directory):
+        env = {**os.environ, "CRM_STANDIN": "1" if mode == "record" else "0", "CRM_CASSETTE": directory,
+               "CRM_CASSETTE_MODE": mode, "CRM_JOURNAL": "", "CRM_LATENCY_REPORT": "", "CRM_AUTH": "0"}
+        env.pop("CRM_WORKER_TAG", None)
+        return subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "-j", "2", *SUITES],
+                              cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+
+    def test_record_and_replay_on_two_workers(self):
+        with tempfile.TemporaryDirectory(prefix="crm-cassette-") as directory:
+            recorded = self.run_suites("record", directory)
+            self.assertEqual(recorded.returncode, 0, recorded.stderr)
+            self.assertEqual(len(cassette._segment_paths(directory)), 2)
+            replayed = self.run_suites("replay", directory)
+            self.assertEqual(replayed.returncode, 0, replayed.stderr)
+            self.assertIn("\nOK\n", replayed.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from harness import config, journal
+from harness.httpClient import CRMSession
+from harness.logConfig import configure_logging
+from harness.standIn import StandInAdapter, StandInApp
+
+# Configure logging
+configure_logging()
+
+OTHER_URL = "http://other-crm.local/api"
+
+
+class JournalBaseUrlTestCase(unittest.TestCase):
+    """Records created through a session on another server are journaled and swept against that server."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory(prefix="crm-journal-")
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        # A private journal in a scratch directory, whatever CRM_JOURNAL says
+        for patcher in (mock.patch.object(config, "JOURNAL", self.directory),
+                        mock.patch.object(journal, "_journal", None),
+                        mock.patch.dict(os.environ, {journal.RUN_ENV: f"journaltest-{uuid.uuid4().hex}"})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: journal._journal and journal._journal.close())
+
+        # Any server but BASE_URL will do; this one is answered in memory
+        self.app = StandInApp()
+        self.other = CRMSession(base_url=OTHER_URL, max_retries=0)
+        self.other.auth = None
+        self.other.mount(OTHER_URL, StandInAdapter(self.app))
+        response = self.other.post("/customers", json={"name": "Journal Test Customer"})
+        self.assertEqual(response.status_code, 201)
+        self.customer_id = response.json()["id"]
+
+    def entries(self):
+        entries = []
+        for path in journal.journal_files(self.directory):
+            with open(path, encoding="utf-8") as f:
+                entries.extend(json.loads(line) for line in f)
+        return entries
+
+    def test_create_is_journaled_against_the_session_base_url(self):
+        self.assertEqual([(entry["op"], entry["base"], entry["path"]) for entry in self.entries()],
+                         [("create", OTHER_URL, f"/customers/{self.customer_id}")])
+
+    def test_sweep_of_base_url_keeps_other_servers_records(self):
+        swept, remaining = journal.sweep(journal.journal_files(self.directory))
+        self.assertEqual((swept, remaining), (0, 1))
+        self.assertIn(self.customer_id, self.app.store.collections["customers"])
+
+        swept, remaining = journal.sweep(journal.journal_files(self.directory), self.other)
+        self.assertEqual((swept, remaining), (1, 0))
+        self.assertNotIn(self.customer_id, self.app.store.collections["customers"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from harness import config
+from harness.httpClient import CRMSession
+from harness.logConfig import configure_logging
+from harness.resilience import AIMDLimiter, CircuitBreaker, CircuitOpenError, Resilience, RetryBudget
+from harness.standIn import StandInAdapter, StandInApp
+
+# Configure logging
+configure_logging()
+
+OTHER_URL = "http://resilience-crm.local/api"
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+
+    def test_opens_after_consecutive_failures_and_lets_one_probe_through(self):
+        breaker = CircuitBreaker(failures=2, cooldown=0.05)
+        self.assertFalse(breaker.failure())
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.failure())
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        # The probe is still in flight
+        self.assertFalse(breaker.allow())
+        breaker.success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(failures=1, cooldown=0.05)
+        breaker.failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.failure())
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_success_resets_the_failure_count(self):
+        breaker = CircuitBreaker(failures=2, cooldown=5)
+        breaker.failure()
+        breaker.success()
+        self.assertFalse(breaker.failure())
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class RetryBudgetTestCase(unittest.TestCase):
+
+    def test_reserve_runs_out_and_traffic_refills_it(self):
+        budget = RetryBudget(ratio=0.5, reserve=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+    def test_deposits_never_exceed_the_reserve(self):
+        budget = RetryBudget(ratio=1, reserve=1)
+        for _ in range(5):
+            budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+
+class AIMDLimiterTestCase(unittest.TestCase):
+
+    def test_success_raises_the_limit_and_overload_halves_it(self):
+        limiter = AIMDLimiter(initial=4, maximum=10, floor=0)
+        limiter.acquire()
+        limiter.release(0.01, key="GET /customers/{id}")
+        self.assertAlmostEqual(limiter.limit, 4.25)
+        limiter.acquire()
+        limiter.release(0.01, overloaded=True, key="GET /customers/{id}")
+        self.assertAlmostEqual(limiter.limit, 2.125)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_latency_baselines_are_per_endpoint(self):
+        limiter = AIMDLimiter(initial=4, maximum=10, tolerance=2, floor=0)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(0.001, key="GET /customers/{id}")
+        before = limiter.limit
+        # Ten times slower than the GET, but normal for a list call
+        limiter.acquire()
+        limiter.release(0.01, key="GET /customers")
+        self.assertGreater(limiter.limit, before)
+
+        limiter.acquire()
+        limiter.release(0.05, key="GET /customers/{id}")
+        self.assertLess(limiter.limit, before)
+
+    def test_try_acquire_and_abandon(self):
+        limiter = AIMDLimiter(initial=1, maximum=1)
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+        limiter.abandon()
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertTrue(limiter.try_acquire())
+
+
+class ResilienceStandInTestCase(unittest.TestCase):
+    """Retries and breakers of a CRMSession answered by a stand-in that can be told to fail."""
+
+    def setUp(self):
+        for patcher in (mock.patch.object(config, "BREAKER_FAILURES", 2),
+                        mock.patch.object(config, "BREAKER_COOLDOWN", 0.05)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.app = StandInApp()
+        self.calls = 0
+        self.fail = None
+        handle = self.app.handle
+
+        def counting_handle(*args, **kwargs):
+            self.calls += 1
+            if self.fail is not None:
+                failure, self.fail = self.fail, None
+                return failure()
+            return handle(*args, **kwargs)
+
+        self.app.handle = counting_handle
+        self.session = CRMSession(base_url=OTHER_URL, max_retries=0, backoff_factor=0, cache=False)
+        self.session.auth = None
+        self.session.mount(OTHER_URL, StandInAdapter(self.app))
+
+    def unavailable(self):
+        return 503, b'{"error": "injected failure"}'
+
+    def test_idempotent_call_is_retried_after_a_503(self):
+        self.session.resilience.max_retries = 2
+        self.fail = self.unavailable
+        response = self.session.get("/customers")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.calls, 2)
+
+    def test_breaker_opens_and_closes_after_a_good_probe(self):
+        self.app.error_rate = 1.0
+        for _ in range(2):
+            self.assertEqual(self.session.get("/customers").status_code, 503)
+        with self.assertRaises(CircuitOpenError):
+            self.session.get("/customers")
+        self.assertEqual(self.calls, 2)
+
+        self.app.error_rate = 0.0
+        time.sleep(0.06)
+        self.assertEqual(self.session.get("/customers").status_code, 200)
+        self.assertEqual(self.session.get("/customers").status_code, 200)
+
+    def test_unexpected_error_in_the_probe_does_not_leave_the_breaker_half_open(self):
+        self.app.error_rate = 1.0
+        for _ in range(2):
+            self.session.get("/customers")
+        self.app.error_rate = 0.0
+        time.sleep(0.06)
+
+        def broken():
+            raise ValueError("malformed answer")
+
+        self.fail = broken
+        with self.assertRaises(ValueError):
+            self.session.get("/customers")
+        # The failed probe re-opened the breaker; after the cooldown the next probe gets through
+        with self.assertRaises(CircuitOpenError):
+            self.session.get("/customers")
+        time.sleep(0.06)
+        self.assertEqual(self.session.get("/customers").status_code, 200)
+
+
+class ResilienceAsyncTestCase(unittest.TestCase):
+
+    def test_cancelled_wait_for_a_slot_gives_the_slot_back(self):
+        resilience = Resilience(max_retries=0)
+        resilience.limiter = AIMDLimiter(initial=1, maximum=1)
+        sent = []
+
+        async def send(method, url, **kwargs):
+            sent.append(url)
+
+        async def scenario():
+            resilience.limiter.acquire()
+            waiting = asyncio.ensure_future(resilience.call_async(send, "GET", f"{OTHER_URL}/customers", OSError))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            # The pool thread takes the freed slot for the cancelled call, then hands it back
+            resilience.limiter.abandon()
+            for _ in range(100):
+                if resilience.limiter.in_flight == 0:
+                    break
+                await asyncio.sleep(0.01)
+
+        asyncio.run(scenario())
+        self.assertEqual(resilience.limiter.in_flight, 0)
+        self.assertEqual(sent, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+from unittest import mock
+
+from harness import fixtures, scenarios
+from harness.httpClient import CRMSession
+from harness.logConfig import configure_logging
+from harness.scenarios import ScenarioError, TestPlan, build_cases, compile_fixtures, compile_plans, resolve
+from harness.standIn import StandInAdapter, StandInApp
+
+# Configure logging
+configure_logging()
+
+OTHER_URL = "http://scenario-crm.local/api"
+
+
+def level_names(plan):
+    return [[step.name for step in level] for level in plan.levels]
+
+
+class TestPlanLevelsTestCase(unittest.TestCase):
+    """Steps are layered by the names they save and use and by the paths they touch."""
+
+    def test_independent_creates_share_a_level_and_their_readers_follow(self):
+        plan = TestPlan("test_two_customers", [
+            {"post": "/customers", "json": {"name": "A"}, "save": "first"},
+            {"post": "/customers", "json": {"name": "B"}, "save": "second"},
+            {"get": "/customers/{first}", "name": "read first"},
+            {"get": "/customers/{second}", "name": "read second"},
+        ])
+        self.assertEqual(level_names(plan), [["post /customers", "post /customers"], ["read first", "read second"]])
+
+    def test_write_orders_reads_of_the_same_path_and_its_children(self):
+        plan = TestPlan("test_update", [
+            {"get": "/customers/{customer_id}"},
+            {"get": "/customers/{customer_id}/tasks"},
+            {"get": "/products"},
+            {"put": "/customers/{customer_id}", "json": {"name": "Renamed"}},
+            {"get": "/customers/{customer_id}", "name": "read again"},
+        ])
+        self.assertEqual(level_names(plan), [
+            ["get /customers/{customer_id}", "get /customers/{customer_id}/tasks", "get /products"],
+            ["put /customers/{customer_id}"],
+            ["read again"],
+        ])
+
+    def test_delete_of_a_parent_conflicts_with_a_child_create(self):
+        plan = TestPlan("test_cascade", [
+            {"post": "/customers/{customer_id}/notes", "json": {"text": "hi"}},
+            {"delete": "/customers/{customer_id}"},
+        ])
+        self.assertEqual(len(plan.levels), 2)
+
+    def test_default_expectations_per_verb(self):
+        plan = TestPlan("test_defaults", [{"post": "/orders"}, {"delete": "/orders/1"}, {"get": "/orders"}])
+        self.assertEqual([step.expect for step in plan.steps], [201, 204, 200])
+
+    def test_step_needs_exactly_one_kind(self):
+        with self.assertRaises(ScenarioError):
+            TestPlan("test_bad", [{"get": "/a", "delete": "/a"}])
+        with self.assertRaises(ScenarioError):
+            TestPlan("test_bad", [{"json": {}}])
+
+
+class CompileTestCase(unittest.TestCase):
+
+    def test_placeholders_keep_the_type_of_whole_values(self):
+        context = {"product_id": 7, "name": "Widget"}
+        self.assertEqual(resolve({"product_id": "{product_id}", "label": "{name} #{product_id}"}, context),
+                         {"product_id": 7, "label": "Widget #7"})
+        with mock.patch.dict("os.environ", {fixtures.WORKER_TAG_ENV: "w42"}):
+            self.assertEqual(resolve({"unique": "{name}"}, context), "Widget-w42")
+
+    def test_fixture_requirements_are_wired_to_payload_placeholders(self):
+        compiled = compile_fixtures({"fixtures": {
+            "order": {"path": "/orders", "requires": {"customer_id": "base_customer", "note_id": "note"},
+                      "payload": {"customer_id": "{customer_id}", "note": "{note_id}"}},
+            "note": {"path": "/notes", "payload": {"text": "x"}, "scope": "session"},
+        }})
+        order = compiled["order"]
+        self.assertIs(order.requires["customer_id"], fixtures.BASE_CUSTOMER)
+        self.assertIs(order.requires["note_id"], compiled["note"])
+        self.assertEqual(order.payload(customer_id=3, note_id=4), {"customer_id": 3, "note": 4})
+
+    def test_undefined_and_circular_fixtures_are_rejected(self):
+        with self.assertRaisesRegex(ScenarioError, "undefined fixture 'missing'"):
+            compile_fixtures({"fixtures": {"a": {"path": "/a", "payload": {}, "requires": {"x": "missing"}}}})
+        with self.assertRaisesRegex(ScenarioError, "requires itself"):
+            compile_fixtures({"fixtures": {"a": {"path": "/a", "payload": {}, "requires": {"x": "b"}},
+                                           "b": {"path": "/b", "payload": {}, "requires": {"y": "a"}}}})
+
+    def test_errors_name_the_case_and_test(self):
+        with self.assertRaisesRegex(ScenarioError, r"^SomeTestCase\.test_broken: "):
+            compile_plans({"cases": {"SomeTestCase": {"tests": {"test_broken": [{"fetch": "/a"}]}}}})
+
+
+class ScenarioStandInTestCase(unittest.TestCase):
+    """Built cases run against a stand-in and leave nothing behind, whether they pass or fail."""
+
+    def setUp(self):
+        self.app = StandInApp()
+        self.session = CRMSession(base_url=OTHER_URL, max_retries=0, cache=False)
+        self.session.auth = None
+        self.session.mount(OTHER_URL, StandInAdapter(self.app))
+        for patcher in (mock.patch.object(scenarios, "get_session", return_value=self.session),
+                        mock.patch.object(fixtures, "get_session", return_value=self.session)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_cases(self, spec):
+        result = unittest.TestResult()
+        for case in build_cases(spec, __name__).values():
+            unittest.defaultTestLoader.loadTestsFromTestCase(case).run(result)
+        return result
+
+    def records(self, collection):
+        return self.app.store.collections[collection]
+
+    def spec(self, expect_after_update=200):
+        return {
+            "fixtures": {"customer": {"path": "/customers", "payload": {"name": "Scenario Customer"}}},
+            "cases": {"ScenarioCustomerTestCase": {
+                "fixtures": {"customer_id": "customer"},
+                "tests": {
+                    "test_get_customer": [{"get": "/customers/{customer_id}",
+                                           "fields": {"name": "Scenario Customer", "id": "{customer_id}"}}],
+                    "test_order_for_customer": [
+                        {"post": "/orders", "json": {"customer_id": "{customer_id}", "total": 10}, "save": "order"},
+                        {"put": "/orders/{order}", "json": {"customer_id": "{customer_id}", "total": 12}},
+                        {"get": "/orders/{order}", "expect": expect_after_update, "fields": {"total": 12}},
+                    ],
+                },
+            }},
+        }
+
+    def test_passing_cases_clean_up_fixtures_and_created_records(self):
+        result = self.run_cases(self.spec())
+        self.assertEqual((result.testsRun, result.failures, result.errors), (2, [], []))
+        self.assertEqual(self.records("customers"), {})
+        self.assertEqual(self.records("orders"), {})
+
+    def test_record_created_before_a_failing_step_is_deleted(self):
+        result = self.run_cases(self.spec(expect_after_update=418))
+        self.assertEqual(len(result.failures), 1)
+        self.assertIn("test_order_for_customer", result.failures[0][0].id())
+        self.assertEqual(self.records("orders"), {})
+        self.assertEqual(self.records("customers"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import json
+import unittest
+from unittest import mock
+
+import requests
+
+from harness import seeding
+from harness.httpClient import CRMSession
+from harness.logConfig import configure_logging
+from harness.seeding import SeedError, seed, teardown
+from harness.standIn import StandInAdapter, StandInApp
+
+# Configure logging
+configure_logging()
+
+OTHER_URL = "http://seeding-crm.local/api"
+
+
+class SeedPartialFailureTestCase(unittest.TestCase):
+    """A seed that fails part way still hands back every ID it created, so all of it can be torn down."""
+
+    def setUp(self):
+        patcher = mock.patch.dict(seeding._batch_support, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.app = StandInApp()
+        self.handle = self.app.handle
+        self.session = CRMSession(base_url=OTHER_URL, max_retries=0, cache=False)
+        self.session.auth = None
+        self.session.mount(OTHER_URL, StandInAdapter(self.app))
+
+    def customers(self):
+        return self.app.store.collections.get("customers", {})
+
+    def payloads(self, count):
+        return [{"name": f"Seeded Customer {n}", "email": f"seeded{n}@example.com"} for n in range(count)]
+
+    def test_short_batch_answer_keeps_the_ids_of_every_chunk(self):
+        batches = []
+
+        def short_second_batch(method, path, query="", body=None, *args, **kwargs):
+            status, payload = self.handle(method, path, query, body, *args, **kwargs)
+            if path.endswith("/batch"):
+                batches.append(path)
+                if len(batches) == 2:
+                    # Created three, reported two
+                    records = json.loads(payload)
+                    payload = json.dumps(records["items"][:2] if isinstance(records, dict) else records[:2]).encode()
+            return status, payload
+
+        self.app.handle = short_second_batch
+        with self.assertRaises(SeedError) as caught:
+            seed("customers", self.payloads(9), self.session, batch_size=3)
+        ids = caught.exception.ids
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(len(ids), 9)
+        self.assertEqual(ids.count(None), 1)
+        self.assertIn("returned 2 records for 3 payloads", str(caught.exception))
+        # The third chunk still ran, and the reported IDs all exist
+        self.assertTrue(set(filter(None, ids)) <= set(self.customers()))
+        self.assertEqual(len(self.customers()), 9)
+
+        teardown("customers", ids, self.session, batch_size=3)
+        # The unreported record of the short batch is the only one left
+        self.assertEqual(len(self.customers()), 1)
+
+    def test_failed_single_creates_are_none_in_input_order(self):
+        calls = []
+
+        def no_batch_and_flaky(method, path, query="", body=None, *args, **kwargs):
+            if path.endswith("/batch"):
+                return 404, b'{"error": "not found"}'
+            if method == "POST":
+                calls.append(body)
+                if b'"Seeded Customer 1"' in body:
+                    raise requests.exceptions.ConnectionError("connection reset")
+                if b'"Seeded Customer 4"' in body:
+                    return 500, b'{"error": "boom"}'
+            return self.handle(method, path, query, body, *args, **kwargs)
+
+        self.app.handle = no_batch_and_flaky
+        with self.assertRaises(SeedError) as caught:
+            seed("customers", self.payloads(6), self.session, batch_size=2)
+        ids = caught.exception.ids
+        self.assertEqual([entity_id is None for entity_id in ids], [False, True, False, False, True, False])
+        self.assertEqual(len(calls), 6)
+        self.assertEqual(set(filter(None, ids)), set(self.customers()))
+
+        teardown("customers", ids, self.session)
+        self.assertEqual(self.customers(), {})
+
+    def test_unreachable_batch_endpoint_counts_as_failed_records(self):
+        def unreachable(method, path, *args, **kwargs):
+            raise requests.exceptions.ConnectionError("connection refused")
+
+        self.app.handle = unreachable
+        with self.assertRaises(SeedError) as caught:
+            seed("customers", self.payloads(4), self.session, batch_size=2)
+        self.assertEqual(caught.exception.ids, [None] * 4)
+
+    def test_complete_seed_returns_ids_in_input_order(self):
+        ids = seed("customers", self.payloads(5), self.session, batch_size=2)
+        self.assertEqual([self.customers()[entity_id]["name"] for entity_id in ids],
+                         [f"Seeded Customer {n}" for n in range(5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
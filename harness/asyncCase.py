@@ -0,0 +1,136 @@
+import asyncio
+import inspect
+import logging
+import sys
+import time
+import unittest
+
+from harness.asyncClient import AsyncCRMClient
+
+
+class AsyncCRMTestCase(unittest.IsolatedAsyncioTestCase):
+    """Base class for async CRM suites.
+
+    Each test gets an AsyncCRMClient as ``self.client``. Under the stock
+    unittest runner every test owns its loop and client; under
+    run_concurrently() all tests share one loop and one client.
+    """
+
+    client = None
+
+    async def asyncSetUp(self):
+        self._owns_client = self.client is None
+        if self._owns_client:
+            self.client = AsyncCRMClient()
+
+    async def asyncTearDown(self):
+        if self._owns_client:
+            await self.client.close()
+            self.client = None
+
+    async def gather(self, *aws):
+        """Await independent requests concurrently, returning results in order."""
+        return await asyncio.gather(*aws)
+
+    async def create(self, path, data):
+        """POST ``data`` to ``path``, assert it was created and return the new record's ID."""
+        response = await self.client.post(path, json=data)
+        self.assertEqual(response.status_code, 201)
+        logging.debug("Created %s: %s", path, data)
+        return response.json()["id"]
+
+    async def delete(self, path, entity_id):
+        """DELETE ``path/entity_id`` and assert it was deleted."""
+        response = await self.client.delete(f"{path}/{entity_id}")
+        self.assertEqual(response.status_code, 204)
+        logging.info("Deleted %s/%s", path, entity_id)
+
+
+def _iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_tests(test)
+        else:
+            yield test
+
+
+async def _record(test, result, coro):
+    try:
+        await coro
+    except unittest.SkipTest as e:
+        result.addSkip(test, str(e))
+    except test.failureException:
+        result.addFailure(test, sys.exc_info())
+    except Exception:
+        result.addError(test, sys.exc_info())
+    else:
+        return True
+    return False
+
+
+async def _call_maybe_async(function, *args, **kwargs):
+    outcome = function(*args, **kwargs)
+    if inspect.isawaitable(outcome):
+        await outcome
+
+
+async def _do_cleanups(test, result):
+    """Run the test's addCleanup and addAsyncCleanup callbacks, last registered first."""
+    passed = True
+    while test._cleanups:
+        function, args, kwargs = test._cleanups.pop()
+        passed = await _record(test, result, _call_maybe_async(function, *args, **kwargs)) and passed
+    return passed
+
+
+async def _run_test(test, result, client, semaphore):
+    async with semaphore:
+        test.client = client
+        result.startTest(test)
+        try:
+            passed = await _record(test, result, test.asyncSetUp())
+            if passed:
+                passed = await _record(test, result, getattr(test, test._testMethodName)())
+                passed = await _record(test, result, test.asyncTearDown()) and passed
+            # As under unittest, cleanups also run when setUp failed
+            passed = await _do_cleanups(test, result) and passed
+            if passed:
+                result.addSuccess(test)
+        finally:
+            result.stopTest(test)
+
+
+def run_concurrently(suite, result=None, max_concurrency=None):
+    """Run every AsyncCRMTestCase in ``suite`` concurrently on one event loop.
+
+    Tests are independent by construction (each creates its own fixtures), so
+    the suite takes roughly as long as its slowest test instead of the sum.
+    """
+    result = result or unittest.TestResult()
+    tests = [test for test in _iter_tests(suite) if isinstance(test, AsyncCRMTestCase)]
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(max_concurrency or len(tests) or 1)
+        async with AsyncCRMClient() as client:
+            await asyncio.gather(*(_run_test(test, result, client, semaphore) for test in tests))
+
+    asyncio.run(run_all())
+    return result
+
+
+def main(module="__main__", max_concurrency=None):
+    """Command-line entry point mirroring unittest.main() for concurrent runs."""
+    suite = unittest.defaultTestLoader.loadTestsFromModule(sys.modules[module])
+    stream = unittest.runner._WritelnDecorator(sys.stderr)
+    result = unittest.TextTestResult(stream, descriptions=True, verbosity=1)
+    start = time.perf_counter()
+    run_concurrently(suite, result, max_concurrency)
+    elapsed = time.perf_counter() - start
+    stream.writeln()
+    result.printErrors()
+    stream.writeln(f"Ran {result.testsRun} tests concurrently in {elapsed:.3f}s")
+    if result.wasSuccessful():
+        stream.writeln("OK")
+    else:
+        stream.writeln(f"FAILED (failures={len(result.failures)}, errors={len(result.errors)})")
+    sys.exit(not result.wasSuccessful())
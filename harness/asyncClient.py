@@ -0,0 +1,160 @@
+import asyncio
+import functools
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import codec, config, journal, metrics
+from harness.auth import get_token_provider
+from harness.httpClient import get_session
+from harness.latency import recorder
+from harness.resilience import IDEMPOTENCY_HEADER, IDEMPOTENT_METHODS
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - exercised when aiohttp is not installed
+    aiohttp = None
+
+
+class AsyncResponse:
+    """Fully read response with the subset of the requests.Response API the suites use."""
+
+    def __init__(self, status_code, headers, content, url=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return codec.loads(self.content)
+
+
+class AsyncCRMClient:
+    """Asyncio client for the CRM API.
+
+    Uses aiohttp with a bounded keep-alive connector when it is installed.
+    Its calls go through the shared CRMSession's harness.resilience policy and
+    response cache, so retries, breakers, the concurrency limit and cached
+    GETs cover sync and async traffic together. Otherwise requests are offloaded to a thread pool sharing the
+    pooled CRMSession, so awaiting several calls still overlaps their round trips.
+    """
+
+    def __init__(self, base_url=None, headers=None, pool_size=None, timeout=None):
+        self.base_url = (base_url or config.BASE_URL).rstrip("/")
+        self.headers = dict(config.HEADERS if headers is None else headers)
+        self.pool_size = config.POOL_SIZE if pool_size is None else pool_size
+        self.timeout = config.TIMEOUT if timeout is None else timeout
+        self._session = None
+        self._executor = None
+
+    async def request(self, method, path, **kwargs):
+        if kwargs.get("json") is not None:
+            kwargs["data"] = codec.dumps(kwargs.pop("json"))
+        # The stand-in and cassettes are mounted on the shared session, which aiohttp cannot reach
+        if aiohttp is None or config.STANDIN or config.CASSETTE_MODE:
+            return await self._offload(method, path, **kwargs)
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        url = path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+        provider = get_token_provider()
+        if provider is not None:
+            # The first call may log in, which must not block the event loop
+            token = await asyncio.get_running_loop().run_in_executor(None, provider.token)
+            if token:
+                kwargs["headers"] = {**kwargs.get("headers", {}), "token": token}
+        data = kwargs.get("data")
+        if (config.IDEMPOTENCY_KEYS and method.upper() not in IDEMPOTENT_METHODS
+                and isinstance(data, (type(None), bytes))):
+            kwargs["headers"] = {IDEMPOTENCY_HEADER: uuid.uuid4().hex, **kwargs.get("headers", {})}
+        shared = get_session()
+        cache, cache_key, validators = shared.cache, None, None
+        if cache is not None:
+            if method.upper() == "GET":
+                cache_key = cache.key(url, kwargs.get("params"))
+                cached, validators = cache.lookup(cache_key, AsyncResponse)
+                if cached is not None:
+                    return cached
+                if validators:
+                    kwargs["headers"] = {**validators, **kwargs.get("headers", {})}
+                generation = cache.generation
+            else:
+                cache.invalidate(url)
+        endpoint = metrics.registry.begin(method, url)
+        start = time.perf_counter()
+        try:
+            response = await shared.resilience.call_async(
+                self._send, method, url, (aiohttp.ClientConnectionError, asyncio.TimeoutError),
+                aiohttp.ClientConnectorError, **kwargs)
+        except Exception:
+            metrics.registry.end(endpoint, "error", time.perf_counter() - start)
+            raise
+        elapsed = time.perf_counter() - start
+        recorder.record(method, url, elapsed)
+        metrics.registry.end(endpoint, response.status_code, elapsed,
+                             len(data) if isinstance(data, (bytes, str)) else 0, len(response.content))
+        # Created IDs go to the leak journal, as for the shared session
+        journal.observe(method, url, data, response, self.base_url)
+        if cache_key is not None:
+            if response.status_code == 304 and validators:
+                refreshed = cache.revalidated_response(cache_key, response, AsyncResponse)
+                if refreshed is not None:
+                    return refreshed
+                # Invalidated while revalidating; fetch the current version unconditionally
+                kwargs["headers"] = {name: value for name, value in kwargs["headers"].items() if name not in validators}
+                return await self.request(method, url, **kwargs)
+            cache.store(cache_key, response, generation)
+        elif cache is not None:
+            # Again after the write, in case a GET stored the old version while it was in flight
+            cache.invalidate(url)
+        return response
+
+    async def _send(self, method, url, **kwargs):
+        async with self._session.request(method, url, **kwargs) as response:
+            return AsyncResponse(response.status, response.headers, await response.read(), str(response.url))
+
+    async def _offload(self, method, path, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="crm-async")
+        session = get_session()
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        if not path.startswith(("http://", "https://")):
+            path = f"{self.base_url}{path}"
+        call = functools.partial(session.request, method, path, headers=headers, timeout=self.timeout, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request("PUT", path, **kwargs)
+
+    async def patch(self, path, **kwargs):
+        return await self.request("PATCH", path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request("DELETE", path, **kwargs)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,272 @@
+import argparse
+import binascii
+import json
+import mimetypes
+import mmap
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from harness import config
+from harness.httpClient import CRMSession, get_session
+from harness.resilience import IDEMPOTENCY_HEADER, RETRY_STATUSES, backoff_delay
+
+# A multiple of 3 so every base64 block except the last encodes without padding
+BLOCK_SIZE = 3 * 64 * 1024
+
+MODES = ("multipart", "chunked", "json")
+
+
+class BodyStream:
+    """Request body of a known ``length`` produced block by block from an iterator.
+
+    requests sends it with a Content-Length header and nothing beyond the
+    current block is held in memory. A bare generator is used instead when
+    the length is unknown, which requests sends with chunked encoding.
+    """
+
+    def __init__(self, blocks, length):
+        self._blocks = iter(blocks)
+        self.length = length
+
+    def __iter__(self):
+        return self._blocks
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        # http.client and urllib3 only check for an empty read, so whole blocks are returned
+        return next(self._blocks, b"")
+
+
+def _read_blocks(path, use_mmap=False, block_size=BLOCK_SIZE):
+    """Yield the file's contents; with ``use_mmap`` the blocks are zero-copy views of the mapping."""
+    with open(path, "rb") as f:
+        if use_mmap and os.fstat(f.fileno()).st_size:
+            # Not closed explicitly: the sender may still hold the last view, and
+            # an mmap with live views refuses to close. It is unmapped once collected.
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            for offset in range(0, len(view), block_size):
+                yield view[offset:offset + block_size]
+            return
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def _base64_blocks(path, use_mmap=False, block_size=BLOCK_SIZE):
+    """Yield base64 of the file one block at a time, reading into a single reused buffer."""
+    if use_mmap:
+        for block in _read_blocks(path, use_mmap=True, block_size=block_size):
+            yield binascii.b2a_base64(block, newline=False)
+        return
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(path, "rb") as f:
+        while True:
+            filled = 0
+            # Only a full buffer keeps the base64 stream free of padding mid-way
+            while filled < block_size:
+                read = f.readinto(view[filled:])
+                if not read:
+                    break
+                filled += read
+            if not filled:
+                return
+            yield binascii.b2a_base64(view[:filled], newline=False)
+            if filled < block_size:
+                return
+
+
+def multipart_body(path, filename, filetype, use_mmap=False):
+    """``(BodyStream, content_type)`` for a multipart/form-data upload of ``path`` as field ``file``."""
+    boundary = uuid.uuid4().hex
+    head = (f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: {filetype}\r\n\r\n").encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("ascii")
+
+    def blocks():
+        yield head
+        yield from _read_blocks(path, use_mmap)
+        yield tail
+
+    length = len(head) + os.path.getsize(path) + len(tail)
+    return BodyStream(blocks(), length), f"multipart/form-data; boundary={boundary}"
+
+
+def json_body(path, filename, filetype, use_mmap=False):
+    """``(BodyStream, content_type)`` for the JSON API's ``{"filename", "filetype", "content"}`` shape.
+
+    The base64 ``content`` is encoded as the body is sent, so the file is
+    never held in memory whole, either raw or encoded.
+    """
+    head = (f'{{"filename": {json.dumps(filename)}, "filetype": {json.dumps(filetype)}, '
+            f'"content": "').encode("utf-8")
+    tail = b'"}'
+
+    def blocks():
+        yield head
+        yield from _base64_blocks(path, use_mmap)
+        yield tail
+
+    length = len(head) + 4 * -(-os.path.getsize(path) // 3) + len(tail)
+    return BodyStream(blocks(), length), "application/json"
+
+
+def upload_attachment(customer_id, path, filename=None, filetype=None, mode="multipart",
+                      use_mmap=False, session=None):
+    """Upload ``path`` as an attachment of ``customer_id`` without reading it into memory.
+
+    ``mode`` is ``"multipart"`` (multipart/form-data with a Content-Length),
+    ``"chunked"`` (the raw file with chunked transfer encoding and the name
+    in ``?filename=``) or ``"json"`` (the JSON API, base64-encoded on the fly).
+    Returns the response. The session cannot resend a consumed stream, so a
+    retryable failure re-opens the file and uploads it again here, with the
+    same backoff, retry budget and idempotency key rules as other calls.
+    """
+    session = session or get_session()
+    filename = filename or os.path.basename(path)
+    filetype = filetype or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if mode not in MODES:
+        raise ValueError(f"unknown upload mode {mode!r}; expected one of {', '.join(MODES)}")
+    url = f"/customers/{customer_id}/attachments"
+    # Attachments are creates, so a resend is only safe when the server deduplicates on the key
+    key = {IDEMPOTENCY_HEADER: uuid.uuid4().hex} if config.IDEMPOTENCY_KEYS else None
+    resilience = getattr(session, "resilience", None)
+    attempt = 0
+    while True:
+        response = _send_upload(session, url, path, filename, filetype, mode, use_mmap, key)
+        if (key is None or response.status_code not in RETRY_STATUSES or resilience is None
+                or attempt >= resilience.max_retries or not resilience.budget.withdraw()):
+            return response
+        response.close()
+        time.sleep(backoff_delay(attempt, resilience.backoff_factor))
+        attempt += 1
+
+
+def _send_upload(session, url, path, filename, filetype, mode, use_mmap, key):
+    if mode == "multipart":
+        body, content_type = multipart_body(path, filename, filetype, use_mmap)
+        return session.post(url, data=body, headers={"Content-Type": content_type, **(key or {})})
+    if mode == "chunked":
+        # A generator has no length, so requests sends it with Transfer-Encoding: chunked
+        return session.post(url, params={"filename": filename}, data=_read_blocks(path, use_mmap),
+                            headers={"Content-Type": filetype, **(key or {})})
+    body, content_type = json_body(path, filename, filetype, use_mmap)
+    return session.post(url, data=body, headers={"Content-Type": content_type, **(key or {})})
+
+
+def _inline_upload(session, customer_id, path, filename, filetype):
+    # What the suites did before: the whole file, its base64 and the JSON body all in memory at once
+    with open(path, "rb") as f:
+        content = binascii.b2a_base64(f.read(), newline=False).decode("ascii")
+    payload = {"filename": filename, "filetype": filetype, "content": content}
+    return session.post(f"/customers/{customer_id}/attachments", data=json.dumps(payload))
+
+
+def parse_size(text):
+    """``"1K"``, ``"64M"``, ``"1G"`` or plain bytes -> bytes."""
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _start_server():
+    # A separate process, so tracemalloc sees only the client's allocations
+    process = subprocess.Popen([sys.executable, "-m", "harness.standIn", "--port", "0"],
+                               stdout=subprocess.PIPE, text=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    url = process.stdout.readline().rsplit(" ", 1)[-1].strip()
+    return process, url
+
+
+def benchmark(sizes, modes, use_mmap=False, inline_limit=64 << 20, directory=None):
+    """Upload a file of each size in each mode to a local stand-in and measure time and peak memory.
+
+    Returns one row per upload with ``mode``, ``size``, ``seconds``, ``mb_per_s``
+    and ``peak_mb`` (traced client allocations). ``"inline"`` is the old
+    all-in-memory JSON upload, skipped above ``inline_limit`` bytes.
+    """
+    process, url = _start_server()
+    rows = []
+    try:
+        session = CRMSession(base_url=url, max_retries=0)
+        session.auth = None
+        customer_id = session.post("/customers", data=json.dumps({"name": "Attachment Benchmark"})).json()["id"]
+        try:
+            for size in sizes:
+                with tempfile.NamedTemporaryFile(suffix=".pdf", dir=directory) as f:
+                    # Random bytes so nothing along the way can shortcut or compress the upload
+                    remaining = size
+                    while remaining:
+                        block = os.urandom(min(remaining, 1 << 20))
+                        f.write(block)
+                        remaining -= len(block)
+                    f.flush()
+                    for mode in modes:
+                        if mode == "inline" and size > inline_limit:
+                            continue
+                        tracemalloc.start()
+                        start = time.perf_counter()
+                        if mode == "inline":
+                            response = _inline_upload(session, customer_id, f.name, "contract.pdf", "application/pdf")
+                        else:
+                            response = upload_attachment(customer_id, f.name, filename="contract.pdf", mode=mode,
+                                                         use_mmap=use_mmap, session=session)
+                        elapsed = time.perf_counter() - start
+                        peak = tracemalloc.get_traced_memory()[1]
+                        tracemalloc.stop()
+                        if response.status_code != 201:
+                            raise RuntimeError(f"{mode} upload of {size} bytes failed with HTTP {response.status_code}")
+                        session.delete(f"/customers/{customer_id}/attachments/{response.json()['id']}")
+                        rows.append({"mode": mode, "size": size, "seconds": elapsed,
+                                     "mb_per_s": size / elapsed / (1 << 20) if elapsed else 0.0,
+                                     "peak_mb": peak / (1 << 20)})
+        finally:
+            session.delete(f"/customers/{customer_id}")
+    finally:
+        process.terminate()
+        process.wait()
+    return rows
+
+
+def format_rows(rows):
+    lines = [f"{'mode':<10} {'size':>12} {'seconds':>9} {'MB/s':>9} {'peak MB':>9}"]
+    for row in rows:
+        lines.append(f"{row['mode']:<10} {row['size']:>12} {row['seconds']:>9.3f} "
+                     f"{row['mb_per_s']:>9.1f} {row['peak_mb']:>9.2f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark attachment uploads against a local CRM stand-in.")
+    parser.add_argument("--sizes", default="1K,64K,1M,16M,128M,500M", help="comma separated, e.g. 1K,1M,500M")
+    parser.add_argument("--modes", default="inline,multipart,chunked,json",
+                        help="comma separated from inline," + ",".join(MODES))
+    parser.add_argument("--mmap", action="store_true", help="read files through a memory map")
+    parser.add_argument("--inline-limit", default="64M", help="largest file uploaded the old in-memory way")
+    parser.add_argument("--dir", default=None, help="directory for the generated files")
+    parser.add_argument("--json", dest="json_path", help="also write the rows to this file")
+    args = parser.parse_args(argv)
+
+    rows = benchmark([parse_size(size) for size in args.sizes.split(",")], args.modes.split(","),
+                     use_mmap=args.mmap, inline_limit=parse_size(args.inline_limit), directory=args.dir)
+    print(format_rows(rows))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.auth import AuthBase
+
+from harness import config
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock; workers then log in independently
+    fcntl = None
+
+
+class TokenProvider:
+    """Fetches the uuap token on first use and caches it until shortly before it expires.
+
+    The token lives in memory and, when ``cache_path`` is set, in a JSON file
+    guarded by an flock so parallel workers share one login instead of each
+    hitting the SSO endpoint at startup.
+    """
+
+    def __init__(self, url=None, username=None, password=None, ttl=None, refresh_margin=None, cache_path=None):
+        self.url = url or config.UUAP_URL
+        self.username = username or config.UUAP_USERNAME
+        self.password = password or config.UUAP_PASSWORD
+        self.ttl = config.TOKEN_TTL if ttl is None else ttl
+        self.refresh_margin = config.TOKEN_REFRESH_MARGIN if refresh_margin is None else refresh_margin
+        self.cache_path = config.TOKEN_CACHE if cache_path is None else cache_path
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        # After a failed login, wait before trying again instead of hammering SSO on every call
+        self._retry_at = 0.0
+
+    def _fresh(self, expires_at):
+        return time.time() < expires_at - self.refresh_margin
+
+    def token(self):
+        if self._token and self._fresh(self._expires_at):
+            return self._token
+        with self._lock:
+            if self._token and self._fresh(self._expires_at):
+                return self._token
+            if time.time() < self._retry_at:
+                return self._token
+            try:
+                self._token, self._expires_at = self._load_or_login()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logging.warning("Failed to get uuap token: %s", e)
+                self._retry_at = time.time() + config.TOKEN_RETRY_INTERVAL
+            return self._token
+
+    def _load_or_login(self):
+        if not self.cache_path:
+            return self._login()
+        with open(f"{self.cache_path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                cached = self._read_cache()
+                if cached and self._fresh(cached[1]):
+                    return cached
+                token, expires_at = self._login()
+                self._write_cache(token, expires_at)
+                return token, expires_at
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+            return data["token"], data["expires_at"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_cache(self, token, expires_at):
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        # Owner-only: the file holds a live credential
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump({"token": token, "expires_at": expires_at}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _login(self):
+        # 需要#22783 添加从uuapTest拿到认证（从外部的passport迁移到uuap）
+        response = requests.post(self.url, data={"username": self.username, "password": self.password},
+                                 timeout=config.TIMEOUT)
+        if response.status_code != 200:
+            raise ValueError(f"HTTP {response.status_code}: {response.text}")
+        response_data = response.json()
+        token = response_data.get("token")
+        if not token:
+            raise ValueError("Token not found in the response.")
+        expires_in = float(response_data.get("expires_in") or self.ttl)
+        logging.info("Fetched uuap token valid for %.0fs", expires_in)
+        return token, time.time() + expires_in
+
+
+class TokenAuth(AuthBase):
+    """requests auth hook that adds the cached uuap token to every request."""
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    def __call__(self, request):
+        token = self.provider.token()
+        if token:
+            request.headers["token"] = token
+        return request
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_token_provider():
+    """Return the process-wide TokenProvider, or None when auth is disabled."""
+    global _provider
+    if not config.AUTH:
+        return None
+    with _provider_lock:
+        if _provider is None:
+            _provider = TokenProvider()
+        return _provider
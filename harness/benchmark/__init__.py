@@ -0,0 +1 @@
+"""Timed CRUD benchmarks for the CRM API with versioned baselines and a p95 regression gate."""
@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+
+from harness import config
+from harness.benchmark import baseline, operations
+from harness.logConfig import configure_logging
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m harness.benchmark",
+        description="Time every CRUD call the suites make and gate on p95 against a stored baseline.")
+    parser.add_argument("-n", "--iterations", type=int, default=50, help="timed calls per operation")
+    parser.add_argument("-w", "--warmup", type=int, default=5, help="untimed calls before timing starts")
+    parser.add_argument("--only", nargs="*", metavar="NAME",
+                        help="operations or groups to run, e.g. customer order.create (default: all)")
+    parser.add_argument("--baselines", default=config.BENCH_BASELINES, help="baseline directory")
+    parser.add_argument("--save", metavar="VERSION", help="store the results as baseline VERSION")
+    parser.add_argument("--compare", metavar="VERSION", help="gate on p95 against baseline VERSION or 'latest'")
+    parser.add_argument("--threshold", type=float, default=config.BENCH_THRESHOLD,
+                        help="allowed p95 growth as a fraction (default: %(default)s)")
+    parser.add_argument("--min-delta-ms", type=float, default=config.BENCH_MIN_DELTA_MS,
+                        help="ignore p95 growth smaller than this (default: %(default)s)")
+    parser.add_argument("--json", dest="json_path", help="also write the raw results to this file")
+    parser.add_argument("--list", action="store_true", help="list the operations and exit")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    selected = operations.select(args.only)
+    if args.list:
+        print("\n".join(operation.name for operation in selected))
+        return 0
+
+    # Load the baseline first so a typo fails before minutes of benchmarking
+    try:
+        reference = baseline.load(args.baselines, args.compare) if args.compare else None
+        if args.save:
+            baseline.path_for(args.baselines, args.save)
+    except baseline.BaselineError as e:
+        print(e, file=sys.stderr)
+        return 2
+    results = operations.run(selected, iterations=args.iterations, warmup=args.warmup)
+
+    print(f"{'operation':<32} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, row in results.items():
+        print(f"{name:<32} {row['count']:>6} {row['errors']:>6} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+              f"{row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = [name for name, row in results.items() if row["errors"]]
+    if failed:
+        print(f"\n{len(failed)} operations returned unexpected statuses: {', '.join(failed)}", file=sys.stderr)
+    if args.save and not failed:
+        settings = {"iterations": args.iterations, "warmup": args.warmup, "base_url": config.BASE_URL,
+                    "json_codec": config.JSON_CODEC}
+        print(f"\nSaved baseline {args.save} to {baseline.save(args.baselines, args.save, results, settings)}")
+
+    if reference is not None:
+        rows, regressed = baseline.compare(reference, results, args.threshold, args.min_delta_ms)
+        print("\n" + baseline.format_diff(rows, reference["version"]))
+        if regressed:
+            print(f"\np95 regressed by more than {args.threshold:.0%} and {args.min_delta_ms} ms: "
+                  f"{', '.join(regressed)}", file=sys.stderr)
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import datetime
+import glob
+import json
+import os
+import platform
+import re
+
+# Bumped when the baseline layout changes; older files are refused rather than misread
+SCHEMA = 1
+
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+
+
+class BaselineError(Exception):
+    """Raised when a baseline cannot be found, read or written."""
+
+
+def path_for(directory, version):
+    if not VERSION_PATTERN.match(version):
+        raise BaselineError(f"invalid baseline version {version!r}; use letters, digits, '.', '_' or '-'")
+    return os.path.join(directory, f"{version}.json")
+
+
+def save(directory, version, results, settings):
+    """Write ``results`` as baseline ``version``; refuses to overwrite an existing one."""
+    path = path_for(directory, version)
+    if os.path.exists(path):
+        raise BaselineError(f"baseline {version} already exists at {path}")
+    os.makedirs(directory, exist_ok=True)
+    document = {
+        "schema": SCHEMA,
+        "version": version,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "settings": settings,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return path
+
+
+def load(directory, version="latest"):
+    """Read baseline ``version``, or the most recently created one for ``"latest"``."""
+    if version == "latest":
+        documents = [_read(path) for path in glob.glob(os.path.join(directory, "*.json"))]
+        if not documents:
+            raise BaselineError(f"no baselines in {directory}")
+        return max(documents, key=lambda document: document["created"])
+    path = path_for(directory, version)
+    if not os.path.exists(path):
+        raise BaselineError(f"baseline {version} not found at {path}")
+    return _read(path)
+
+
+def _read(path):
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("schema") != SCHEMA:
+        raise BaselineError(f"{path} has baseline schema {document.get('schema')}, expected {SCHEMA}")
+    return document
+
+
+def compare(baseline, results, threshold=0.2, min_delta_ms=1.0):
+    """Per-operation p95 comparison against ``baseline``.
+
+    An operation regresses when its p95 grew by more than ``threshold`` (a
+    fraction) and by more than ``min_delta_ms``, so sub-millisecond jitter on
+    fast calls does not trip the gate. Returns ``(rows, regressed_names)``.
+    """
+    rows = []
+    regressed = []
+    old_results = baseline["results"]
+    for name in sorted(set(old_results) | set(results)):
+        old, new = old_results.get(name), results.get(name)
+        row = {"operation": name, "old_p95_ms": old and old["p95_ms"], "new_p95_ms": new and new["p95_ms"]}
+        if old is None:
+            row["status"] = "new"
+        elif new is None:
+            row["status"] = "not run"
+        else:
+            delta = new["p95_ms"] - old["p95_ms"]
+            row["change"] = delta / old["p95_ms"] if old["p95_ms"] else 0.0
+            if delta > min_delta_ms and row["change"] > threshold:
+                row["status"] = "REGRESSED"
+                regressed.append(name)
+            elif -delta > min_delta_ms and -row["change"] > threshold:
+                row["status"] = "improved"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows, regressed
+
+
+def format_diff(rows, baseline_version):
+    lines = [f"p95 against baseline {baseline_version}:",
+             f"{'operation':<32} {'baseline ms':>12} {'current ms':>11} {'change':>8}  status"]
+    for row in rows:
+        old = f"{row['old_p95_ms']:.2f}" if row["old_p95_ms"] is not None else "-"
+        new = f"{row['new_p95_ms']:.2f}" if row["new_p95_ms"] is not None else "-"
+        change = f"{row['change'] * 100:+.0f}%" if "change" in row else ""
+        lines.append(f"{row['operation']:<32} {old:>12} {new:>11} {change:>8}  {row['status']}")
+    return "\n".join(lines)
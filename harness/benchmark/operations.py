@@ -0,0 +1,190 @@
+import logging
+import time
+import uuid
+
+from harness.fixtures import BASE_CUSTOMER, BASE_PRODUCT, FixtureError, schedule, unique
+from harness.httpClient import get_session
+from harness.latency import Histogram
+
+CUSTOMER_CHILDREN = {
+    "tasks": {"description": "Follow up call", "due_date": "2023-12-31"},
+    "complaints": {"description": "Product not delivered", "date": "2023-11-30"},
+    "interactions": {"type": "Email", "content": "Sent product catalog", "date": "2023-10-10"},
+    "notes": {"content": "Customer prefers email communication", "date": "2023-10-15"},
+    "attachments": {"filename": "contract.pdf", "filetype": "application/pdf",
+                    "content": "base64_encoded_content_here"},
+    "custom_fields": {"field_name": "Preferred Language", "field_value": "English"},
+}
+
+
+class Operation:
+    """One timed API call, with untimed setup before it and cleanup after it.
+
+    ``path`` is formatted with the run context (``customer_id``,
+    ``product_id``) plus whatever ``setup`` returns. ``payload`` is called
+    with the iteration number so names stay unique. ``cleanup`` receives the
+    format values, run context included, and the response.
+    """
+
+    def __init__(self, name, method, path, payload=None, expect=200, setup=None, cleanup=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.payload = payload
+        self.expect = expect
+        self.setup = setup
+        self.cleanup = cleanup
+
+
+def _create(path, payload):
+    response = get_session().post(path, json=payload)
+    if response.status_code != 201:
+        raise FixtureError(f"Creating {path} failed with HTTP {response.status_code}: {response.text}")
+    return response.json()["id"]
+
+
+def _delete_created(path):
+    def cleanup(values, response):
+        if response.status_code == 201:
+            get_session().delete(f"{path.format(**values)}/{response.json()['id']}")
+    return cleanup
+
+
+def _create_for(path, payload):
+    # setup hook: a fresh record for operations that consume one (delete)
+    return lambda context, n: {"id": _create(path.format(**context), payload(context, n))}
+
+
+def _shared(resource, path, payload):
+    def setup(context, n):
+        key = f"shared_{resource}"
+        if key not in context:
+            context[key] = _create(path.format(**context), payload(context, 0))
+            context.setdefault("_cleanup", []).append(f"{path.format(**context)}/{context[key]}")
+        return {"id": context[key]}
+    return setup
+
+
+def crud(resource, path, payload, update_payload):
+    """create/get/update/list/delete operations for a top-level resource.
+
+    get and update target one record created for the whole run; delete gets a
+    fresh record per iteration.
+    """
+    return [
+        Operation(f"{resource}.create", "POST", path, payload, expect=201, cleanup=_delete_created(path)),
+        Operation(f"{resource}.get", "GET", path + "/{id}", setup=_shared(resource, path, payload)),
+        Operation(f"{resource}.update", "PUT", path + "/{id}", update_payload, setup=_shared(resource, path, payload)),
+        Operation(f"{resource}.list", "GET", path),
+        Operation(f"{resource}.delete", "DELETE", path + "/{id}", expect=204, setup=_create_for(path, payload)),
+    ]
+
+
+def _name(context, text, n):
+    return unique(f"{text} {context['run']}-{n}")
+
+
+OPERATIONS = (
+    crud("customer", "/customers",
+         lambda context, n: {"name": _name(context, "Bench Customer", n),
+                             "email": unique(f"bench{context['run']}{n}@example.com"), "phone": "1234567890"},
+         lambda context, n: {"name": _name(context, "Updated Bench Customer", n),
+                             "email": unique(f"updated{context['run']}{n}@example.com"), "phone": "0987654321"})
+    + [Operation("customer.status", "PATCH", "/customers/{customer_id}/status", lambda context, n: {"status": "Active"})]
+    + crud("product", "/products",
+           lambda context, n: {"name": _name(context, "Bench Product", n), "description": "This is a test product",
+                               "price": 99.99, "stock": 100, "category": "Electronics"},
+           lambda context, n: {"name": _name(context, "Updated Bench Product", n),
+                               "description": "This is an updated test product", "price": 79.99, "stock": 50,
+                               "category": "Electronics"})
+    + crud("inventory", "/inventory",
+           lambda context, n: {"product_id": context["product_id"], "quantity": 50, "location": "Warehouse A"},
+           lambda context, n: {"product_id": context["product_id"], "quantity": 75, "location": "Warehouse B"})
+    + crud("order", "/orders",
+           lambda context, n: {"customer_id": context["customer_id"], "product_id": context["product_id"],
+                               "quantity": 1, "total_price": 99.99, "status": "Pending"},
+           lambda context, n: {"customer_id": context["customer_id"], "product_id": context["product_id"],
+                               "quantity": 2, "total_price": 199.98, "status": "Shipped"})
+    + crud("opportunity", "/opportunities",
+           lambda context, n: {"customer_id": context["customer_id"], "title": "New Sales Opportunity",
+                               "description": "Potential deal", "value": 50000, "status": "Open"},
+           lambda context, n: {"customer_id": context["customer_id"], "title": "Updated Sales Opportunity",
+                               "description": "Updated potential deal", "value": 75000, "status": "Negotiation"})
+    + crud("user", "/users",
+           lambda context, n: {"username": unique(f"benchuser{context['run']}{n}"),
+                               "email": unique(f"benchuser{context['run']}{n}@example.com"),
+                               "password": "password123", "role": "user"},
+           lambda context, n: {"username": unique(f"benchupdated{context['run']}{n}"),
+                               "email": unique(f"benchupdated{context['run']}{n}@example.com"), "role": "admin"})
+    + [operation for child, payload in CUSTOMER_CHILDREN.items() for operation in (
+        Operation(f"customer.{child}.create", "POST", f"/customers/{{customer_id}}/{child}",
+                  lambda context, n, payload=payload: payload, expect=201,
+                  cleanup=_delete_created(f"/customers/{{customer_id}}/{child}")),
+        Operation(f"customer.{child}.list", "GET", f"/customers/{{customer_id}}/{child}"),
+    )]
+)
+
+
+def select(patterns=None):
+    """Operations whose name equals a pattern or starts with ``pattern.``; all of them by default."""
+    if not patterns:
+        return list(OPERATIONS)
+    selected = [operation for operation in OPERATIONS
+                if any(operation.name == pattern or operation.name.startswith(f"{pattern}.") for pattern in patterns)]
+    if not selected:
+        raise ValueError(f"no benchmark operations match {', '.join(patterns)}")
+    return selected
+
+
+def _summary(histogram, errors):
+    return {
+        "count": histogram.count,
+        "errors": errors,
+        "mean_ms": histogram.total / histogram.count / 1000 if histogram.count else 0.0,
+        "p50_ms": histogram.percentile(50) / 1000,
+        "p95_ms": histogram.percentile(95) / 1000,
+        "p99_ms": histogram.percentile(99) / 1000,
+        "max_ms": histogram.max / 1000,
+    }
+
+
+def run(operations, iterations=50, warmup=5, session=None):
+    """Time each operation ``iterations`` times after ``warmup`` untimed calls.
+
+    Returns ``{name: {count, errors, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}``.
+    The customer and product the operations hang off are created once for the
+    run and deleted at the end.
+    """
+    session = session or get_session()
+    context = {"run": uuid.uuid4().hex[:8]}
+    roots = schedule([BASE_CUSTOMER, BASE_PRODUCT], lambda fixture, ids: fixture.create(session, ids))
+    context["customer_id"], context["product_id"] = roots[BASE_CUSTOMER], roots[BASE_PRODUCT]
+    results = {}
+    try:
+        for operation in operations:
+            histogram = Histogram()
+            errors = 0
+            for n in range(warmup + iterations):
+                values = operation.setup(context, n) if operation.setup else {}
+                payload = operation.payload(context, n) if operation.payload else None
+                url = operation.path.format(**context, **values)
+                start = time.perf_counter()
+                response = session.request(operation.method, url, json=payload)
+                elapsed = time.perf_counter() - start
+                if operation.cleanup:
+                    operation.cleanup({**context, **values}, response)
+                if n < warmup:
+                    continue
+                if response.status_code != operation.expect:
+                    errors += 1
+                    logging.warning("%s returned HTTP %s: %s", operation.name, response.status_code, response.text)
+                    continue
+                histogram.record(elapsed * 1_000_000)
+            results[operation.name] = _summary(histogram, errors)
+            logging.info("Benchmarked %s: p95 %.2f ms", operation.name, results[operation.name]["p95_ms"])
+    finally:
+        for path in reversed(context.get("_cleanup", [])):
+            session.delete(path)
+        BASE_PRODUCT.delete(session, context["product_id"])
+        BASE_CUSTOMER.delete(session, context["customer_id"])
+    return results
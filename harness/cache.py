@@ -0,0 +1,150 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from requests.models import PreparedRequest
+from requests.structures import CaseInsensitiveDict
+
+from harness import config
+
+# Cache-Control directives that forbid reuse, and the one that bounds freshness
+_NO_STORE = re.compile(r"\b(no-store|private)\b")
+_NO_CACHE = re.compile(r"\bno-cache\b")
+_MAX_AGE = re.compile(r"\bmax-age=(\d+)")
+
+
+def _segments(path):
+    return tuple(segment for segment in path.split("/") if segment)
+
+
+class CacheEntry:
+    """What a response was, independent of the client type that received it."""
+
+    def __init__(self, response, expires):
+        self.status = response.status_code
+        self.headers = CaseInsensitiveDict(response.headers)
+        self.content = response.content
+        self.url = str(response.url)
+        self.expires = expires
+        self.segments = _segments(urlsplit(self.url).path)
+
+    def build(self, response_type):
+        return response_type(self.status, self.headers.copy(), self.content, self.url)
+
+
+class ResponseCache:
+    """Client-side cache of GET responses with LRU eviction and a TTL.
+
+    Fresh entries are answered without a request. Stale entries that carry an
+    ``ETag`` or ``Last-Modified`` are revalidated with ``If-None-Match`` /
+    ``If-Modified-Since``, and a 304 refreshes them. A write to a path drops
+    every entry on that path, its parents (the lists that contain it) and its
+    children, so a GET after a PUT never sees the old record.
+
+    Entries hold the status, headers and body only, so the sync session and
+    the aiohttp client can share a cache: each passes ``response_type``, a
+    ``(status, headers, content, url)`` callable that rebuilds its own
+    response class on a hit.
+    """
+
+    def __init__(self, max_entries=None, ttl=None, max_body=None):
+        self.max_entries = config.CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl = config.CACHE_TTL if ttl is None else ttl
+        self.max_body = config.CACHE_MAX_BODY if max_body is None else max_body
+        self.hits = self.revalidated = self.misses = self.invalidated = 0
+        # Bumped by every invalidation; a GET that was in flight across one is not stored
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url, params=None):
+        if params:
+            prepared = PreparedRequest()
+            prepared.prepare_url(url, params)
+            url = prepared.url
+        return url
+
+    def lookup(self, key, response_type):
+        """``(response, None)`` for a fresh hit, ``(None, validators)`` for a stale one, else ``(None, None)``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if time.monotonic() < entry.expires:
+                self.hits += 1
+                return entry.build(response_type), None
+            headers = entry.headers
+            validators = {}
+            if "ETag" in headers:
+                validators["If-None-Match"] = headers["ETag"]
+            if "Last-Modified" in headers:
+                validators["If-Modified-Since"] = headers["Last-Modified"]
+            # Counted as a miss until a 304 turns it into a revalidation
+            self.misses += 1
+            if not validators:
+                del self._entries[key]
+                return None, None
+            return None, validators
+
+    def revalidated_response(self, key, not_modified, response_type):
+        """The stored response refreshed by a 304, or None if it was evicted or invalidated meanwhile."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.expires = time.monotonic() + self._lifetime(not_modified)
+            self.misses -= 1
+            self.revalidated += 1
+            return entry.build(response_type)
+
+    def _lifetime(self, response):
+        cache_control = response.headers.get("Cache-Control", "")
+        if _NO_CACHE.search(cache_control):
+            return 0.0
+        max_age = _MAX_AGE.search(cache_control)
+        return min(self.ttl, float(max_age.group(1))) if max_age else self.ttl
+
+    def store(self, key, response, generation):
+        """Keep a 200 response unless the server forbids it, the body is too large to buffer
+        or a write invalidated the cache after the request was sent (``generation`` changed)."""
+        if response.status_code != 200 or _NO_STORE.search(response.headers.get("Cache-Control", "")):
+            return
+        length = response.headers.get("Content-Length")
+        if length is None or int(length) > self.max_body:
+            return
+        # Streamed responses are read here, by the entry; iter_content() then replays the buffered body
+        entry = CacheEntry(response, time.monotonic() + self._lifetime(response))
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, url):
+        """Drop entries on ``url``'s path, its parent collections and its children."""
+        written = _segments(urlsplit(url).path)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if entry.segments[:len(written)] == written[:len(entry.segments)]]
+            for key in stale:
+                del self._entries[key]
+            self.invalidated += len(stale)
+            self.generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "revalidated": self.revalidated,
+                    "misses": self.misses, "invalidated": self.invalidated,
+                    "hit_ratio": (self.hits + self.revalidated) / lookups if lookups else 0.0}
@@ -0,0 +1,479 @@
+import argparse
+import atexit
+import collections
+import glob
+import hashlib
+import logging
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from harness import codec, config
+from harness.latency import Histogram, LatencyRecorder, endpoint_key
+
+# Segment layout: MAGIC, then entries of <u32 length><zlib blob>, then on close
+# the zlib-compressed index, its <u64 offset> and FOOTER. A segment without a
+# footer (the recording process died) is re-indexed by scanning its entries.
+MAGIC = b"CRMCAS\x01\n"
+FOOTER = b"CRMIDX\x01\n"
+ENTRY_HEADER = struct.Struct("<I")
+BLOB_HEADER = struct.Struct("<II")
+INDEX_POINTER = struct.Struct("<Q")
+
+# Credentials never reach the cassette
+REDACTED_HEADERS = frozenset(["token", "authorization", "cookie", "set-cookie"])
+
+# Worker and isolation tags from harness.fixtures.unique() differ between runs
+UNIQUE_TAG = re.compile(rb"-[wi]\d+")
+WORKER_TAG = re.compile(rb"-w\d+")
+# Same variable as harness.fixtures.WORKER_TAG_ENV, which imports this module indirectly
+WORKER_TAG_ENV = "CRM_WORKER_TAG"
+
+
+class CassetteError(Exception):
+    """Raised when a cassette segment is corrupt or a cassette mode is misconfigured."""
+
+
+def request_key(method, url):
+    """``POST http://host/api/orders?b=2&a=1`` -> ``POST /api/orders?a=1&b=2``; host and query order ignored."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.path}{'?' + query if query else ''}"
+
+
+def body_digest(body):
+    if body is None:
+        return ""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not isinstance(body, (bytes, bytearray)):
+        # Streamed bodies (attachment uploads) are not recorded
+        return "stream"
+    return hashlib.blake2b(UNIQUE_TAG.sub(b"", bytes(body)), digest_size=8).hexdigest()
+
+
+class SegmentWriter:
+    """Appends entries to one segment file; each process records into its own segment."""
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._index = {}
+
+    def append(self, meta, request_body, response_body):
+        meta_bytes = codec.dumps(meta)
+        blob = zlib.compress(BLOB_HEADER.pack(len(meta_bytes), len(request_body)) + meta_bytes
+                             + request_body + response_body)
+        with self._lock:
+            if self._file is None:
+                return
+            offset = self._file.tell()
+            self._file.write(ENTRY_HEADER.pack(len(blob)) + blob)
+            self._index.setdefault(meta["key"], []).append([offset, meta["seq"], meta["body"], meta["shard"]])
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            index_offset = self._file.tell()
+            self._file.write(zlib.compress(codec.dumps(self._index)))
+            self._file.write(INDEX_POINTER.pack(index_offset) + FOOTER)
+            self._file.close()
+            self._file = None
+
+
+class Segment:
+    """Read side of a segment: the index is loaded up front, entries are read on demand.
+
+    ``index`` maps each request key to ``[offset, sequence, body digest,
+    shard]`` postings, which is all replay needs to pick a recording.
+    Segments written before shards were recorded have three-item postings.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        size = os.fstat(self._fd).st_size
+        if os.pread(self._fd, len(MAGIC), 0) != MAGIC:
+            raise CassetteError(f"{path} is not a cassette segment")
+        tail = os.pread(self._fd, INDEX_POINTER.size + len(FOOTER), max(0, size - INDEX_POINTER.size - len(FOOTER)))
+        if tail.endswith(FOOTER):
+            index_offset = INDEX_POINTER.unpack(tail[:INDEX_POINTER.size])[0]
+            raw = os.pread(self._fd, size - len(tail) - index_offset, index_offset)
+            self.index = codec.loads(zlib.decompress(raw))
+        else:
+            self.index = self._scan(size)
+
+    def _scan(self, size):
+        index = {}
+        offset = len(MAGIC)
+        while offset + ENTRY_HEADER.size <= size:
+            length = ENTRY_HEADER.unpack(os.pread(self._fd, ENTRY_HEADER.size, offset))[0]
+            if offset + ENTRY_HEADER.size + length > size:
+                break  # Truncated last entry
+            try:
+                meta = self.read(offset)[0]
+            except zlib.error:
+                break
+            index.setdefault(meta["key"], []).append([offset, meta["seq"], meta["body"], meta.get("shard")])
+            offset += ENTRY_HEADER.size + length
+        return index
+
+    def read(self, offset):
+        """Return ``(meta, request_body, response_body)`` of the entry at ``offset``."""
+        length = ENTRY_HEADER.unpack(os.pread(self._fd, ENTRY_HEADER.size, offset))[0]
+        blob = zlib.decompress(os.pread(self._fd, length, offset + ENTRY_HEADER.size))
+        meta_length, request_length = BLOB_HEADER.unpack_from(blob)
+        start = BLOB_HEADER.size
+        meta = codec.loads(blob[start:start + meta_length])
+        start += meta_length
+        return meta, blob[start:start + request_length], blob[start + request_length:]
+
+    def entries(self):
+        for postings in self.index.values():
+            for posting in postings:
+                yield self.read(posting[0])
+
+    def shards(self):
+        """The runner shards recorded in this segment, in the order they ran."""
+        first = {}
+        for postings in self.index.values():
+            for posting in postings:
+                shard = posting[3] if len(posting) > 3 else None
+                if shard is not None:
+                    first[shard] = min(first.get(shard, posting[1]), posting[1])
+        return sorted(first, key=first.get)
+
+
+def _segment_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, "*.cas")))
+
+
+class Recordings:
+    """Replay order over the recordings of some segments.
+
+    Repeated requests (a GET before and after an update) are answered in
+    recorded order; once a key's recordings are used up, the last one
+    repeats. Among unused recordings, one whose body matches is preferred.
+    """
+
+    def __init__(self, segments):
+        self._entries = {}
+        for segment in segments:
+            for key, postings in segment.index.items():
+                self._entries.setdefault(key, []).extend(
+                    (posting[1], posting[2], segment, posting[0]) for posting in postings)
+        self._queues = {}
+        for key, candidates in self._entries.items():
+            candidates.sort(key=lambda candidate: candidate[0])
+            by_digest = {}
+            for index, candidate in enumerate(candidates):
+                by_digest.setdefault(candidate[1], collections.deque()).append(index)
+            self._queues[key] = (collections.deque(range(len(candidates))), by_digest, set())
+
+    def pick(self, key, digest):
+        """``(segment, offset)`` of the recording to answer with, or None when the key was never recorded."""
+        candidates = self._entries.get(key)
+        if not candidates:
+            return None
+        in_order, by_digest, used = self._queues[key]
+        choice = self._next_unused(by_digest.get(digest), used)
+        if choice is None:
+            choice = self._next_unused(in_order, used)
+        if choice is None:
+            choice = len(candidates) - 1
+        used.add(choice)
+        return candidates[choice][2:]
+
+    @staticmethod
+    def _next_unused(queue, used):
+        while queue:
+            index = queue.popleft()
+            if index not in used:
+                return index
+        return None
+
+
+class Cassette:
+    """Every segment in a cassette directory, for replay.
+
+    Parallel workers create records from identical bodies (unique() tags are
+    ignored when matching), so merging their segments would hand one worker
+    the IDs another was given. A worker replaying the shards of one recorded
+    segment therefore selects it with ``select()`` and is answered from it
+    alone; callers that select nothing are answered from all segments.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = [Segment(path) for path in _segment_paths(directory)]
+        if not self.segments:
+            raise CassetteError(f"no recordings in {directory}")
+        self._lock = threading.Lock()
+        self._all = Recordings(self.segments)
+        self._selected = None
+        self.misses = 0
+
+    def select(self, path=None):
+        """Answer from the segment at ``path`` from now on, or from all segments when it is None."""
+        with self._lock:
+            if path is None:
+                self._selected = None
+                return
+            segments = [segment for segment in self.segments if segment.path == path]
+            if not segments:
+                raise CassetteError(f"{path} is not a segment of {self.directory}")
+            self._selected = Recordings(segments)
+
+    def shard_groups(self, shards):
+        """Split ``shards`` into ``(segment path, shards)`` groups that each replay in one worker.
+
+        Each group holds the shards one recording process ran, in the order it
+        ran them. Shards nothing recorded form groups of their own with no
+        segment.
+        """
+        groups = []
+        remaining = list(shards)
+        for segment in self.segments:
+            recorded = [shard for shard in segment.shards() if shard in remaining]
+            if recorded:
+                groups.append((segment.path, recorded))
+                remaining = [shard for shard in remaining if shard not in recorded]
+        return groups + [(None, [shard]) for shard in remaining]
+
+    def lookup(self, method, url, body):
+        """Return ``(meta, response_body)`` or None when nothing was recorded for this request."""
+        key = request_key(method, url)
+        with self._lock:
+            found = (self._selected or self._all).pick(key, body_digest(body))
+            if found is None:
+                self.misses += 1
+                return None
+        segment, offset = found
+        meta, _, response_body = segment.read(offset)
+        return meta, response_body
+
+
+def _build_response(request, status, headers, content):
+    response = requests.Response()
+    response.status_code = status
+    try:
+        response.reason = HTTPStatus(status).phrase
+    except ValueError:
+        response.reason = ""
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    # Lets iter_content() replay the body for streamed reads
+    response._content_consumed = True
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class RecordingAdapter(BaseAdapter):
+    """Wraps a transport adapter and writes every exchange through it to a segment."""
+
+    def __init__(self, inner, writer=None):
+        super().__init__()
+        self.inner = inner
+        self.writer = writer
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        response = self.inner.send(request, **kwargs)
+        # Reading the body here is part of the exchange being timed
+        content = response.content
+        elapsed = time.perf_counter() - start
+        writer = self.writer or get_writer()
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        recorded_body = bytes(body) if isinstance(body, (bytes, bytearray)) else b""
+        writer.append({
+            "key": request_key(request.method, request.url),
+            "seq": next_sequence(),
+            "shard": _shard,
+            "body": body_digest(body),
+            "method": request.method,
+            "url": request.url,
+            "request_headers": {name: value for name, value in request.headers.items()
+                                if name.lower() not in REDACTED_HEADERS},
+            "status": response.status_code,
+            "headers": {name: value for name, value in response.headers.items()
+                        if name.lower() not in REDACTED_HEADERS},
+            "elapsed": elapsed,
+            "server_timing": response.headers.get("Server-Timing"),
+            "recorded_at": time.time(),
+        }, recorded_body, content)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers from a Cassette, immediately or after each exchange's recorded duration."""
+
+    def __init__(self, cassette, timing="fast"):
+        super().__init__()
+        self.cassette = cassette
+        self.timing = timing
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        start = time.perf_counter()
+        found = self.cassette.lookup(request.method, request.url, request.body)
+        if found is None:
+            logging.warning("No recorded response for %s", request_key(request.method, request.url))
+            payload = codec.dumps({"error": f"no recorded response for {request_key(request.method, request.url)}"})
+            return _build_response(request, 404, {"Content-Type": "application/json"}, payload)
+        meta, content = found
+        if self.timing == "original":
+            remaining = meta["elapsed"] - (time.perf_counter() - start)
+            if remaining > 0:
+                time.sleep(remaining)
+        # Bodies echo names built by unique() in the recording worker; give them this worker's tag
+        worker_tag = os.environ.get(WORKER_TAG_ENV)
+        if worker_tag:
+            content = WORKER_TAG.sub(b"-" + worker_tag.encode("ascii"), content)
+        headers = {name: value for name, value in meta["headers"].items()
+                   if name.lower() not in ("content-encoding", "transfer-encoding")}
+        headers["Content-Length"] = str(len(content))
+        return _build_response(request, meta["status"], headers, content)
+
+    def close(self):
+        pass
+
+
+_sequence_lock = threading.Lock()
+_sequence = 0
+# Runner shard whose exchanges are being recorded; replay keeps each segment's shards together
+_shard = None
+
+
+def next_sequence():
+    # Recording order within a process; replay serves repeated keys in this order
+    global _sequence
+    with _sequence_lock:
+        _sequence += 1
+        return _sequence
+
+
+def set_shard(name):
+    """Label the exchanges this process records from now on as belonging to shard ``name``."""
+    global _shard
+    _shard = name
+
+
+_writer = None
+_writer_lock = threading.Lock()
+_cassette = None
+
+
+def get_writer():
+    """Return this process's SegmentWriter in the CRM_CASSETTE directory, opening it on first use."""
+    global _writer
+    with _writer_lock:
+        # A forked worker must not append to its parent's segment
+        if _writer is None or _writer.pid != os.getpid():
+            os.makedirs(config.CASSETTE, exist_ok=True)
+            path = os.path.join(config.CASSETTE, f"{int(time.time() * 1000)}-{os.getpid()}.cas")
+            _writer = SegmentWriter(path)
+        return _writer
+
+
+def close_writer():
+    """Write the index of this process's segment; registered at exit and by the runner."""
+    with _writer_lock:
+        if _writer is not None and _writer.pid == os.getpid():
+            _writer.close()
+
+
+atexit.register(close_writer)
+
+
+def get_cassette():
+    global _cassette
+    with _writer_lock:
+        if _cassette is None:
+            _cassette = Cassette(config.CASSETTE)
+        return _cassette
+
+
+def install(session):
+    """Wrap or replace ``session``'s adapters for CRM_CASSETTE_MODE; a no-op when it is unset."""
+    if not config.CASSETTE_MODE:
+        return
+    if not config.CASSETTE:
+        raise CassetteError("CRM_CASSETTE_MODE needs CRM_CASSETTE to name a cassette directory")
+    if config.CASSETTE_MODE not in ("record", "replay"):
+        raise CassetteError(f"unknown CRM_CASSETTE_MODE {config.CASSETTE_MODE!r}; expected record or replay")
+    replay = ReplayAdapter(get_cassette(), config.CASSETTE_TIMING) if config.CASSETTE_MODE == "replay" else None
+    for prefix, adapter in list(session.adapters.items()):
+        session.mount(prefix, replay or RecordingAdapter(adapter))
+
+
+def summarize(directory):
+    """Per-endpoint histograms of recorded durations plus status counts, keyed like harness.latency."""
+    histograms = {}
+    statuses = {}
+    for path in _segment_paths(directory):
+        for meta, _, _ in Segment(path).entries():
+            key = endpoint_key(meta["method"], meta["url"])
+            histograms.setdefault(key, Histogram()).record(meta["elapsed"] * 1_000_000)
+            statuses.setdefault(key, {}).setdefault(str(meta["status"]), 0)
+            statuses[key][str(meta["status"])] += 1
+    return histograms, statuses
+
+
+def compare(baseline_dir, candidate_dir):
+    """Lines describing per-endpoint p50/p95 changes and status-code differences between two cassettes."""
+    baseline, baseline_statuses = summarize(baseline_dir)
+    candidate, candidate_statuses = summarize(candidate_dir)
+    lines = [f"{'endpoint':<50} {'p50 ms':>15} {'p95 ms':>15} {'change p95':>11}  statuses"]
+    for key in sorted(set(baseline) | set(candidate)):
+        old, new = baseline.get(key, Histogram()), candidate.get(key, Histogram())
+        old_p50, new_p50 = old.percentile(50) / 1000, new.percentile(50) / 1000
+        old_p95, new_p95 = old.percentile(95) / 1000, new.percentile(95) / 1000
+        change = f"{(new_p95 - old_p95) / old_p95 * 100:+.0f}%" if old_p95 else "new"
+        old_statuses, new_statuses = baseline_statuses.get(key, {}), candidate_statuses.get(key, {})
+        status_note = "" if old_statuses == new_statuses else f"{old_statuses} -> {new_statuses}"
+        lines.append(f"{key:<50} {old_p50:>7.2f}/{new_p50:<7.2f} {old_p95:>7.2f}/{new_p95:<7.2f} "
+                     f"{change:>11}  {status_note}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and compare recorded CRM cassettes.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    summary = subparsers.add_parser("summary", help="per-endpoint recorded latency")
+    summary.add_argument("cassette")
+    diff = subparsers.add_parser("compare", help="compare a candidate recording against a baseline")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    if args.command == "summary":
+        latency = LatencyRecorder()
+        latency.histograms, _ = summarize(args.cassette)
+        sys.stdout.write(latency.format_table())
+    else:
+        print("\n".join(compare(args.baseline, args.candidate)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import argparse
+import json
+import sys
+import timeit
+
+from harness import config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - optional speedup
+    ujson = None
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _ujson_dumps(obj):
+    return ujson.dumps(obj).encode("utf-8")
+
+
+CODECS = {"json": (_stdlib_dumps, json.loads)}
+if ujson is not None:
+    CODECS["ujson"] = (_ujson_dumps, ujson.loads)
+if orjson is not None:
+    CODECS["orjson"] = (orjson.dumps, orjson.loads)
+
+# Fastest first; "auto" picks the first one installed
+PREFERENCE = ("orjson", "ujson", "json")
+
+
+def select(name=None):
+    """Return ``(name, dumps, loads)`` for ``name`` or, for ``"auto"``, the fastest installed codec."""
+    name = name or config.JSON_CODEC
+    if name == "auto":
+        name = next(candidate for candidate in PREFERENCE if candidate in CODECS)
+    if name not in CODECS:
+        raise ValueError(f"JSON codec {name!r} is not installed; available: {', '.join(sorted(CODECS))}")
+    return (name, *CODECS[name])
+
+
+# dumps(obj) -> UTF-8 JSON bytes ready to send as a body; loads(bytes or str) -> object
+NAME, dumps, loads = select()
+
+
+# Representative bodies per endpoint, shaped like the suites' payloads
+_CUSTOMER = {"id": 101, "name": "Test Customer-w1234", "email": "testcustomer-w1234@example.com",
+             "phone": "1234567890", "status": "Active"}
+_PRODUCT = {"id": 202, "name": "Order Test Product-w1234", "description": "Product for order test",
+            "price": 99.99, "stock": 100, "category": "Electronics"}
+_ORDER = {"id": 303, "customer_id": 101, "product_id": 202, "quantity": 1, "total_price": 99.99,
+          "status": "Pending"}
+_OPPORTUNITY = {"id": 404, "customer_id": 101, "title": "New Sales Opportunity",
+                "description": "Potential deal", "value": 50000, "status": "Open"}
+
+SAMPLES = {
+    "POST /customers": (_CUSTOMER, _CUSTOMER),
+    "POST /products": (_PRODUCT, _PRODUCT),
+    "POST /orders": (_ORDER, _ORDER),
+    "POST /opportunities": (_OPPORTUNITY, _OPPORTUNITY),
+    "GET /customers": (None, [dict(_CUSTOMER, id=index) for index in range(100)]),
+    "GET /orders": (None, [dict(_ORDER, id=index) for index in range(1000)]),
+}
+
+
+def benchmark(codecs=None, number=2000):
+    """Microseconds to encode each sample request and decode its response, per endpoint and codec."""
+    rows = []
+    for endpoint, (request, response) in SAMPLES.items():
+        for name in codecs or sorted(CODECS):
+            dump, load = CODECS[name]
+            encoded = dump(response)
+            # Large list responses get fewer rounds so the run stays short
+            rounds = max(20, number // max(1, len(encoded) // 1000))
+            encode_us = timeit.timeit(lambda: dump(request), number=rounds) / rounds * 1e6 if request else 0.0
+            decode_us = timeit.timeit(lambda: load(encoded), number=rounds) / rounds * 1e6
+            rows.append({"endpoint": endpoint, "codec": name, "bytes": len(encoded),
+                         "encode_us": encode_us, "decode_us": decode_us})
+    return rows
+
+
+def format_rows(rows):
+    baseline = {row["endpoint"]: row["encode_us"] + row["decode_us"] for row in rows if row["codec"] == "json"}
+    lines = [f"{'endpoint':<22} {'codec':<7} {'bytes':>7} {'encode us':>10} {'decode us':>10} {'speedup':>8}"]
+    for row in rows:
+        total = row["encode_us"] + row["decode_us"]
+        speedup = baseline.get(row["endpoint"], total) / total if total else 0.0
+        lines.append(f"{row['endpoint']:<22} {row['codec']:<7} {row['bytes']:>7} {row['encode_us']:>10.2f} "
+                     f"{row['decode_us']:>10.2f} {speedup:>7.1f}x")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare JSON codecs on the CRM request and response bodies.")
+    parser.add_argument("--codecs", help=f"comma separated from {', '.join(sorted(CODECS))}")
+    parser.add_argument("--number", type=int, default=2000, help="rounds per small body")
+    args = parser.parse_args(argv)
+    print(f"active codec: {NAME}")
+    print(format_rows(benchmark(args.codecs.split(",") if args.codecs else None, args.number)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import os
+
+# Answer every call from the in-memory stand-in (harness.standIn) instead of a
+# real environment; no sockets are opened for the shared session
+STANDIN = os.environ.get("CRM_STANDIN", "") not in ("", "0")
+STANDIN_URL = "http://crm-standin.local/api"
+STANDIN_LATENCY = float(os.environ.get("CRM_STANDIN_LATENCY", "0"))
+STANDIN_ERROR_RATE = float(os.environ.get("CRM_STANDIN_ERROR_RATE", "0"))
+
+# Constants for the CRM API, overridable from the environment so every suite
+# picks up the same target without editing the test modules
+BASE_URL = STANDIN_URL if STANDIN else os.environ.get("CRM_BASE_URL", "http://crmprod.baidu.com/api")
+HEADERS = {"Content-Type": "application/json"}
+
+# Connection pool and retry settings for the shared HTTP session
+POOL_SIZE = int(os.environ.get("CRM_POOL_SIZE", "10"))
+MAX_RETRIES = int(os.environ.get("CRM_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.environ.get("CRM_BACKOFF_FACTOR", "0.3"))
+TIMEOUT = float(os.environ.get("CRM_TIMEOUT", "10"))
+
+# Resilience layer around every call of the shared session (harness.resilience):
+# longest backoff sleep, retries allowed per request sent, consecutive failures
+# that open an endpoint's circuit (0 disables breakers) and seconds before it
+# is probed again, and whether creates carry an Idempotency-Key so they can be
+# retried too (only safe when the server deduplicates on it; the stand-in does)
+BACKOFF_MAX = float(os.environ.get("CRM_BACKOFF_MAX", "10"))
+RETRY_BUDGET = float(os.environ.get("CRM_RETRY_BUDGET", "0.2"))
+BREAKER_FAILURES = int(os.environ.get("CRM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("CRM_BREAKER_COOLDOWN", "5"))
+IDEMPOTENCY_KEYS = os.environ.get("CRM_IDEMPOTENCY_KEYS", "1" if STANDIN else "0") not in ("", "0")
+
+# AIMD limit on in-flight calls: on/off, upper bound, and how far the smoothed
+# latency may rise above the best seen (as a factor, and only once above the
+# floor in seconds) before the limit is halved
+ADAPTIVE_LIMIT = os.environ.get("CRM_ADAPTIVE_LIMIT", "1") not in ("", "0")
+LIMIT_MAX = int(os.environ.get("CRM_LIMIT_MAX", "100"))
+LIMIT_TOLERANCE = float(os.environ.get("CRM_LIMIT_TOLERANCE", "2"))
+LIMIT_LATENCY_FLOOR = float(os.environ.get("CRM_LIMIT_LATENCY_FLOOR", "0.05"))
+
+# Path prefix for the end-of-run latency report (<prefix>.json and <prefix>.txt)
+LATENCY_REPORT = os.environ.get("CRM_LATENCY_REPORT")
+
+# Record every exchange into, or replay it from, a cassette directory (harness.cassette).
+# Replay answers immediately ("fast") or after each exchange's recorded duration ("original")
+CASSETTE = os.environ.get("CRM_CASSETTE", "")
+CASSETTE_MODE = os.environ.get("CRM_CASSETTE_MODE", "")
+CASSETTE_TIMING = os.environ.get("CRM_CASSETTE_TIMING", "fast")
+
+# uuap login whose token is sent with every request; off by default for the stand-in and replays
+AUTH = os.environ.get("CRM_AUTH", "0" if STANDIN or CASSETTE_MODE == "replay" else "1") not in ("", "0")
+UUAP_URL = os.environ.get("CRM_UUAP_URL", "http://uat.uuap.baidu.com/behavior/needBehaviorVerify")
+UUAP_USERNAME = os.environ.get("CRM_UUAP_USERNAME", "uuapTest")
+UUAP_PASSWORD = os.environ.get("CRM_UUAP_PASSWORD", "Baidu@uuapTest")
+TOKEN_TTL = float(os.environ.get("CRM_TOKEN_TTL", "1800"))
+TOKEN_REFRESH_MARGIN = float(os.environ.get("CRM_TOKEN_REFRESH_MARGIN", "60"))
+TOKEN_RETRY_INTERVAL = float(os.environ.get("CRM_TOKEN_RETRY_INTERVAL", "30"))
+# Optional file shared by parallel workers so only one of them logs in
+TOKEN_CACHE = os.environ.get("CRM_TOKEN_CACHE", "")
+
+# Opt-in client-side cache of GET responses (harness.cache) for modelling a
+# caching client under load: on/off, entries kept (LRU), seconds an entry is
+# served without asking the server, and the largest body buffered for caching
+CACHE = os.environ.get("CRM_CACHE", "0") not in ("", "0")
+CACHE_MAX_ENTRIES = int(os.environ.get("CRM_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL = float(os.environ.get("CRM_CACHE_TTL", "5"))
+CACHE_MAX_BODY = int(os.environ.get("CRM_CACHE_MAX_BODY", str(1 << 20)))
+
+# Directory of append-only journals of every record the suites create and
+# delete (harness.journal), and whether the runner sweeps its leftovers at the
+# end of a run. Off by default for the stand-in and replays, whose records
+# never reach an environment
+JOURNAL = os.environ.get("CRM_JOURNAL", "" if STANDIN or CASSETTE_MODE == "replay" else ".crm-journal")
+JOURNAL_SWEEP = os.environ.get("CRM_JOURNAL_SWEEP", "1") not in ("", "0")
+
+# How list endpoints are paged by harness.listing: "offset", "cursor" or "none"
+PAGINATION = os.environ.get("CRM_PAGINATION", "offset")
+
+# Logging for the suites and harness (harness.logConfig): level name, "text" or
+# "json" lines, optional file instead of stderr, longest message kept, and the
+# fraction of DEBUG records written
+LOG_LEVEL = os.environ.get("CRM_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("CRM_LOG_FORMAT", "text")
+LOG_FILE = os.environ.get("CRM_LOG_FILE", "")
+LOG_MAX_LENGTH = int(os.environ.get("CRM_LOG_MAX_LENGTH", "2000"))
+LOG_DEBUG_SAMPLE = float(os.environ.get("CRM_LOG_DEBUG_SAMPLE", "1"))
+
+# JSON codec for request and response bodies (harness.codec): "auto" picks
+# orjson, then ujson, then the stdlib json module, whichever is installed first
+JSON_CODEC = os.environ.get("CRM_JSON_CODEC", "auto")
+
+# Where harness.benchmark keeps its versioned baselines, and the p95 growth
+# (fraction, and milliseconds) past which an operation counts as regressed
+BENCH_BASELINES = os.environ.get("CRM_BENCH_BASELINES", "benchmarks")
+BENCH_THRESHOLD = float(os.environ.get("CRM_BENCH_THRESHOLD", "0.2"))
+BENCH_MIN_DELTA_MS = float(os.environ.get("CRM_BENCH_MIN_DELTA_MS", "1"))
+
+# Soak runs (harness.soak): seconds per time-series sample, samples kept in
+# memory (a day at the default interval), samples each trend is fitted over,
+# and the growth across that window, as a fraction of its starting level,
+# that flags a trend
+SOAK_INTERVAL = float(os.environ.get("CRM_SOAK_INTERVAL", "10"))
+SOAK_HISTORY = int(os.environ.get("CRM_SOAK_HISTORY", "8640"))
+SOAK_WINDOW = int(os.environ.get("CRM_SOAK_WINDOW", "30"))
+SOAK_TREND_THRESHOLD = float(os.environ.get("CRM_SOAK_TREND_THRESHOLD", "0.2"))
+
+# Shared secret load workers on other hosts authenticate to the controller
+# with (harness.distributed); a random one is used when only local workers run
+DISTRIBUTED_KEY = os.environ.get("CRM_DISTRIBUTED_KEY", "")
+
+# Live metrics of the shared session (harness.metrics): port of the local
+# Prometheus endpoint (unset for none, 0 for any free port) and seconds between
+# console summaries (0 for none)
+METRICS_PORT = int(os.environ["CRM_METRICS_PORT"]) if os.environ.get("CRM_METRICS_PORT") else None
+METRICS_INTERVAL = float(os.environ.get("CRM_METRICS_INTERVAL", "0"))
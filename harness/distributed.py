@@ -0,0 +1,452 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener, wait
+
+from harness import config
+from harness.fixtures import WORKER_TAG_ENV
+from harness.latency import Histogram, LatencyRecorder, format_summary, recorder
+from harness.load import DEFAULT_MIX, resolve_task, run_task
+from harness.logConfig import configure_logging
+
+KEY_ENV = "CRM_DISTRIBUTED_KEY"
+
+# No worker is ever paced slower than this, so a starved one still reports
+MIN_RATE = 0.1
+
+# Fraction of the gap to the global target handed out per interval; correcting
+# all of it at once overshoots, since the workers' reports lag their rates
+GAIN = 0.5
+
+
+def _send(conn, message, lock=None):
+    # JSON rather than pickle: a peer on another host must not be able to run code here
+    data = json.dumps(message).encode("utf-8")
+    if lock is None:
+        conn.send_bytes(data)
+        return
+    with lock:
+        conn.send_bytes(data)
+
+
+def _recv(conn):
+    return json.loads(conn.recv_bytes())
+
+
+def parse_address(text):
+    """``"host:port"`` or ``":port"`` -> ``(host, port)``."""
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class WorkerStats:
+    """Counters and a task histogram a worker accumulates between two reports."""
+
+    def __init__(self):
+        self.tasks = 0
+        self.errors = 0
+        # Starts that found every virtual user busy: the worker cannot reach its rate
+        self.skipped = 0
+        self.histogram = Histogram()
+        self.start = time.monotonic()
+
+
+def run_worker(address, authkey, interval=1.0):
+    """Connect to the controller, run the load it ships and stream back deltas until told to stop.
+
+    One dispatcher thread releases task starts at the current rate to a fixed
+    pool of virtual users, so a rate change takes effect at the next start.
+    Every ``interval`` seconds the worker sends what happened since its last
+    report: counters, the task latency histogram and the shared recorder's
+    per-endpoint histograms. All of them merge by adding, so the controller
+    can fold any number of workers together at any time.
+    """
+    conn = Client(address, authkey=authkey)
+    start = _recv(conn)
+    # Fixture names get the controller-assigned tag, unique across hosts, through unique()
+    os.environ[WORKER_TAG_ENV] = start["tag"]
+    config.POOL_SIZE = max(config.POOL_SIZE, start["users"])
+    logging.getLogger().setLevel(logging.WARNING)
+    names = list(start["mix"])
+    weights = [start["mix"][name] for name in names]
+    tasks = {name: resolve_task(name) for name in names}
+    classes = {cls for cls, _ in tasks.values()}
+    for cls in classes:
+        cls.setUpClass()
+
+    rate = [max(MIN_RATE, start["rate"])]
+    starts = queue.Queue(maxsize=start["users"])
+    stop = threading.Event()
+    send_lock = threading.Lock()
+    stats_lock = threading.Lock()
+    stats = [WorkerStats()]
+    recorder.snapshot(reset=True)
+
+    def listen():
+        while not stop.is_set():
+            try:
+                message = _recv(conn)
+            except (EOFError, OSError):
+                # Controller gone: nobody is left to report to
+                stop.set()
+                return
+            if message["type"] == "rate":
+                rate[0] = max(MIN_RATE, message["rate"])
+            elif message["type"] == "stop":
+                stop.set()
+
+    def dispatch():
+        due = time.monotonic()
+        while not stop.is_set():
+            due += 1.0 / rate[0]
+            # Far behind (e.g. after a pause) restarts the schedule instead of bursting to catch up
+            due = max(due, time.monotonic() - 1.0)
+            if stop.wait(max(0.0, due - time.monotonic())):
+                break
+            try:
+                starts.put_nowait(True)
+            except queue.Full:
+                with stats_lock:
+                    stats[0].skipped += 1
+        for _ in range(start["users"]):
+            starts.put(None)
+
+    def virtual_user(index):
+        rng = random.Random(f"{start['tag']}/{index}")
+        while starts.get() is not None:
+            if stop.is_set():
+                continue
+            name = rng.choices(names, weights)[0]
+            begin = time.perf_counter()
+            ok = run_task(*tasks[name])
+            elapsed = time.perf_counter() - begin
+            with stats_lock:
+                stats[0].tasks += 1
+                stats[0].errors += 0 if ok else 1
+                stats[0].histogram.record(elapsed * 1_000_000)
+
+    def report(kind="stats"):
+        with stats_lock:
+            current, stats[0] = stats[0], WorkerStats()
+        _send(conn, {"type": kind, "seconds": time.monotonic() - current.start, "tasks": current.tasks,
+                     "errors": current.errors, "skipped": current.skipped,
+                     "histogram": current.histogram.to_dict(), "endpoints": recorder.snapshot(reset=True)},
+              send_lock)
+
+    def reporter():
+        while not stop.wait(interval):
+            try:
+                report()
+            except OSError:
+                stop.set()
+
+    users = [threading.Thread(target=virtual_user, args=(index,), name=f"crm-dist-vu{index}")
+             for index in range(start["users"])]
+    helpers = [threading.Thread(target=target, name=f"crm-dist-{target.__name__}", daemon=True)
+               for target in (listen, dispatch, reporter)]
+    for thread in helpers + users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    helpers[2].join()
+    for cls in classes:
+        cls.doClassCleanups()
+    try:
+        report("done")
+    except OSError:
+        pass
+    conn.close()
+    return 0
+
+
+class RemoteWorker:
+    """The controller's view of one connected worker."""
+
+    def __init__(self, index, conn, rate):
+        self.index = index
+        self.conn = conn
+        self.rate = rate
+        self.achieved = None
+        self.tasks = 0
+        self.errors = 0
+        self.skipped = 0
+        # Reported since the last rebalance
+        self.interval_tasks = 0
+        self.interval_seconds = 0.0
+        self.interval_skipped = 0
+        self.connected = True
+        self.done = False
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        try:
+            _send(self.conn, message, self.lock)
+        except OSError:
+            self.connected = False
+
+
+class Controller:
+    """Ships a load mix to workers, merges their deltas live and rebalances their rates.
+
+    Workers connect over a multiprocessing socket authenticated with a shared
+    key; local ones are started by ``spawn`` and others may join from any
+    host running ``python -m harness.distributed worker``; each starts its
+    load as soon as it joins. The global
+    ``rate`` (task starts per second) is split evenly at first. Each
+    interval the controller measures every worker's achieved rate from its
+    reports; workers with idle virtual users share part of the remaining gap
+    to the target, and saturated workers are paced just above what they
+    achieve, so a host that cannot keep up stops hiding the gap from the
+    others.
+    """
+
+    def __init__(self, mix, rate, users, address=("127.0.0.1", 0), authkey=None, interval=1.0):
+        self.mix = mix
+        self.rate = rate
+        self.users = users
+        self.interval = interval
+        self.authkey = authkey or config.DISTRIBUTED_KEY.encode() or secrets.token_hex(16).encode()
+        self.listener = Listener(address, authkey=self.authkey)
+        self.address = self.listener.address
+        self.workers = []
+        self.processes = []
+        self.tasks = Histogram()
+        self.endpoints = LatencyRecorder()
+        self.timeline = []
+        self._lock = threading.Lock()
+        self._joined = threading.Condition(self._lock)
+        self._accepting = True
+        threading.Thread(target=self._accept, name="crm-dist-accept", daemon=True).start()
+
+    def _accept(self):
+        while self._accepting:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                # Closed by close(), or a peer without the key (AuthenticationError)
+                if not self._accepting:
+                    return
+                logging.warning("Rejected a worker connection: %s", e)
+                continue
+            with self._lock:
+                index = len(self.workers)
+                others = [worker for worker in self.workers if worker.connected and not worker.done]
+                # Make room for the newcomer so the assigned rates still add up to the target
+                for worker in others:
+                    worker.rate *= len(others) / (len(others) + 1)
+                    worker.send({"type": "rate", "rate": worker.rate})
+                share = max(MIN_RATE, self.rate / (len(others) + 1))
+                worker = RemoteWorker(index, conn, share)
+                worker.send({"type": "start", "tag": f"d{index}", "mix": self.mix, "rate": share,
+                             "users": self.users})
+                self.workers.append(worker)
+                self._joined.notify_all()
+            logging.info("Worker %d joined from %s", index, self.listener.last_accepted)
+
+    def spawn(self, count):
+        """Start ``count`` local worker processes that connect back to this controller."""
+        env = dict(os.environ, **{KEY_ENV: self.authkey.decode()})
+        host, port = self.address
+        for _ in range(count):
+            self.processes.append(subprocess.Popen(
+                [sys.executable, "-m", "harness.distributed", "worker", "--connect", f"{host}:{port}"],
+                env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+    def wait_for(self, count, timeout):
+        with self._joined:
+            return self._joined.wait_for(lambda: len(self.workers) >= count, timeout)
+
+    def _receive(self, worker):
+        try:
+            message = _recv(worker.conn)
+        except (EOFError, OSError):
+            worker.connected = False
+            logging.warning("Worker %d disconnected", worker.index)
+            return
+        worker.tasks += message["tasks"]
+        worker.errors += message["errors"]
+        worker.skipped += message["skipped"]
+        worker.interval_tasks += message["tasks"]
+        worker.interval_seconds += message["seconds"]
+        worker.interval_skipped += message["skipped"]
+        self.tasks.merge(Histogram.from_dict(message["histogram"]))
+        self.endpoints.merge(message["endpoints"])
+        if message["type"] == "done":
+            worker.done = True
+
+    def rebalance(self):
+        """Update each worker's achieved rate and move part of the gap to the target to workers with spare users.
+
+        A worker that skipped starts because all its virtual users were busy
+        is saturated and is paced just above what it achieves. Workers that
+        have not reported a task yet (still creating fixtures) count at their
+        assigned rate and keep it. Returns the achieved global rate.
+        """
+        with self._lock:
+            active = [worker for worker in self.workers if worker.connected and not worker.done]
+        reporting = [worker for worker in active if worker.tasks]
+        saturated = set()
+        for worker in reporting:
+            if worker.interval_seconds:
+                worker.achieved = worker.interval_tasks / worker.interval_seconds
+            if worker.interval_skipped:
+                saturated.add(worker)
+            worker.interval_tasks = worker.interval_skipped = 0
+            worker.interval_seconds = 0.0
+        total = sum(worker.achieved or 0.0 for worker in reporting)
+        spare = [worker for worker in reporting if worker not in saturated]
+        gap = self.rate - total - sum(worker.rate for worker in active if not worker.tasks)
+        for worker in reporting:
+            if worker in saturated:
+                rate = worker.achieved * 1.1
+            else:
+                rate = worker.rate + GAIN * gap / len(spare)
+            worker.rate = max(MIN_RATE, rate)
+            worker.send({"type": "rate", "rate": worker.rate})
+        return total
+
+    def run(self, duration, expect=None, join_timeout=60.0):
+        """Run for ``duration`` seconds once ``expect`` workers joined; returns the report."""
+        expect = expect or len(self.processes)
+        if not self.wait_for(expect, join_timeout):
+            logging.warning("Only %d of %d workers joined within %.0fs", len(self.workers), expect, join_timeout)
+        start = last = time.monotonic()
+        deadline = start + duration
+        stopping = False
+        while True:
+            with self._lock:
+                workers = [worker for worker in self.workers if worker.connected and not worker.done]
+            if stopping and not workers:
+                break
+            by_conn = {worker.conn: worker for worker in workers}
+            for conn in wait(list(by_conn), timeout=0.2) if by_conn else ():
+                self._receive(by_conn[conn])
+            if not by_conn:
+                time.sleep(0.2)
+            now = time.monotonic()
+            if not stopping and now - last >= self.interval:
+                achieved = self.rebalance()
+                last = now
+                point = {"t": round(now - start, 1), "workers": len(workers), "rate": achieved,
+                         "tasks": self.tasks.count, "p95_ms": self.tasks.percentile(95) / 1000}
+                self.timeline.append(point)
+                sys.stderr.write(f"{point['t']:>7.0f}s workers={point['workers']} "
+                                 f"rate={achieved:.1f}/{self.rate:g} tasks/s tasks={point['tasks']} "
+                                 f"errors={sum(worker.errors for worker in self.workers)} "
+                                 f"p95={point['p95_ms']:.1f}ms\n")
+            if not stopping and now >= deadline:
+                stopping = True
+                stop_deadline = now + 30
+                for worker in workers:
+                    worker.send({"type": "stop"})
+            if stopping and now >= stop_deadline:
+                logging.warning("Workers did not finish within 30s of being stopped")
+                break
+        elapsed = time.monotonic() - start
+        self.close()
+        return self.report(elapsed)
+
+    def close(self):
+        self._accepting = False
+        self.listener.close()
+        for worker in self.workers:
+            worker.conn.close()
+        for process in self.processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def report(self, elapsed):
+        return {
+            "elapsed": elapsed,
+            "target_rate": self.rate,
+            "tasks": self.tasks.count,
+            "errors": sum(worker.errors for worker in self.workers),
+            "per_second": self.tasks.count / elapsed if elapsed else 0.0,
+            "p50_ms": self.tasks.percentile(50) / 1000,
+            "p95_ms": self.tasks.percentile(95) / 1000,
+            "p99_ms": self.tasks.percentile(99) / 1000,
+            "workers": [{"worker": worker.index, "tasks": worker.tasks, "errors": worker.errors,
+                         "skipped": worker.skipped, "final_rate": worker.rate, "finished": worker.done}
+                        for worker in self.workers],
+            "timeline": self.timeline,
+            "endpoints": self.endpoints.summary(),
+        }
+
+
+def print_report(report, stream=sys.stderr):
+    stream.write(f"\n{'worker':>6} {'tasks':>8} {'errors':>6} {'skipped':>7} {'rate':>8}  finished\n")
+    for worker in report["workers"]:
+        stream.write(f"{worker['worker']:>6} {worker['tasks']:>8} {worker['errors']:>6} {worker['skipped']:>7} "
+                     f"{worker['final_rate']:>8.1f}  {'yes' if worker['finished'] else 'no'}\n")
+    stream.write("\n" + format_summary(report["endpoints"]))
+    stream.write(f"\n{report['tasks']} tasks, {report['errors']} errors in {report['elapsed']:.1f}s: "
+                 f"{report['per_second']:.1f} tasks/s of {report['target_rate']:g} targeted, "
+                 f"p50 {report['p50_ms']:.1f}ms p95 {report['p95_ms']:.1f}ms p99 {report['p99_ms']:.1f}ms\n")
+    saturated = [worker for worker in report["workers"] if worker["skipped"]]
+    if saturated:
+        stream.write(f"{len(saturated)} of {len(report['workers'])} workers were saturated (starts skipped with every "
+                     f"virtual user busy); add users (-u) or workers to reach the target\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m harness.distributed",
+                                     description="Generate load from many worker processes under one controller.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    controller = commands.add_parser("controller", help="ship the mix to workers and aggregate their results")
+    controller.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                            help="local worker processes to start (default: %(default)s)")
+    controller.add_argument("--expect", type=int,
+                            help="workers, local and remote, to wait for before starting (default: --workers)")
+    controller.add_argument("--listen", default="127.0.0.1:0", metavar="HOST:PORT",
+                            help="address workers connect to; use 0.0.0.0:PORT for other hosts")
+    controller.add_argument("--rate", type=float, required=True, help="global task starts per second")
+    controller.add_argument("-u", "--users", type=int, default=20, help="virtual users per worker")
+    controller.add_argument("-d", "--duration", type=float, default=60, help="seconds of load")
+    controller.add_argument("--mix", nargs="*", metavar="TASK=WEIGHT", help="override the traffic mix")
+    controller.add_argument("--report", help="also write the report to this JSON file")
+    worker = commands.add_parser("worker", help="run load for a controller (key from CRM_DISTRIBUTED_KEY)")
+    worker.add_argument("--connect", required=True, metavar="HOST:PORT", help="the controller's address")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.command == "worker":
+        key = os.environ.get(KEY_ENV) or config.DISTRIBUTED_KEY
+        if not key:
+            print(f"set {KEY_ENV} to the controller's key", file=sys.stderr)
+            return 2
+        return run_worker(parse_address(args.connect), key.encode())
+
+    if args.rate <= 0:
+        print("--rate must be above 0", file=sys.stderr)
+        return 2
+    mix = DEFAULT_MIX
+    if args.mix:
+        mix = {name: float(weight) for name, weight in (item.rsplit("=", 1) for item in args.mix)}
+    expect = args.expect or args.workers
+    coordinator = Controller(mix, args.rate, args.users, parse_address(args.listen))
+    host, port = coordinator.address
+    print(f"controller listening on {host}:{port}", file=sys.stderr, flush=True)
+    if expect > args.workers and not config.DISTRIBUTED_KEY:
+        print(f"remote workers: {KEY_ENV}={coordinator.authkey.decode()} "
+              f"python -m harness.distributed worker --connect <this host>:{port}", file=sys.stderr, flush=True)
+    coordinator.spawn(args.workers)
+    report = coordinator.run(args.duration, expect)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["tasks"] and not report["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from harness import config
+from harness.benchmark.baseline import compare
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - JSON environment files still load
+    yaml = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FanoutError(Exception):
+    """Raised when the environments to run against are missing or malformed."""
+
+
+def load_environments(path):
+    """``{name: {CRM_*: value}}`` from a YAML or JSON file.
+
+    Each environment maps setting names to values, e.g. ``base_url`` or
+    ``uuap_username``; they are passed to that environment's run as
+    ``CRM_BASE_URL``, ``CRM_UUAP_USERNAME`` and so on.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            document = json.load(f)
+        elif yaml is None:
+            raise FanoutError(f"PyYAML is needed to read {path}; install it or use a .json file")
+        else:
+            document = yaml.safe_load(f)
+    if not isinstance(document, dict) or not document:
+        raise FanoutError(f"{path} must map environment names to their settings")
+    environments = {}
+    for name, settings in document.items():
+        if isinstance(settings, str):
+            settings = {"base_url": settings}
+        environments[name] = {f"CRM_{key.upper()}": str(value) for key, value in settings.items()}
+    return environments
+
+
+def parse_environment(spec):
+    """``"pre2=http://host/api"`` -> ``("pre2", {"CRM_BASE_URL": "http://host/api"})``."""
+    name, sep, url = spec.partition("=")
+    if not sep or not name or not url:
+        raise FanoutError(f"expected NAME=BASE_URL, got {spec!r}")
+    return name, {"CRM_BASE_URL": url}
+
+
+def start_run(name, settings, directory, workers, modules):
+    """Start ``python main.py`` for one environment; returns ``(process, report_path, latency_prefix)``.
+
+    Every environment is a separate runner with its own worker processes,
+    so connection pools, uuap logins and token caches are never shared.
+    """
+    report = os.path.join(directory, f"{name}.json")
+    latency = os.path.join(directory, f"{name}-latency")
+    env = dict(os.environ)
+    env["CRM_TOKEN_CACHE"] = os.path.join(directory, f"{name}-token.json")
+    env.update(settings)
+    command = [sys.executable, os.path.join(ROOT, "main.py"), "--report", report, "--latency-report", latency]
+    if workers:
+        command += ["-j", str(workers)]
+    log = open(os.path.join(directory, f"{name}.log"), "w")
+    process = subprocess.Popen(command + list(modules), cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    return process, report, latency
+
+
+def run(environments, workers=None, modules=(), directory=None):
+    """Run the suites against every environment concurrently; returns ``{name: result}``.
+
+    A result holds the runner's exit code, its merged report and the
+    per-endpoint latency summary, or ``None`` for reports a crashed run never
+    wrote.
+    """
+    directory = directory or tempfile.mkdtemp(prefix="crm-fanout-")
+    os.makedirs(directory, exist_ok=True)
+    started = {name: start_run(name, settings, directory, workers, modules)
+               for name, settings in environments.items()}
+    results = {}
+    for name, (process, report, latency) in started.items():
+        code = process.wait()
+        results[name] = {"exit_code": code, "log": os.path.join(directory, f"{name}.log"),
+                         "report": _read(report), "latency": (_read(f"{latency}.json") or {}).get("summary", {})}
+    return results
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def test_statuses(results):
+    """``{test_id: {environment: "ok" | "FAIL" | "ERROR" | "skip"}}``; environments that did not run a test are absent."""
+    statuses = {}
+    for name, result in results.items():
+        report = result["report"]
+        if report is None:
+            continue
+        outcome = {}
+        for shard in report["shards"]:
+            outcome.update((test_id, "ok") for test_id in shard.get("tests", []))
+        outcome.update((test_id, "skip") for test_id, _ in report["skipped"])
+        outcome.update((test_id, "FAIL") for test_id, _ in report["failures"])
+        outcome.update((test_id, "ERROR") for test_id, _ in report["errors"])
+        for test_id, status in outcome.items():
+            statuses.setdefault(test_id, {})[name] = status
+    return {test_id: statuses[test_id] for test_id in sorted(statuses)}
+
+
+def endpoint_rows(results, threshold=None, min_delta_ms=None):
+    """Per-endpoint p50/p95/p99 of every environment, with each p95 judged against the first environment.
+
+    Uses the benchmark gate's rule: slower when p95 grew by more than
+    ``threshold`` and by more than ``min_delta_ms``.
+    """
+    threshold = config.BENCH_THRESHOLD if threshold is None else threshold
+    min_delta_ms = config.BENCH_MIN_DELTA_MS if min_delta_ms is None else min_delta_ms
+    names = list(results)
+    reference = results[names[0]]["latency"]
+    verdicts = {}
+    for name in names[1:]:
+        rows, _ = compare({"results": reference}, results[name]["latency"], threshold, min_delta_ms)
+        for row in rows:
+            verdicts.setdefault(row["operation"], {})[name] = row
+    endpoints = sorted(set().union(*(result["latency"] for result in results.values())))
+    table = []
+    for endpoint in endpoints:
+        row = {"endpoint": endpoint, "environments": {}}
+        for name in names:
+            summary = results[name]["latency"].get(endpoint)
+            verdict = verdicts.get(endpoint, {}).get(name, {})
+            status = "slower" if verdict.get("status") == "REGRESSED" else verdict.get("status")
+            row["environments"][name] = summary and dict(summary, change=verdict.get("change"), status=status)
+        table.append(row)
+    return table
+
+
+def format_comparison(results, statuses, rows):
+    names = list(results)
+    width = max(8, *(len(name) for name in names))
+    lines = [f"{'environment':<{width}}  exit  tests  failed  log"]
+    for name, result in results.items():
+        report = result["report"]
+        if report is None:
+            lines.append(f"{name:<{width}}  {result['exit_code']:>4}      -       -  no report, see {result['log']}")
+            continue
+        failed = len(report["failures"]) + len(report["errors"])
+        lines.append(f"{name:<{width}}  {result['exit_code']:>4}  {report['tests_run']:>5}  {failed:>6}  {result['log']}")
+
+    # Only tests whose outcome is not "ok" everywhere
+    differing = {test_id: row for test_id, row in statuses.items()
+                 if len(row) < len(names) or set(row.values()) != {"ok"}}
+    lines.append("")
+    if differing:
+        lines.append(f"{'test':<80} " + " ".join(f"{name:>{width}}" for name in names))
+        for test_id, row in differing.items():
+            lines.append(f"{test_id:<80} " + " ".join(f"{row.get(name, '-'):>{width}}" for name in names))
+    else:
+        lines.append(f"All {len(statuses)} tests passed in every environment")
+
+    lines.append("")
+    header = f"{'endpoint':<42}"
+    for index, name in enumerate(names):
+        header += f" | {name + ' p50/p95/p99 ms':>26}" + ("" if index == 0 else f" {'p95 vs ' + names[0]:>18}")
+    lines.append(header)
+    for row in rows:
+        line = f"{row['endpoint']:<42}"
+        for index, name in enumerate(names):
+            summary = row["environments"][name]
+            cell = f"{summary['p50_ms']:.1f}/{summary['p95_ms']:.1f}/{summary['p99_ms']:.1f}" if summary else "-"
+            line += f" | {cell:>26}"
+            if index:
+                change = f"{summary['change'] * 100:+.0f}% {summary['status']}" if summary and summary["change"] is not None else ""
+                line += f" {change:>18}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m harness.fanout",
+        description="Run the suites against several environments at once and compare them side by side.")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=BASE_URL",
+                        help="an environment to run against; repeat for each (the first is the reference)")
+    parser.add_argument("--environments", metavar="FILE",
+                        help="YAML or JSON mapping environment names to settings such as base_url, uuap_username")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes per environment")
+    parser.add_argument("--out", help="directory for each environment's report, latency and log")
+    parser.add_argument("--threshold", type=float, default=config.BENCH_THRESHOLD,
+                        help="p95 growth over the reference that counts as slower (default: %(default)s)")
+    parser.add_argument("--min-delta-ms", type=float, default=config.BENCH_MIN_DELTA_MS,
+                        help="ignore p95 growth smaller than this (default: %(default)s)")
+    parser.add_argument("--json", dest="json_path", help="also write the comparison to this file")
+    parser.add_argument("modules", nargs="*", help="suite modules to run (default: all)")
+    args = parser.parse_args(argv)
+
+    try:
+        environments = load_environments(args.environments) if args.environments else {}
+        environments.update(parse_environment(spec) for spec in args.env)
+    except (FanoutError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    if len(environments) < 2:
+        print("give at least two environments with --env or --environments", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    results = run(environments, args.workers, args.modules, args.out)
+    statuses = test_statuses(results)
+    rows = endpoint_rows(results, args.threshold, args.min_delta_ms)
+    print(format_comparison(results, statuses, rows))
+    print(f"\n{len(environments)} environments in {time.perf_counter() - start:.1f}s")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"environments": {name: {"exit_code": result["exit_code"], "log": result["log"]}
+                                        for name, result in results.items()},
+                       "tests": statuses, "endpoints": rows}, f, indent=2)
+    failed = any(result["exit_code"] != 0 for result in results.values())
+    slower = any(summary and summary["status"] == "slower" for row in rows for summary in row["environments"].values())
+    return 1 if failed or slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+import atexit
+import itertools
+import logging
+import os
+import threading
+import unittest
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from harness import codec, config
+from harness.httpClient import get_session
+
+# Set by the parallel runner in each worker process; empty for serial runs
+WORKER_TAG_ENV = "CRM_WORKER_TAG"
+
+SCOPES = ("test", "class", "session")
+
+# While an @isolated test builds its private fixtures, unique() adds this tag so
+# the copies never clash with the class- or session-scoped originals
+_isolation = threading.local()
+_isolation_ids = itertools.count(1)
+
+
+def _unique_tags():
+    return tuple(tag for tag in (os.environ.get(WORKER_TAG_ENV), getattr(_isolation, "tag", None)) if tag)
+
+
+def unique(value):
+    """Suffix ``value`` with this worker's tag so parallel workers never collide.
+
+    Emails keep their domain (``testuser@example.com`` becomes
+    ``testuser-w1234@example.com``). Outside the parallel runner and the
+    setup of @isolated fixtures the value is returned unchanged.
+    """
+    tags = _unique_tags()
+    if not tags:
+        return value
+    local, at, domain = value.partition("@")
+    return f"{local}-{'-'.join(tags)}{at}{domain}"
+
+
+class FixtureError(Exception):
+    """Raised when a fixture entity cannot be created or deleted."""
+
+
+class Fixture:
+    """A CRM entity that tests can share instead of creating it per test.
+
+    ``payload`` is a callable so values built with unique() are resolved in
+    the process that creates the entity, not the one that imported the suite.
+    ``requires`` maps keyword names to the fixtures this one references; their
+    IDs are passed to ``payload`` under those names, so an order can declare
+    ``requires={"customer_id": BASE_CUSTOMER}`` and
+    ``payload=lambda customer_id: {...}``. The payload must not vary other
+    than through unique() and those IDs: the encoded body is cached per
+    unique() context and IDs and reused whenever the fixture is created again.
+    """
+
+    def __init__(self, name, path, payload, scope="class", requires=None):
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown fixture scope: {scope}")
+        self.name = name
+        self.path = path
+        self.payload = payload
+        self.scope = scope
+        self.requires = dict(requires or {})
+        for dependency in self.requires.values():
+            # A dependency deleted before its dependent would leave a dangling reference
+            if SCOPES.index(dependency.scope) < SCOPES.index(scope):
+                raise ValueError(f"{scope}-scoped {name} cannot require {dependency.scope}-scoped {dependency.name}")
+        self._bodies = {}
+
+    def body(self, ids=None):
+        ids = ids or {}
+        key = (_unique_tags(), tuple(sorted(ids.items())))
+        body = self._bodies.get(key)
+        if body is None:
+            body = self._bodies[key] = codec.dumps(self.payload(**ids))
+        return body
+
+    def create(self, session, ids=None):
+        body = self.body(ids)
+        response = session.post(self.path, data=body)
+        if response.status_code != 201:
+            raise FixtureError(f"Creating {self.name} failed with HTTP {response.status_code}: {response.text}")
+        logging.debug("Created %s fixture: %s", self.name, body)
+        return response.json()["id"]
+
+    def delete(self, session, entity_id):
+        response = session.delete(f"{self.path}/{entity_id}")
+        # Already gone counts as cleaned up
+        if response.status_code not in (204, 404):
+            raise FixtureError(f"Deleting {self.name} {entity_id} failed with HTTP {response.status_code}")
+        logging.info("Deleted %s fixture with ID: %s", self.name, entity_id)
+
+
+def dependency_order(fixtures):
+    """``fixtures`` plus everything they transitively require, requirements first."""
+    ordered = []
+    visiting = set()
+
+    def visit(fixture):
+        if fixture in ordered:
+            return
+        if fixture in visiting:
+            raise FixtureError(f"Fixture {fixture.name} requires itself through {', '.join(f.name for f in visiting)}")
+        visiting.add(fixture)
+        for dependency in fixture.requires.values():
+            visit(dependency)
+        visiting.discard(fixture)
+        ordered.append(fixture)
+
+    for fixture in fixtures:
+        visit(fixture)
+    return ordered
+
+
+def depths(fixtures):
+    """Longest requirement chain below each fixture, counting only ``fixtures`` themselves."""
+    members = set(fixtures)
+    depth = {}
+    for fixture in dependency_order(fixtures):
+        if fixture in members:
+            depth[fixture] = 1 + max((depth[d] for d in fixture.requires.values() if d in depth), default=-1)
+    return depth
+
+
+def schedule(fixtures, create, max_workers=None):
+    """Call ``create(fixture, ids)`` for the fixtures and their requirements; return ``{fixture: id}``.
+
+    ``ids`` maps a fixture's ``requires`` names to the IDs already created for
+    them. Independent fixtures are created concurrently and each one starts as
+    soon as its requirements exist, so setup takes as long as the deepest
+    chain rather than the sum of every create. The first failure is raised
+    once the creates already running have finished; nothing that depends on
+    the failed fixture is started.
+    """
+    pending = dependency_order(fixtures)
+    created = {}
+    if len(pending) == 1:
+        fixture = pending[0]
+        created[fixture] = create(fixture, {})
+        return created
+    errors = []
+    with ThreadPoolExecutor(max_workers=min(len(pending), max_workers or config.POOL_SIZE)) as pool:
+        running = {}
+        while pending or running:
+            if not errors:
+                for fixture in [f for f in pending if all(d in created for d in f.requires.values())]:
+                    pending.remove(fixture)
+                    ids = {name: created[d] for name, d in fixture.requires.items()}
+                    running[pool.submit(create, fixture, ids)] = fixture
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                fixture = running.pop(future)
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                else:
+                    created[fixture] = future.result()
+    if errors:
+        raise FixtureError("; ".join(str(error) for error in errors))
+    return created
+
+
+class FixtureCache:
+    """Created fixture IDs grouped by scope key, torn down in bulk per key.
+
+    Each entry is a Future, so concurrent acquirers of the same fixture wait
+    for one create instead of serialising every create behind a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entities = {}
+
+    def acquire(self, fixture, scope_key, session=None, ids=None):
+        with self._lock:
+            entities = self._entities.setdefault(scope_key, {})
+            future = entities.get(fixture)
+            owner = future is None
+            if owner:
+                future = entities[fixture] = Future()
+        if owner:
+            try:
+                future.set_result(fixture.create(session or get_session(), ids))
+            except BaseException as e:
+                with self._lock:
+                    entities.pop(fixture, None)
+                future.set_exception(e)
+        return future.result()
+
+    def acquire_all(self, fixtures, scope_key_for, session=None):
+        """Acquire ``fixtures`` and their requirements as a graph; ``scope_key_for(fixture)`` picks each key."""
+        session = session or get_session()
+        return schedule(fixtures, lambda fixture, ids: self.acquire(fixture, scope_key_for(fixture), session, ids))
+
+    def release(self, scope_key, session=None, concurrent=True):
+        """Delete every entity created under ``scope_key``, dependents before what they require.
+
+        Entities with nothing left depending on them are deleted together,
+        concurrently by default, so teardown also takes the depth of the graph.
+        """
+        with self._lock:
+            futures = self._entities.pop(scope_key, {})
+        entities = {fixture: future.result() for fixture, future in futures.items()
+                    if future.done() and future.exception() is None}
+        if not entities:
+            return
+        session = session or get_session()
+        depth = depths(entities)
+        errors = []
+        for level in sorted(set(depth.values()), reverse=True):
+            deletions = [(fixture, entities[fixture]) for fixture in entities if depth[fixture] == level]
+            if concurrent and len(deletions) > 1:
+                with ThreadPoolExecutor(max_workers=min(len(deletions), config.POOL_SIZE)) as pool:
+                    futures = [pool.submit(fixture.delete, session, entity_id) for fixture, entity_id in deletions]
+                errors.extend(future.exception() for future in futures if future.exception() is not None)
+            else:
+                for fixture, entity_id in deletions:
+                    try:
+                        fixture.delete(session, entity_id)
+                    except Exception as e:
+                        errors.append(e)
+        if errors:
+            raise FixtureError("; ".join(str(error) for error in errors))
+
+
+_cache = FixtureCache()
+
+
+def release_session_fixtures(concurrent=True):
+    """Tear down session-scoped fixtures; registered at exit and by the runner."""
+    _cache.release("session", concurrent=concurrent)
+
+
+# New threads cannot be started once the interpreter is shutting down
+atexit.register(release_session_fixtures, concurrent=False)
+
+
+def isolated(test_method):
+    """Give a test private test-scoped copies of its fixtures because it mutates them."""
+    test_method.isolated_fixtures = True
+    return test_method
+
+
+class FixtureTestCase(unittest.TestCase):
+    """TestCase that binds declared fixtures to attributes before every test.
+
+    ``fixtures`` maps attribute names to Fixture declarations. Class-scoped
+    entities are created by the first test that needs them and deleted after
+    the last test of the class; session-scoped ones live until the process
+    ends. Fixtures and whatever they require are created as a dependency
+    graph, independent ones concurrently. Tests decorated with @isolated get
+    fresh entities of their own, whose unique() values carry an extra tag so
+    they never clash with the shared ones.
+    """
+
+    fixtures = {}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.addClassCleanup(_cache.release, cls)
+
+    def setUp(self):
+        super().setUp()
+        isolated_test = getattr(getattr(self, self._testMethodName), "isolated_fixtures", False)
+        # Keyed by instance rather than test id so concurrent runs of one test never share entities
+        scope_keys = {"test": ("test", id(self)), "class": type(self), "session": "session"}
+        self.addCleanup(_cache.release, scope_keys["test"])
+        tag = f"i{next(_isolation_ids)}" if isolated_test else None
+
+        def scope_key_for(fixture):
+            # Runs on scheduler threads, which need the isolation tag for unique() too
+            _isolation.tag = tag
+            return scope_keys["test" if isolated_test else fixture.scope]
+
+        try:
+            ids = _cache.acquire_all(self.fixtures.values(), scope_key_for) if self.fixtures else {}
+        finally:
+            _isolation.tag = None
+        for attribute, fixture in self.fixtures.items():
+            setattr(self, attribute, ids[fixture])
+
+
+# Root entities shared by suites that only need something to hang orders,
+# inventory rows and opportunities off, and never assert on their fields
+BASE_CUSTOMER = Fixture("customer", "/customers", lambda: {
+    "name": unique("Base Test Customer"),
+    "email": unique("basetestcustomer@example.com"),
+    "phone": "1234567890"
+}, scope="session")
+
+BASE_PRODUCT = Fixture("product", "/products", lambda: {
+    "name": unique("Base Test Product"),
+    "description": "Shared product for order and inventory tests",
+    "price": 99.99,
+    "stock": 100,
+    "category": "Electronics"
+}, scope="session")
@@ -0,0 +1,143 @@
+import functools
+import threading
+import time
+import uuid
+from http import HTTPStatus
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+
+from harness import cassette, codec, config, journal, metrics
+from harness.auth import TokenAuth, get_token_provider
+from harness.cache import ResponseCache
+from harness.latency import recorder
+from harness.resilience import IDEMPOTENCY_HEADER, IDEMPOTENT_METHODS, Resilience
+from harness.standIn import StandInAdapter, get_app
+
+
+class CRMSession(requests.Session):
+    """Keep-alive session that resolves relative paths against BASE_URL.
+
+    Connections to the CRM host are pooled by the mounted adapter, so the
+    suites pay for one handshake per pooled connection instead of one per call.
+    Every call goes through harness.resilience: jittered retries within a
+    budget, a circuit breaker per endpoint and an adaptive concurrency limit.
+    With ``cache`` (default CRM_CACHE) GETs are answered from a
+    harness.cache.ResponseCache and revalidated with conditional requests.
+    """
+
+    def __init__(self, base_url=None, headers=None, pool_size=None, max_retries=None,
+                 backoff_factor=None, timeout=None, cache=None):
+        super().__init__()
+        self.base_url = (base_url or config.BASE_URL).rstrip("/")
+        self.headers.update(config.HEADERS if headers is None else headers)
+        self.timeout = config.TIMEOUT if timeout is None else timeout
+
+        pool_size = config.POOL_SIZE if pool_size is None else pool_size
+        # Retries happen in the resilience layer, which also covers the stand-in and cassettes
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.resilience = Resilience(max_retries, backoff_factor)
+        self.cache = ResponseCache() if (config.CACHE if cache is None else cache) else None
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        if config.STANDIN:
+            self.mount(config.STANDIN_URL, StandInAdapter(get_app()))
+        cassette.install(self)
+
+        provider = get_token_provider()
+        if provider is not None:
+            self.auth = TokenAuth(provider)
+
+    def request(self, method, url, **kwargs):
+        if not url.startswith(("http://", "https://")):
+            url = f"{self.base_url}{url}"
+        kwargs.setdefault("timeout", self.timeout)
+        if kwargs.get("json") is not None:
+            # requests would encode with the stdlib; harness.codec is faster and yields bytes directly
+            kwargs["data"] = codec.dumps(kwargs.pop("json"))
+        if (config.IDEMPOTENCY_KEYS and method.upper() not in IDEMPOTENT_METHODS
+                and isinstance(kwargs.get("data"), (type(None), bytes))):
+            kwargs["headers"] = {IDEMPOTENCY_HEADER: uuid.uuid4().hex, **(kwargs.get("headers") or {})}
+        cache_key = validators = None
+        if self.cache is not None:
+            if method.upper() == "GET":
+                cache_key = self.cache.key(url, kwargs.get("params"))
+                cached, validators = self.cache.lookup(cache_key, _cached_response)
+                if cached is not None:
+                    return cached
+                if validators:
+                    kwargs["headers"] = {**validators, **(kwargs.get("headers") or {})}
+                generation = self.cache.generation
+            else:
+                self.cache.invalidate(url)
+        data = kwargs.get("data")
+        sent = len(data) if isinstance(data, (bytes, str)) else 0
+        endpoint = metrics.registry.begin(method, url)
+        start = time.perf_counter()
+        try:
+            response = self.resilience.call(super().request, method, url, **kwargs)
+        except Exception:
+            metrics.registry.end(endpoint, "error", time.perf_counter() - start, sent)
+            raise
+        elapsed = time.perf_counter() - start
+        recorder.record(method, url, elapsed)
+        # Streamed bodies are not read here; without a Content-Length they count as 0 bytes
+        metrics.registry.end(endpoint, response.status_code, elapsed, sent,
+                            int(response.headers.get("Content-Length") or 0))
+        response.json = functools.partial(_decode_json, response)
+        # Created IDs go to the leak journal so records a failed test never deletes can be swept
+        journal.observe(method, url, kwargs.get("data"), response, self.base_url)
+        if cache_key is not None:
+            if response.status_code == 304 and validators:
+                refreshed = self.cache.revalidated_response(cache_key, response, _cached_response)
+                if refreshed is not None:
+                    return refreshed
+                # Invalidated while revalidating; fetch the current version unconditionally
+                kwargs["headers"] = {name: value for name, value in kwargs["headers"].items() if name not in validators}
+                return self.request(method, url, **kwargs)
+            self.cache.store(cache_key, response, generation)
+        elif self.cache is not None:
+            # Again after the write, in case a GET stored the old version while it was in flight
+            self.cache.invalidate(url)
+        return response
+
+
+def _cached_response(status, headers, content, url):
+    """A requests.Response rebuilt from a harness.cache entry."""
+    response = requests.Response()
+    response.status_code = status
+    try:
+        response.reason = HTTPStatus(status).phrase
+    except ValueError:
+        response.reason = ""
+    response.headers = headers
+    response._content = content
+    # Lets iter_content() replay the body for streamed reads
+    response._content_consumed = True
+    response.encoding = get_encoding_from_headers(headers)
+    response.url = url
+    response.json = functools.partial(_decode_json, response)
+    return response
+
+
+def _decode_json(response, **kwargs):
+    """Response.json() through harness.codec; keyword arguments fall back to requests' decoder."""
+    if kwargs:
+        return requests.Response.json(response, **kwargs)
+    return codec.loads(response.content)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide CRMSession, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = CRMSession()
+            # Endpoint and console summary, when CRM_METRICS_PORT or CRM_METRICS_INTERVAL ask for them
+            metrics.start()
+        return _session
@@ -0,0 +1,272 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from harness import codec, config
+from harness.logConfig import configure_logging
+
+# Set by the runner so its workers' journals can be swept together at the end of the run
+RUN_ENV = "CRM_JOURNAL_RUN"
+
+# Top-level collections in the order leftovers are deleted: records that
+# reference a customer or product go before the customer or product
+SWEEP_ORDER = ("orders", "inventory", "opportunities", "users", "customers", "products")
+
+
+def split_url(url, base_url=None):
+    """``(base, path)`` of a request URL, e.g. ``("http://host/api", "/orders/42")``.
+
+    The path is relative to ``base_url`` (default BASE_URL) when the URL lies
+    under it, and to the URL's own origin otherwise, so a record is always
+    journaled against the server that created it.
+    """
+    base_url = (base_url or config.BASE_URL).rstrip("/")
+    parts, base = urlsplit(url), urlsplit(base_url)
+    path = parts.path.rstrip("/")
+    base_path = base.path.rstrip("/")
+    if (parts.scheme, parts.netloc) == (base.scheme, base.netloc) and (
+            path == base_path or path.startswith(base_path + "/")):
+        return base_url, path[len(base_path):]
+    return f"{parts.scheme}://{parts.netloc}", path
+
+
+class Journal:
+    """Append-only JSON lines file of the records one process created and deleted.
+
+    Every entry is flushed as it is written, so a crashed or killed run still
+    leaves the IDs behind for the sweeper.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def _write(self, op, base, paths):
+        now = round(time.time(), 3)
+        lines = "".join(json.dumps({"op": op, "path": path, "base": base, "time": now}) + "\n"
+                        for path in paths)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+
+    def created(self, base, *paths):
+        self._write("create", base, paths)
+
+    def deleted(self, base, *paths):
+        self._write("delete", base, paths)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+# Set while sweeping; the sweeper's own deletes are not journaled
+_sweeping = threading.Event()
+
+
+def run_id():
+    return os.environ.get(RUN_ENV) or f"{int(time.time() * 1000)}-{os.getpid()}"
+
+
+def get_journal():
+    """This process's Journal in the CRM_JOURNAL directory, or None when journaling is off."""
+    global _journal
+    if not config.JOURNAL:
+        return None
+    with _journal_lock:
+        # A forked worker must not append to its parent's file
+        if _journal is None or _journal.pid != os.getpid():
+            os.makedirs(config.JOURNAL, exist_ok=True)
+            _journal = Journal(os.path.join(config.JOURNAL, f"{run_id()}-{os.getpid()}.jsonl"))
+        return _journal
+
+
+def observe(method, url, data, response, base_url=None):
+    """Journal what a call created or deleted; called by the clients for every response.
+
+    ``base_url`` is the calling session's, so records are swept against the
+    server they were created on, not BASE_URL.
+    """
+    journal = get_journal() if not _sweeping.is_set() else None
+    if journal is None:
+        return
+    method = method.upper()
+    base, path = split_url(url, base_url)
+    collection, _, action = path.rpartition("/")
+    if method == "DELETE" and response.status_code in (204, 404):
+        journal.deleted(base, path)
+    elif method == "POST" and action == "batch_delete" and response.status_code in (200, 204):
+        ids = codec.loads(data).get("ids", []) if isinstance(data, (bytes, str)) else []
+        journal.deleted(base, *(f"{collection}/{entity_id}" for entity_id in ids))
+    elif method == "POST" and response.status_code == 201:
+        try:
+            body = response.json()
+        except ValueError:
+            return
+        if action == "batch":
+            records = body.get("items", []) if isinstance(body, dict) else body
+            journal.created(base, *(f"{collection}/{record['id']}" for record in records if "id" in record))
+        elif isinstance(body, dict) and "id" in body:
+            journal.created(base, f"{path}/{body['id']}")
+
+
+def journal_files(directory=None, run=None):
+    directory = directory or config.JOURNAL
+    pattern = f"{run}-*.jsonl" if run else "*.jsonl"
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def live_records(files):
+    """``{(base, path): entry}`` of records created in ``files`` and not deleted since, oldest first.
+
+    Deleting a record also retires everything journaled beneath it on the
+    same server, such as the tasks of a deleted customer.
+    """
+    live = {}
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A process killed mid-write leaves a torn last line
+                    continue
+                base, deleted = entry["base"], entry["path"]
+                if entry["op"] == "create":
+                    live[base, deleted] = entry
+                else:
+                    for key in [key for key in live if key[0] == base and (
+                            key[1] == deleted or key[1].startswith(deleted + "/"))]:
+                        del live[key]
+    return live
+
+
+def _sweep_key(collection):
+    """Deeper collections first, then dependents before what they reference."""
+    segments = collection.strip("/").split("/")
+    top = SWEEP_ORDER.index(segments[0]) if segments[0] in SWEEP_ORDER else -1
+    return (-len(segments), top)
+
+
+def sweep(files, session=None, batch_size=None, concurrency=None, dry_run=False):
+    """Delete the live records of ``files`` and compact them; returns ``(swept, remaining)``.
+
+    Records are grouped per collection and deleted through harness.seeding,
+    which uses the batch delete endpoint where the server has one and
+    concurrent single deletes otherwise. Groups at the same depth are swept
+    concurrently. Only records created on ``session``'s base URL (default the
+    shared session's, i.e. BASE_URL) are deleted; those of other servers are
+    kept for a sweep against them. The swept files are replaced by one
+    holding only what is still live.
+    """
+    # Imported here: the session itself journals through this module
+    from harness.httpClient import get_session
+    from harness.seeding import BATCH_SIZE, teardown
+
+    live = live_records(files)
+    base = session.base_url if session is not None else config.BASE_URL.rstrip("/")
+    mine = {key for key in live if key[0] == base}
+    groups = {}
+    for _, path in mine:
+        collection, _, entity_id = path.rpartition("/")
+        groups.setdefault(collection, []).append(int(entity_id) if entity_id.isdigit() else entity_id)
+    if dry_run:
+        if not groups:
+            print("no leftovers")
+        for collection in sorted(groups, key=_sweep_key):
+            print(f"{collection}: {len(groups[collection])} records")
+        return 0, len(live)
+
+    session = session or get_session()
+    levels = {}
+    for collection in groups:
+        levels.setdefault(_sweep_key(collection), []).append(collection)
+    failed = set()
+    _sweeping.set()
+    try:
+        for key in sorted(levels):
+            collections = levels[key]
+            with ThreadPoolExecutor(max_workers=min(len(collections), concurrency or config.POOL_SIZE)) as pool:
+                futures = {pool.submit(teardown, collection.lstrip("/"), groups[collection], session,
+                                       batch_size or BATCH_SIZE, concurrency): collection
+                           for collection in collections}
+            for future, collection in futures.items():
+                if future.exception() is not None:
+                    # teardown does not say which IDs failed; keep the group, deleting again is harmless
+                    logging.warning("Sweeping %s: %s", collection, future.exception())
+                    failed.add(collection)
+    finally:
+        _sweeping.clear()
+
+    remaining = [entry for key, entry in live.items()
+                 if key not in mine or key[1].rpartition("/")[0] in failed]
+    _compact(files, remaining)
+    return len(live) - len(remaining), len(remaining)
+
+
+def _compact(files, remaining):
+    """Replace ``files`` by a single journal of the ``remaining`` create entries."""
+    current = _journal.path if _journal is not None and _journal.pid == os.getpid() else None
+    directory = os.path.dirname(files[0])
+    for path in files:
+        # This process's open journal may receive more entries; it is swept next time
+        if path != current:
+            os.remove(path)
+    if remaining:
+        with open(os.path.join(directory, f"{int(time.time() * 1000)}-swept.jsonl"), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in remaining)
+
+
+def sweep_run(run=None):
+    """End-of-run sweep of the journals written under ``run``; used by the runner."""
+    files = journal_files(run=run or os.environ.get(RUN_ENV))
+    if not files:
+        return 0, 0
+    swept, remaining = sweep(files)
+    logging.info("Swept %s leaked records; %s still recorded in %s", swept, remaining, config.JOURNAL)
+    return swept, remaining
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m harness.journal",
+                                     description="Delete records that test runs created and never deleted.")
+    parser.add_argument("directory", nargs="?", default=config.JOURNAL or ".crm-journal", help="journal directory")
+    parser.add_argument("--run", help="only sweep the journals of this run id")
+    parser.add_argument("--batch-size", type=int, help="records per batch delete")
+    parser.add_argument("--concurrency", type=int, help="concurrent deletes (default: CRM_POOL_SIZE)")
+    parser.add_argument("--dry-run", action="store_true", help="list the leftovers per collection and exit")
+    parser.add_argument("--base-url", help="sweep the records created on this server (default: CRM_BASE_URL)")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    files = journal_files(args.directory, args.run)
+    if not files:
+        print(f"no journals in {args.directory}")
+        return 0
+    session = None
+    if args.base_url:
+        from harness.httpClient import CRMSession
+        session = CRMSession(base_url=args.base_url)
+    swept, remaining = sweep(files, session, batch_size=args.batch_size, concurrency=args.concurrency,
+                             dry_run=args.dry_run)
+    if not args.dry_run:
+        print(f"swept {swept} records from {len(files)} journals; {remaining} remaining")
+    return 1 if remaining and not args.dry_run else 0
+
+
+if __name__ == "__main__":
+    # Run inside the harness.journal module the session journals through, not this __main__ copy
+    from harness import journal
+    sys.exit(journal.main())
@@ -0,0 +1,173 @@
+import atexit
+import json
+import re
+import threading
+from urllib.parse import urlsplit
+
+from harness import config
+
+# Path segments that identify a single record collapse into one endpoint
+ID_SEGMENT = re.compile(r"^(\d+|(?=[0-9a-fA-F-]*\d)[0-9a-fA-F-]{8,})$")
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+def endpoint_key(method, url):
+    """``GET http://host/api/orders/42`` -> ``GET /orders/{id}``."""
+    path = urlsplit(url).path
+    base_path = urlsplit(config.BASE_URL).path.rstrip("/")
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    segments = ["{id}" if ID_SEGMENT.match(segment) else segment for segment in path.split("/")]
+    return f"{method.upper()} {'/'.join(segments) or '/'}"
+
+
+def format_summary(summary):
+    """Render a ``LatencyRecorder.summary()`` as a fixed-width text table."""
+    lines = [f"{'endpoint':<50} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for key, row in summary.items():
+        lines.append(f"{key:<50} {row['count']:>7} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+                     f"{row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+    return "\n".join(lines) + "\n"
+
+
+class Histogram:
+    """Log-linear histogram in the style of HdrHistogram.
+
+    Values are integer microseconds. Values below 128 are exact; above that
+    each power-of-two range is split into 64 linear sub-buckets, which keeps
+    the relative error under 2% with a bucket count that does not grow with
+    the number of samples. Histograms merge by adding counts.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def _index(value):
+        if value < SUB_BUCKET_COUNT:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        return shift * SUB_BUCKET_HALF + (value >> shift)
+
+    @staticmethod
+    def _highest_value(index):
+        if index < SUB_BUCKET_COUNT:
+            return index
+        shift = index // SUB_BUCKET_HALF - 1
+        top = index - shift * SUB_BUCKET_HALF
+        return ((top + 1) << shift) - 1
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest_value(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def to_dict(self):
+        return {"counts": {str(index): count for index, count in self.counts.items()},
+                "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class LatencyRecorder:
+    """Per-endpoint, per-verb histograms of request latency in microseconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+
+    def record(self, method, url, seconds):
+        key = endpoint_key(method, url)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.record(seconds * 1_000_000)
+
+    def merge(self, snapshot):
+        """Fold a ``snapshot()`` from another recorder (e.g. a worker process) into this one."""
+        with self._lock:
+            for key, data in snapshot.items():
+                self.histograms.setdefault(key, Histogram()).merge(Histogram.from_dict(data))
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            snapshot = {key: histogram.to_dict() for key, histogram in self.histograms.items()}
+            if reset:
+                self.histograms = {}
+        return snapshot
+
+    def summary(self):
+        with self._lock:
+            return {
+                key: {
+                    "count": histogram.count,
+                    "p50_ms": histogram.percentile(50) / 1000,
+                    "p95_ms": histogram.percentile(95) / 1000,
+                    "p99_ms": histogram.percentile(99) / 1000,
+                    "max_ms": histogram.max / 1000,
+                }
+                for key, histogram in sorted(self.histograms.items())
+            }
+
+    def format_table(self):
+        return format_summary(self.summary())
+
+    def write_report(self, prefix):
+        """Write ``<prefix>.json`` (summary plus mergeable histograms) and ``<prefix>.txt``."""
+        with open(f"{prefix}.json", "w") as f:
+            json.dump({"summary": self.summary(), "histograms": self.snapshot()}, f, indent=2)
+        with open(f"{prefix}.txt", "w") as f:
+            f.write(self.format_table())
+
+
+recorder = LatencyRecorder()
+
+
+def _write_report_at_exit():
+    # The parallel runner writes its own merged report; only standalone runs land here
+    if config.LATENCY_REPORT and recorder.histograms:
+        recorder.write_report(config.LATENCY_REPORT)
+
+
+atexit.register(_write_report_at_exit)
@@ -0,0 +1,150 @@
+import codecs
+import json
+from contextlib import closing
+
+from harness import codec, config
+from harness.httpClient import get_session
+
+PAGE_SIZE = 100
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class ListingError(Exception):
+    """Raised when a list endpoint answers with an error or a body that is not a list."""
+
+
+def iter_json_array(chunks):
+    """Yield elements of a top-level JSON array from an iterable of byte chunks.
+
+    Only one element plus the unread remainder of the current chunk is held in
+    memory, so arbitrarily large unpaginated collections can be scanned.
+    """
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+    exhausted = False
+    chunks = iter(chunks)
+
+    while True:
+        while position < len(buffer) and buffer[position] in _WHITESPACE:
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise ListingError("response body is not a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            if buffer[position] == ",":
+                position += 1
+                continue
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+            except ValueError:
+                end = None
+            # A value touching the end of the buffer may be a truncated number or literal
+            if end is not None and (end < len(buffer) or exhausted):
+                yield value
+                position = end
+                continue
+            if exhausted:
+                raise ListingError("truncated JSON array")
+        if exhausted:
+            raise ListingError("truncated JSON array")
+        buffer = buffer[position:]
+        position = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer += text_decoder.decode(b"", final=True)
+            exhausted = True
+        else:
+            buffer += text_decoder.decode(chunk)
+
+
+def _get_page(session, path, params):
+    response = session.get(path, params=params, stream=True)
+    if response.status_code != 200:
+        response.close()
+        raise ListingError(f"GET {path} failed with HTTP {response.status_code}")
+    return response
+
+
+def iter_records(path, page_size=PAGE_SIZE, pagination=None, session=None):
+    """Lazily yield the records of a list endpoint, one page or chunk at a time.
+
+    ``pagination`` is ``"offset"`` (``?offset=&limit=``), ``"cursor"``
+    (``?cursor=&limit=`` answered with ``{"items": [...], "next_cursor": ...}``)
+    or ``"none"``. Array bodies are parsed incrementally either way, and a
+    server that ignores the paging parameters is detected by a repeated first
+    record, so the iterator never loops over the same collection twice.
+    Stopping iteration early closes the open response.
+    """
+    session = session or get_session()
+    pagination = pagination or config.PAGINATION
+    offset = 0
+    cursor = ""
+    first_id = None
+
+    while True:
+        if pagination == "offset":
+            params = {"offset": offset, "limit": page_size}
+        elif pagination == "cursor":
+            params = {"cursor": cursor, "limit": page_size}
+        else:
+            params = None
+        response = _get_page(session, path, params)
+        try:
+            if pagination == "cursor":
+                # Cursor pages are bounded by page_size, so the envelope is parsed whole
+                page = codec.loads(response.content)
+                if not isinstance(page, dict):
+                    # Server ignored the cursor and sent a plain array
+                    yield from page
+                    return
+                yield from page.get("items", [])
+                cursor = page.get("next_cursor")
+                if not cursor:
+                    return
+                continue
+
+            count = 0
+            for record in iter_json_array(response.iter_content(CHUNK_SIZE)):
+                record_id = record.get("id") if isinstance(record, dict) else record
+                if count == 0 and offset and record_id == first_id:
+                    # Server ignored offset/limit and sent the whole collection again
+                    return
+                if count == 0 and not offset:
+                    first_id = record_id
+                count += 1
+                yield record
+        finally:
+            response.close()
+
+        if pagination != "offset" or count < page_size:
+            return
+        offset += count
+
+
+def at_least(path, count=1, **kwargs):
+    """True once ``count`` records have been seen; stops reading as soon as they have."""
+    if count <= 0:
+        return True
+    seen = 0
+    with closing(iter_records(path, page_size=count, **kwargs)) as records:
+        for _ in records:
+            seen += 1
+            if seen >= count:
+                return True
+    return False
+
+
+def contains_id(path, entity_id, **kwargs):
+    """True as soon as a record with ``entity_id`` turns up; reads no further."""
+    with closing(iter_records(path, **kwargs)) as records:
+        return any(isinstance(record, dict) and record.get("id") == entity_id for record in records)
@@ -0,0 +1,229 @@
+import argparse
+import importlib
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import config
+from harness.latency import format_summary, recorder
+
+# Weighted traffic mix built from the functional suites. Each task is a full
+# create/get/update/delete flow from an existing test method, so the load run
+# exercises exactly the calls the suites already verify.
+DEFAULT_MIX = {
+    "Test.productTest.ProductManagementTestCase.test_get_product": 30,
+    "Test.productTest.ProductManagementTestCase.test_list_products": 10,
+    "Test.productTest.ProductManagementTestCase.test_update_product": 5,
+    "Test.orderManagerTest.OrderManagementTestCase.test_create_order": 20,
+    "Test.orderManagerTest.OrderManagementTestCase.test_update_order": 10,
+    "Test.orderManagerTest.OrderManagementTestCase.test_list_orders": 5,
+    "Test.inventoryManagementTest.InventoryManagementTestCase.test_add_inventory": 10,
+    "Test.inventoryManagementTest.InventoryManagementTestCase.test_update_inventory": 5,
+    "Test.inventoryManagementTest.InventoryManagementTestCase.test_list_inventory": 5,
+    "saleTest.SalesOpportunityTestCase.test_create_sales_opportunity": 5,
+}
+
+
+def resolve_task(name):
+    """Split ``module.Class.test_method`` into the TestCase class and method name."""
+    class_path, method_name = name.rsplit(".", 1)
+    module_name, class_name = class_path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name), method_name
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Pacer:
+    """Spaces task starts evenly so all virtual users together hit ``rate`` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            slot = max(self._next, time.monotonic())
+            self._next = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class LoadStats:
+    """Per-task latencies plus a per-second timeline for spotting saturation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start = time.monotonic()
+        self.latencies = {}
+        self.errors = {}
+        self.timeline = {}
+        self.active_users = 0
+
+    def _bucket(self):
+        second = int(time.monotonic() - self.start)
+        return self.timeline.setdefault(second, {"users": 0, "tasks": 0, "errors": 0, "requests": 0, "latency": 0.0})
+
+    def user_started(self):
+        with self._lock:
+            self.active_users += 1
+
+    def record_task(self, name, latency, ok):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(latency)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            bucket = self._bucket()
+            bucket["users"] = self.active_users
+            bucket["tasks"] += 1
+            bucket["errors"] += 0 if ok else 1
+            bucket["latency"] += latency
+
+    def record_request(self, response, *args, **kwargs):
+        with self._lock:
+            self._bucket()["requests"] += 1
+
+    def report(self, elapsed):
+        tasks = {}
+        for name, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            tasks[name] = {
+                "count": len(latencies),
+                "errors": self.errors.get(name, 0),
+                "per_second": len(latencies) / elapsed,
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+            }
+        timeline = [dict(second=second, **bucket) for second, bucket in sorted(self.timeline.items())]
+        for bucket in timeline:
+            bucket["mean_ms"] = bucket.pop("latency") / bucket["tasks"] * 1000 if bucket["tasks"] else 0.0
+        peak = max(timeline, key=lambda bucket: bucket["tasks"], default=None)
+        return {"elapsed": elapsed, "tasks": tasks, "timeline": timeline, "peak": peak,
+                "endpoints": recorder.summary()}
+
+
+def run_task(cls, method_name):
+    case = cls(method_name)
+    result = unittest.TestResult()
+    case.run(result)
+    return result.wasSuccessful()
+
+
+def run_load(mix, users, duration, ramp_up=0.0, rate=None, cache=None):
+    """Drive ``users`` virtual users through the weighted ``mix`` for ``duration`` seconds.
+
+    Users start evenly spread over ``ramp_up`` seconds, and an optional
+    ``rate`` caps task starts per second across all users. ``cache`` turns
+    the shared session's response cache on or off (default CRM_CACHE), to
+    model clients that cache GETs; cache hits never reach the server.
+    """
+    # Size the shared pool for the concurrency before the suites create it
+    config.POOL_SIZE = max(config.POOL_SIZE, users)
+    if cache is not None:
+        config.CACHE = cache
+    from harness.httpClient import get_session
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    tasks = {name: resolve_task(name) for name in names}
+    # Per-request progress messages are noise under load; only warnings are useful
+    logging.getLogger().setLevel(logging.WARNING)
+    classes = {cls for cls, _ in tasks.values()}
+    for cls in classes:
+        cls.setUpClass()
+
+    stats = LoadStats()
+    get_session().hooks["response"].append(stats.record_request)
+    pacer = Pacer(rate) if rate else None
+    deadline = stats.start + ramp_up + duration
+
+    def virtual_user(index):
+        time.sleep(ramp_up * index / users)
+        stats.user_started()
+        rng = random.Random(index)
+        while time.monotonic() < deadline:
+            if pacer is not None:
+                pacer.wait()
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            ok = run_task(*tasks[name])
+            stats.record_task(name, time.perf_counter() - start, ok)
+
+    try:
+        with ThreadPoolExecutor(max_workers=users, thread_name_prefix="crm-vu") as pool:
+            list(pool.map(virtual_user, range(users)))
+    finally:
+        get_session().hooks["response"].remove(stats.record_request)
+        for cls in classes:
+            cls.doClassCleanups()
+    report = stats.report(time.monotonic() - stats.start)
+    if get_session().cache is not None:
+        report["cache"] = get_session().cache.stats()
+    return report
+
+
+def print_report(report, stream=sys.stderr):
+    stream.write(f"{'task':<80} {'count':>7} {'errors':>6} {'tasks/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}\n")
+    for name, task in report["tasks"].items():
+        stream.write(f"{name:<80} {task['count']:>7} {task['errors']:>6} {task['per_second']:>8.1f} "
+                     f"{task['p50_ms']:>8.1f} {task['p95_ms']:>8.1f} {task['p99_ms']:>8.1f}\n")
+    stream.write(f"\n{'second':>6} {'users':>6} {'tasks':>6} {'req':>6} {'errors':>6} {'mean ms':>8}\n")
+    for bucket in report["timeline"]:
+        stream.write(f"{bucket['second']:>6} {bucket['users']:>6} {bucket['tasks']:>6} {bucket['requests']:>6} "
+                     f"{bucket['errors']:>6} {bucket['mean_ms']:>8.1f}\n")
+    stream.write("\n" + format_summary(report["endpoints"]))
+    cache = report.get("cache")
+    if cache:
+        stream.write(f"\nCache: {cache['hits']} hits, {cache['revalidated']} revalidated, {cache['misses']} misses "
+                     f"({cache['hit_ratio']:.0%}), {cache['invalidated']} entries invalidated by writes\n")
+    peak = report["peak"]
+    if peak:
+        stream.write(f"\nPeak throughput {peak['tasks']} tasks/s ({peak['requests']} req/s) "
+                     f"with {peak['users']} users at second {peak['second']}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the CRUD suites as weighted load against CRM_BASE_URL.")
+    parser.add_argument("-u", "--users", type=int, default=10, help="number of virtual users")
+    parser.add_argument("-d", "--duration", type=float, default=60, help="seconds at full user count")
+    parser.add_argument("--ramp-up", type=float, default=0, help="seconds over which users are started")
+    parser.add_argument("--rate", type=float, help="target task starts per second across all users")
+    parser.add_argument("--mix", nargs="*", metavar="TASK=WEIGHT",
+                        help="override the traffic mix, e.g. saleTest.SalesOpportunityTestCase.test_create_sales_opportunity=3")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=None,
+                        help="model a client that caches GETs (default: CRM_CACHE)")
+    parser.add_argument("--metrics-port", type=int, default=config.METRICS_PORT,
+                        help="serve live Prometheus metrics on this local port, 0 for any (default: CRM_METRICS_PORT)")
+    parser.add_argument("--metrics-interval", type=float, default=config.METRICS_INTERVAL,
+                        help="print a live summary every this many seconds (default: CRM_METRICS_INTERVAL)")
+    parser.add_argument("--report", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    # Read when the shared session is created, which starts the endpoint
+    config.METRICS_PORT = args.metrics_port
+    config.METRICS_INTERVAL = args.metrics_interval
+    mix = DEFAULT_MIX
+    if args.mix:
+        mix = {name: float(weight) for name, weight in (item.rsplit("=", 1) for item in args.mix)}
+    report = run_load(mix, args.users, args.duration, args.ramp_up, args.rate, args.cache)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
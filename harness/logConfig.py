@@ -0,0 +1,158 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+from harness import config
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+_target = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, for log shippers and ``jq``."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TruncatingFormatter(logging.Formatter):
+    """Wraps another formatter and cuts messages longer than ``max_length``."""
+
+    def __init__(self, formatter, max_length):
+        super().__init__()
+        self.formatter = formatter
+        self.max_length = max_length
+
+    def format(self, record):
+        if self.max_length:
+            message = record.getMessage()
+            if len(message) > self.max_length:
+                record.msg = f"{message[:self.max_length]}... ({len(message) - self.max_length} more chars)"
+                record.args = None
+        return self.formatter.format(record)
+
+
+class DebugSampler(logging.Filter):
+    """Passes every record at INFO and above but only ``rate`` of the DEBUG ones."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records unformatted so ``%`` interpolation happens on the listener thread.
+
+    The stock QueueHandler formats in the calling thread, which is the cost
+    this is meant to move off the request path. Arguments are therefore
+    rendered late; log copies, not payloads that are mutated afterwards.
+    Tracebacks are still rendered up front so frames are not kept alive.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class DirectQueue:
+    """Replaces the queue once the writer has stopped: each record is written by the thread that logs it."""
+
+    def __init__(self, target):
+        self.target = target
+
+    def put_nowait(self, record):
+        self.target.handle(record)
+
+
+def _build_formatter(fmt, max_length):
+    formatter = JsonLinesFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+    return TruncatingFormatter(formatter, max_length)
+
+
+def _level(level):
+    if not isinstance(level, str):
+        return level
+    value = logging.getLevelName(level.upper())
+    if not isinstance(value, int):
+        # getLevelName answers "Level TRACE" for names it does not know, which setLevel rejects
+        logging.getLogger(__name__).warning("Unknown log level %r, using INFO", level)
+        return logging.INFO
+    return value
+
+
+def _start_listener(target):
+    global _listener, _target
+    _target = target
+    _handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_handler.queue, target, respect_handler_level=True)
+    _listener.start()
+
+
+def configure_logging(level=None, fmt=None, path=None, max_length=None, debug_sample=None):
+    """Route the root logger through a background writer; safe to call from every suite.
+
+    Settings default to the ``CRM_LOG_*`` values in harness.config. The first
+    call installs the writer; later calls only change the level, and only
+    when one is passed.
+    """
+    global _handler
+    root = logging.getLogger()
+    with _lock:
+        if _handler is not None:
+            if level:
+                root.setLevel(_level(level))
+            return
+        root.setLevel(_level(level or config.LOG_LEVEL))
+        path = config.LOG_FILE if path is None else path
+        target = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(sys.stderr)
+        target.setFormatter(_build_formatter(fmt or config.LOG_FORMAT,
+                                             config.LOG_MAX_LENGTH if max_length is None else max_length))
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        _handler = DeferredQueueHandler(None)
+        _handler.addFilter(DebugSampler(config.LOG_DEBUG_SAMPLE if debug_sample is None else debug_sample))
+        root.addHandler(_handler)
+        _start_listener(target)
+        # A forked worker inherits the handler but not the listener thread
+        os.register_at_fork(after_in_child=lambda: _start_listener(target))
+
+
+def flush_logging():
+    """Drain queued records and stop the writer; records logged afterwards are written directly."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            # Nothing consumes the queue any more; it would only grow
+            _handler.queue = DirectQueue(_target)
+
+
+atexit.register(flush_logging)
@@ -0,0 +1,228 @@
+import bisect
+import logging
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from harness import config
+from harness.latency import endpoint_key
+
+# Upper bounds in seconds of the exported latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class EndpointStats:
+    """One thread's counters for one endpoint."""
+
+    def __init__(self):
+        self.statuses = {}
+        self.in_flight = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        # Per bucket, the last one for calls slower than every bound
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.seconds = 0.0
+
+
+class Metrics:
+    """Request counters and latency histograms per endpoint, readable while a run is going.
+
+    Each thread writes only to its own shard, so recording a call takes no
+    lock and threads never contend. A reader sums the shards; copies of their
+    dicts are taken in single C calls under the GIL, so they are consistent
+    per shard. Shards of finished threads are kept, so every counter only
+    grows, as Prometheus expects.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "endpoints", None)
+        if shard is None:
+            shard = self._local.endpoints = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _stats(self, key):
+        shard = self._shard()
+        stats = shard.get(key)
+        if stats is None:
+            stats = shard[key] = EndpointStats()
+        return stats
+
+    def begin(self, method, url):
+        """Count a call as in flight; returns the endpoint key to pass to ``end`` on the same thread."""
+        key = endpoint_key(method, url)
+        self._stats(key).in_flight += 1
+        return key
+
+    def end(self, key, status, seconds, bytes_out=0, bytes_in=0):
+        """Record a finished call; ``status`` is the HTTP status, or ``"error"`` when none came back."""
+        stats = self._stats(key)
+        stats.in_flight -= 1
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.bytes_out += bytes_out
+        stats.bytes_in += bytes_in
+        stats.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        stats.seconds += seconds
+
+    def collect(self):
+        """``{endpoint: totals}`` summed over every thread's shard."""
+        with self._lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for key, stats in shard.copy().items():
+                total = totals.get(key)
+                if total is None:
+                    total = totals[key] = {"statuses": {}, "in_flight": 0, "bytes_out": 0, "bytes_in": 0,
+                                           "buckets": [0] * (len(BUCKETS) + 1), "seconds": 0.0}
+                for status, count in stats.statuses.copy().items():
+                    total["statuses"][status] = total["statuses"].get(status, 0) + count
+                total["in_flight"] += stats.in_flight
+                total["bytes_out"] += stats.bytes_out
+                total["bytes_in"] += stats.bytes_in
+                for index, count in enumerate(list(stats.buckets)):
+                    total["buckets"][index] += count
+                total["seconds"] += stats.seconds
+        return dict(sorted(totals.items()))
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(totals):
+    """Prometheus text exposition of ``Metrics.collect()``."""
+    lines = ["# HELP crm_requests_total Calls to the CRM API by endpoint and HTTP status.",
+             "# TYPE crm_requests_total counter"]
+    for key, total in totals.items():
+        for status, count in sorted(total["statuses"].items(), key=lambda item: str(item[0])):
+            lines.append(f'crm_requests_total{{endpoint="{_label(key)}",status="{status}"}} {count}')
+    lines += ["# HELP crm_requests_in_flight Calls sent and not yet answered.",
+              "# TYPE crm_requests_in_flight gauge"]
+    lines += [f'crm_requests_in_flight{{endpoint="{_label(key)}"}} {total["in_flight"]}'
+              for key, total in totals.items()]
+    for name, field, help_text in (("crm_request_bytes_total", "bytes_out", "Request body bytes sent."),
+                                   ("crm_response_bytes_total", "bytes_in", "Response body bytes received.")):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        lines += [f'{name}{{endpoint="{_label(key)}"}} {total[field]}' for key, total in totals.items()]
+    lines += ["# HELP crm_request_duration_seconds Latency of calls to the CRM API, including retries.",
+              "# TYPE crm_request_duration_seconds histogram"]
+    for key, total in totals.items():
+        label = _label(key)
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), total["buckets"]):
+            cumulative += count
+            lines.append(f'crm_request_duration_seconds_bucket{{endpoint="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'crm_request_duration_seconds_sum{{endpoint="{label}"}} {total["seconds"]:.6f}')
+        lines.append(f'crm_request_duration_seconds_count{{endpoint="{label}"}} {cumulative}')
+    return "\n".join(lines) + "\n"
+
+
+def quantile(buckets, fraction):
+    """Upper bound of the bucket holding the ``fraction`` quantile of ``buckets``; None when empty."""
+    count = sum(buckets)
+    if not count:
+        return None
+    seen = 0
+    for bound, bucket in zip(BUCKETS + (float("inf"),), buckets):
+        seen += bucket
+        if seen >= fraction * count:
+            return bound
+    return float("inf")
+
+
+def summarize(previous, current, seconds):
+    """One console line of what changed between two ``collect()`` results over ``seconds``."""
+    requests = errors = sent = received = in_flight = 0
+    buckets = [0] * (len(BUCKETS) + 1)
+    empty = {"statuses": {}, "bytes_out": 0, "bytes_in": 0, "buckets": buckets}
+    for key, total in current.items():
+        before = previous.get(key, empty)
+        for status, count in total["statuses"].items():
+            delta = count - before["statuses"].get(status, 0)
+            requests += delta
+            errors += delta if status == "error" or status >= 500 else 0
+        sent += total["bytes_out"] - before["bytes_out"]
+        received += total["bytes_in"] - before["bytes_in"]
+        in_flight += total["in_flight"]
+        buckets = [mine + now - then for mine, now, then in zip(buckets, total["buckets"], before["buckets"])]
+    p95 = quantile(buckets, 0.95)
+    if p95 is None:
+        tail = "p95 -"
+    elif p95 == float("inf"):
+        tail = f"p95 > {BUCKETS[-1]:g}s"
+    else:
+        tail = f"p95 <= {p95 * 1000:g}ms"
+    return (f"{requests / seconds:.1f} req/s, {errors} errors, {in_flight} in flight, {tail}, "
+            f"{sent / seconds / 1024:.1f} KiB/s out, {received / seconds / 1024:.1f} KiB/s in")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render(registry.collect()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would drown the run's own log
+        pass
+
+
+def _console(interval, stream):
+    previous, last = {}, time.monotonic()
+    while True:
+        time.sleep(interval)
+        current, now = registry.collect(), time.monotonic()
+        stream.write(f"[metrics] {summarize(previous, current, now - last)}\n")
+        previous, last = current, now
+
+
+registry = Metrics()
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start(port=None, interval=None, host="127.0.0.1", stream=sys.stderr):
+    """Serve /metrics on ``port`` and print a summary every ``interval`` seconds, once per process.
+
+    Defaults come from CRM_METRICS_PORT (empty: no endpoint, 0: any free
+    port) and CRM_METRICS_INTERVAL (0: no summary). When the port is taken,
+    as by a sibling worker of the parallel runner, this process is simply not
+    exported. Returns the server, or None.
+    """
+    global _started
+    port = config.METRICS_PORT if port is None else port
+    interval = config.METRICS_INTERVAL if interval is None else interval
+    with _start_lock:
+        if _started:
+            return None
+        _started = True
+    server = None
+    if port is not None:
+        try:
+            server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            logging.debug("Metrics endpoint not started on port %s: %s", port, e)
+        else:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="crm-metrics", daemon=True).start()
+            logging.info("Metrics at http://%s:%s/metrics", host, server.server_port)
+    if interval:
+        threading.Thread(target=_console, args=(interval, stream), name="crm-metrics-console", daemon=True).start()
+    return server
@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from harness import config
+from harness.latency import endpoint_key
+
+# Only verbs that can be replayed without side effects are retried, unless the
+# request carries an idempotency key the server deduplicates on
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Answers that count as a failure for retries, breakers and the limiter:
+# throttling and server errors, except 501, which means a missing endpoint
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)].
+
+    The jitter spreads retries from many workers over the window instead of
+    letting them hit a struggling server in lockstep.
+    """
+    base = config.BACKOFF_FACTOR if base is None else base
+    cap = config.BACKOFF_MAX if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after(response):
+    """Seconds from a numeric Retry-After header, or None."""
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+class RetryBudget:
+    """Caps retries at a fraction of the traffic so retries cannot multiply load.
+
+    Every request deposits ``ratio`` tokens and every retry withdraws one; a
+    small reserve lets a quiet process still retry its first failures.
+    """
+
+    def __init__(self, ratio=None, reserve=10.0):
+        self.ratio = config.RETRY_BUDGET if ratio is None else ratio
+        self.reserve = reserve
+        self._tokens = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.reserve, self._tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one endpoint.
+
+    ``failures`` consecutive failures open it; after ``cooldown`` seconds one
+    probe call is let through, and its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failures=None, cooldown=None):
+        self.failures = config.BREAKER_FAILURES if failures is None else failures
+        self.cooldown = config.BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.state = self.CLOSED
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return True
+            # Open, or half-open with the probe still in flight
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._consecutive = 0
+
+    def failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self.state == self.HALF_OPEN or self._consecutive >= self.failures:
+                opened = self.state != self.OPEN
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                return opened
+            return False
+
+
+class AIMDLimiter:
+    """Global in-flight request limit that adapts to observed latency.
+
+    The limit grows by one per window of successful calls (additive increase)
+    and halves when a call fails with overload or an endpoint's smoothed
+    latency rises above ``tolerance`` times the best latency seen for that
+    endpoint (multiplicative decrease). Baselines are kept per endpoint, so
+    slow list or batch calls are not mistaken for a fast GET slowing down.
+    Latency below ``floor`` seconds never counts as slow, so jitter on fast
+    calls is ignored. At most one decrease happens per smoothed round trip, so
+    one burst of slow answers does not collapse the limit to one.
+    """
+
+    def __init__(self, initial=None, minimum=1, maximum=None, tolerance=None, floor=None):
+        self.maximum = maximum or config.LIMIT_MAX
+        self.minimum = minimum
+        self.limit = float(initial or self.maximum)
+        self.tolerance = config.LIMIT_TOLERANCE if tolerance is None else tolerance
+        self.floor = config.LIMIT_LATENCY_FLOOR if floor is None else floor
+        self.in_flight = 0
+        # endpoint key -> [smoothed latency, best smoothed latency]
+        self._latency = {}
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def try_acquire(self):
+        """Take a slot if one is free right now; returns whether it did."""
+        with self._condition:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def abandon(self):
+        """Give back a slot taken for a call that was never sent; no latency is recorded."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def release(self, seconds, overloaded=False, key=None):
+        with self._condition:
+            self.in_flight -= 1
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = [seconds, seconds]
+            else:
+                latency[0] = 0.8 * latency[0] + 0.2 * seconds
+                # The best latency drifts up slowly so a permanently slower server becomes the new normal
+                latency[1] = min(latency[0], latency[1] * 1.001)
+            smoothed, best = latency
+            now = time.monotonic()
+            slow = smoothed > max(self.floor, best * self.tolerance)
+            if overloaded or slow:
+                if now - self._last_decrease >= smoothed:
+                    self._last_decrease = now
+                    self.limit = max(self.minimum, self.limit / 2)
+                    logging.info("Concurrency limit lowered to %d (%s smoothed latency %.3fs)",
+                                 self.limit, key, smoothed)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class Resilience:
+    """Retries, per-endpoint breakers and the adaptive limiter around one session's calls."""
+
+    def __init__(self, max_retries=None, backoff_factor=None):
+        self.max_retries = config.MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_factor = config.BACKOFF_FACTOR if backoff_factor is None else backoff_factor
+        self.budget = RetryBudget()
+        self.limiter = AIMDLimiter() if config.ADAPTIVE_LIMIT else None
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, key):
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker()
+            return breaker
+
+    def retryable(self, method, kwargs):
+        """Whether the call may be sent again: idempotent or keyed, with a body that can be re-read."""
+        headers = kwargs.get("headers") or {}
+        if method.upper() not in IDEMPOTENT_METHODS and IDEMPOTENCY_HEADER not in headers:
+            return False
+        # Streamed uploads are consumed by the first attempt
+        return "files" not in kwargs and isinstance(kwargs.get("data"), (type(None), bytes, str, dict))
+
+    def _admit(self, breaker, key):
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {key} after repeated failures; not calling the server")
+        self.budget.deposit()
+
+    def _settle(self, breaker, key, overloaded):
+        if breaker is not None:
+            if overloaded and breaker.failure():
+                logging.warning("Circuit opened for %s", key)
+            elif not overloaded:
+                breaker.success()
+
+    def _retry_delay(self, key, attempt, retryable, error, response, unsent):
+        """Seconds to wait before resending a failed call, or None when the failure is final."""
+        # A call that never reached the server (``unsent``) is safe to resend, even a POST
+        may_retry = retryable or isinstance(error, unsent)
+        if attempt >= self.max_retries or not may_retry or not self.budget.withdraw():
+            return None
+        delay = backoff_delay(attempt, self.backoff_factor)
+        if response is not None and response.status_code == 429:
+            delay = max(delay, retry_after(response) or 0.0)
+        logging.info("Retrying %s in %.2fs after %s", key, delay,
+                     error.__class__.__name__ if error is not None else f"HTTP {response.status_code}")
+        return delay
+
+    def call(self, send, method, url, **kwargs):
+        """``send(method, url, **kwargs)`` with retries, breaker and limiter applied."""
+        key = endpoint_key(method, url)
+        breaker = self.breaker(key) if config.BREAKER_FAILURES else None
+        retryable = self.retryable(method, kwargs)
+        attempt = 0
+        while True:
+            self._admit(breaker, key)
+            response, error, overloaded = None, None, False
+            if self.limiter is not None:
+                self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = send(method, url, **kwargs)
+                overloaded = response.status_code in RETRY_STATUSES
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error, overloaded = e, True
+            except BaseException:
+                # Any other error still settles the breaker: a half-open probe that never
+                # settles would block the endpoint for good
+                self._settle(breaker, key, True)
+                raise
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(time.perf_counter() - start, overloaded, key)
+            self._settle(breaker, key, overloaded)
+            if not overloaded:
+                return response
+            delay = self._retry_delay(key, attempt, retryable, error, response, requests.exceptions.ConnectTimeout)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                # Hand the connection back to the pool instead of leaving it to the garbage collector
+                response.close()
+            attempt += 1
+            time.sleep(delay)
+
+    async def call_async(self, send, method, url, transient, unsent=(), **kwargs):
+        """``await send(method, url, **kwargs)`` under the same retries, breakers and limiter as ``call``.
+
+        ``transient`` are the client's exceptions that count as a failed
+        attempt, and ``unsent`` those raised before anything reached the
+        server. ``send`` must return a fully read response.
+        """
+        key = endpoint_key(method, url)
+        breaker = self.breaker(key) if config.BREAKER_FAILURES else None
+        retryable = self.retryable(method, kwargs)
+        attempt = 0
+        while True:
+            self._admit(breaker, key)
+            response, error, overloaded = None, None, False
+            if self.limiter is not None and not self.limiter.try_acquire():
+                try:
+                    await self._wait_for_slot()
+                except BaseException:
+                    # Cancelled before sending; the breaker may have admitted this call as its probe
+                    self._settle(breaker, key, True)
+                    raise
+            start = time.perf_counter()
+            try:
+                response = await send(method, url, **kwargs)
+                overloaded = response.status_code in RETRY_STATUSES
+            except transient as e:
+                error, overloaded = e, True
+            except BaseException:
+                self._settle(breaker, key, True)
+                raise
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(time.perf_counter() - start, overloaded, key)
+            self._settle(breaker, key, overloaded)
+            if not overloaded:
+                return response
+            delay = self._retry_delay(key, attempt, retryable, error, response, unsent)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _wait_for_slot(self):
+        """Take a limiter slot on a pool thread, since the limiter is shared with the threaded callers."""
+        acquiring = asyncio.get_running_loop().run_in_executor(None, self.limiter.acquire)
+        try:
+            # Shielded: a cancelled caller's pool thread still takes the slot, and it must be given back
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(self._abandon_slot)
+            raise
+
+    def _abandon_slot(self, acquiring):
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self.limiter.abandon()
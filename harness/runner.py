@@ -0,0 +1,204 @@
+import argparse
+import glob
+import importlib
+import inspect
+import json
+import multiprocessing.util
+import os
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from harness import cassette, config, journal
+from harness.fixtures import WORKER_TAG_ENV, release_session_fixtures
+from harness.cassette import close_writer
+from harness.latency import LatencyRecorder, recorder
+from harness.logConfig import flush_logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def discover_modules():
+    """Module names of every suite: Test/*Test.py plus the top-level saleTest."""
+    modules = [
+        f"Test.{os.path.splitext(os.path.basename(path))[0]}"
+        for path in sorted(glob.glob(os.path.join(ROOT, "Test", "*Test.py")))
+    ]
+    modules.append("saleTest")
+    return modules
+
+
+def discover_shards(modules=None):
+    """One shard per TestCase class, so setUp/tearDown state never crosses workers."""
+    loader = unittest.defaultTestLoader
+    shards = []
+    for module_name in modules or discover_modules():
+        module = importlib.import_module(module_name)
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+            if (issubclass(cls, unittest.TestCase) and cls.__module__ == module.__name__
+                    and loader.getTestCaseNames(cls)):
+                shards.append((module_name, class_name))
+    return shards
+
+
+def _init_worker(token_cache):
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    # Workers share one on-disk uuap token instead of each logging in
+    config.TOKEN_CACHE = token_cache
+    # Fixture names such as "testuser" and "uuapTest" get this suffix via unique()
+    os.environ[WORKER_TAG_ENV] = f"w{os.getpid()}"
+    # Pool workers skip atexit, so session fixtures are released by a finalizer
+    multiprocessing.util.Finalize(None, release_session_fixtures, exitpriority=10)
+    # ...then the cassette segment gets its index and queued log records are written out
+    multiprocessing.util.Finalize(None, close_writer, exitpriority=5)
+    multiprocessing.util.Finalize(None, flush_logging, exitpriority=0)
+
+
+def _run_shard(shard):
+    module_name, class_name = shard
+    # Recorded exchanges carry the shard, so a replay can run it where it was recorded
+    cassette.set_shard(f"{module_name}.{class_name}")
+    cls = getattr(importlib.import_module(module_name), class_name)
+    suite = unittest.defaultTestLoader.loadTestsFromTestCase(cls)
+    # Collected up front: a suite drops its tests as they finish
+    test_ids = [test.id() for test in suite]
+    result = unittest.TestResult()
+    start = time.perf_counter()
+    suite.run(result)
+    return {
+        "shard": f"{module_name}.{class_name}",
+        "worker": os.environ.get(WORKER_TAG_ENV, ""),
+        "tests": test_ids,
+        "tests_run": result.testsRun,
+        "failures": [[test.id(), traceback] for test, traceback in result.failures],
+        "errors": [[test.id(), traceback] for test, traceback in result.errors],
+        "skipped": [[test.id(), reason] for test, reason in result.skipped],
+        "duration": time.perf_counter() - start,
+        # Reset so the next shard on this worker reports only its own calls
+        "latency": recorder.snapshot(reset=True),
+    }
+
+
+def _failed_report(shard, error):
+    name = f"{shard[0]}.{shard[1]}"
+    return {"shard": name, "worker": "", "tests": [], "tests_run": 0, "failures": [],
+            "errors": [[name, repr(error)]], "skipped": [], "duration": 0.0, "latency": {}}
+
+
+def _run_group(segment, shards):
+    """Run ``shards`` one after another, answered from the cassette ``segment`` when replaying."""
+    if segment is not None:
+        cassette.get_cassette().select(segment)
+    reports = []
+    try:
+        for shard in shards:
+            try:
+                reports.append(_run_shard(shard))
+            except Exception as e:
+                # Import-time failures surface here rather than inside the TestResult
+                reports.append(_failed_report(shard, e))
+        return reports
+    finally:
+        if segment is not None:
+            # The recording worker created its own session fixtures; the next group must too
+            release_session_fixtures()
+            cassette.get_cassette().select(None)
+
+
+def shard_groups(shards):
+    """Shards grouped into pool tasks: one each, or per recorded segment when replaying a cassette.
+
+    A replay must see the IDs its own recording was given, so the shards one
+    recording worker ran are replayed by one worker, in the same order.
+    """
+    if config.CASSETTE_MODE != "replay":
+        return [(None, [shard]) for shard in shards]
+    by_name = {f"{module_name}.{class_name}": (module_name, class_name) for module_name, class_name in shards}
+    return [(segment, [by_name[name] for name in names])
+            for segment, names in cassette.get_cassette().shard_groups(by_name)]
+
+
+def run_parallel(shards, workers=None):
+    """Run shards across a process pool and return the per-shard reports in shard order."""
+    reports = {}
+    token_cache = config.TOKEN_CACHE or os.path.join(tempfile.gettempdir(), "crm-uuap-token.json")
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(token_cache,)) as pool:
+        futures = {pool.submit(_run_group, segment, group): group for segment, group in shard_groups(shards)}
+        for future in as_completed(futures):
+            try:
+                group = future.result()
+            except Exception as e:
+                # A worker that died takes its whole group with it
+                group = [_failed_report(shard, e) for shard in futures[future]]
+            for report in group:
+                reports[report["shard"]] = report
+    return [reports[f"{module_name}.{class_name}"] for module_name, class_name in shards]
+
+
+def merge_reports(reports, elapsed, workers):
+    """Fold per-shard reports into a single run report."""
+    return {
+        "workers": workers,
+        "elapsed": elapsed,
+        "tests_run": sum(report["tests_run"] for report in reports),
+        "failures": [failure for report in reports for failure in report["failures"]],
+        "errors": [error for report in reports for error in report["errors"]],
+        "skipped": [skip for report in reports for skip in report["skipped"]],
+        "shards": reports,
+    }
+
+
+def print_report(report, stream=sys.stderr):
+    for shard in report["shards"]:
+        status = "FAIL" if shard["failures"] or shard["errors"] else "ok"
+        stream.write(f"{shard['shard']:<60} {shard['tests_run']:>3} tests {shard['duration']:8.3f}s  {status}\n")
+    for kind in ("failures", "errors"):
+        for test_id, traceback in report[kind]:
+            stream.write("=" * 70 + f"\n{kind[:-1].upper()}: {test_id}\n" + "-" * 70 + f"\n{traceback}\n")
+    stream.write("-" * 70 + "\n")
+    stream.write(f"Ran {report['tests_run']} tests in {report['elapsed']:.3f}s on {report['workers']} workers\n")
+    if report["failures"] or report["errors"]:
+        stream.write(f"FAILED (failures={len(report['failures'])}, errors={len(report['errors'])})\n")
+    else:
+        stream.write("OK\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run every CRM suite sharded across worker processes.")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--report", help="also write the merged report to this JSON file")
+    parser.add_argument("--latency-report", default=config.LATENCY_REPORT, metavar="PREFIX",
+                        help="write merged per-endpoint latency percentiles to PREFIX.json and PREFIX.txt")
+    parser.add_argument("modules", nargs="*", help="suite modules to run (default: all)")
+    args = parser.parse_args(argv)
+
+    shards = discover_shards(args.modules)
+    # Workers inherit the run id, so their journals can be swept together below
+    os.environ[journal.RUN_ENV] = journal.run_id()
+    start = time.perf_counter()
+    reports = run_parallel(shards, args.workers)
+    report = merge_reports(reports, time.perf_counter() - start, args.workers)
+    print_report(report)
+    if config.JOURNAL and config.JOURNAL_SWEEP:
+        swept, remaining = journal.sweep_run()
+        if swept or remaining:
+            sys.stderr.write(f"Swept {swept} leaked records; {remaining} left in {config.JOURNAL}\n")
+        # The sweep's deletes went through this process's recorder; they are not the
+        # suites' latency and must not replace the merged report when it is written at exit
+        recorder.snapshot(reset=True)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    latency = LatencyRecorder()
+    for shard in reports:
+        latency.merge(shard["latency"])
+    sys.stderr.write("\n" + latency.format_table())
+    if args.latency_report:
+        latency.write_report(args.latency_report)
+    return 0 if not report["failures"] and not report["errors"] else 1
@@ -0,0 +1,312 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import config
+from harness.fixtures import BASE_CUSTOMER, BASE_PRODUCT, Fixture, FixtureTestCase, isolated, unique
+from harness.httpClient import get_session
+from harness.listing import at_least, contains_id
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - JSON scenario files still load
+    yaml = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIO_DIR = os.path.join(ROOT, "Test", "scenarios")
+
+METHODS = ("get", "post", "put", "patch", "delete")
+DEFAULT_EXPECT = {"post": 201, "delete": 204}
+
+# Fixtures every scenario file can reference without declaring them
+BUILTIN_FIXTURES = {"base_customer": BASE_CUSTOMER, "base_product": BASE_PRODUCT}
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+class ScenarioError(Exception):
+    """Raised when a scenario file is malformed or refers to something undefined."""
+
+
+def resolve(value, context):
+    """Fill ``{name}`` placeholders from ``context`` and apply ``{unique: ...}`` markers.
+
+    A string that is exactly one placeholder keeps the type of the value it
+    names, so ``"{product_id}"`` in a payload stays an integer.
+    """
+    if isinstance(value, str):
+        match = _PLACEHOLDER.fullmatch(value)
+        if match:
+            return context[match.group(1)]
+        return value.format_map(context) if "{" in value else value
+    if isinstance(value, dict):
+        if set(value) == {"unique"}:
+            return unique(resolve(value["unique"], context))
+        return {key: resolve(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, context) for item in value]
+    return value
+
+
+def _names(value):
+    """Placeholder names used anywhere in ``value``."""
+    if isinstance(value, str):
+        return set(_PLACEHOLDER.findall(value))
+    if isinstance(value, dict):
+        return set().union(*(_names(item) for item in value.values())) if value else set()
+    if isinstance(value, list):
+        return set().union(*(_names(item) for item in value)) if value else set()
+    return set()
+
+
+def _segments(path):
+    return tuple(segment for segment in path.split("?", 1)[0].split("/") if segment)
+
+
+class Step:
+    """One request or listing check inside a scenario test.
+
+    Besides the HTTP verbs a step can be ``at_least: path`` (the collection is
+    not empty) or ``contains: {path, id}`` (the collection lists that id).
+    ``save`` names response fields to keep for later steps; a bare name saves
+    the ``id``. Records created by a saved POST are deleted when the test ends
+    unless a later step already deleted them.
+    """
+
+    def __init__(self, index, data):
+        kinds = [key for key in data if key in METHODS or key in ("at_least", "contains")]
+        if len(kinds) != 1:
+            raise ScenarioError(f"step {index + 1} needs exactly one of {', '.join(METHODS)}, at_least, contains")
+        self.kind = kinds[0]
+        target = data[self.kind]
+        if self.kind == "contains":
+            self.path, self.entity_id = target["path"], target["id"]
+        else:
+            self.path, self.entity_id = target, None
+        self.name = data.get("name") or f"{self.kind} {self.path}"
+        self.json = data.get("json")
+        self.expect = data.get("expect", DEFAULT_EXPECT.get(self.kind, 200))
+        self.fields = data.get("fields", {})
+        self.min_items = data.get("min_items")
+        save = data.get("save", {})
+        self.save = {save: "id"} if isinstance(save, str) else save
+        self.uses = _names(self.path) | _names(self.json) | _names(self.fields) | _names(self.entity_id)
+        self.mutates = self.kind in ("post", "put", "patch", "delete")
+
+    def conflicts_with(self, other):
+        """Whether the two steps touch overlapping paths and must keep their order.
+
+        Reads commute with reads and creates in one collection commute with
+        each other; anything else on the same path, or a parent of it, does not.
+        """
+        if not (self.mutates or other.mutates):
+            return False
+        if self.kind == other.kind == "post" and self.path == other.path:
+            return False
+        mine, theirs = _segments(self.path), _segments(other.path)
+        shorter = min(len(mine), len(theirs))
+        return mine[:shorter] == theirs[:shorter]
+
+
+class TestPlan:
+    """Steps of one test grouped into levels; steps inside a level run concurrently.
+
+    A step depends on every earlier step that saves a name it uses or that
+    conflicts with it, and lands one level after the deepest of those.
+    """
+
+    def __init__(self, name, steps, isolated=False):
+        self.name = name
+        self.steps = [Step(index, data) for index, data in enumerate(steps)]
+        self.isolated = isolated
+        depth = []
+        for index, step in enumerate(self.steps):
+            level = 0
+            for earlier in range(index):
+                other = self.steps[earlier]
+                if step.uses & set(other.save) or step.conflicts_with(other):
+                    level = max(level, depth[earlier] + 1)
+            depth.append(level)
+        self.levels = [[] for _ in range(max(depth, default=-1) + 1)]
+        for step, level in zip(self.steps, depth):
+            self.levels[level].append(step)
+
+    def run(self, test, context, session):
+        created = {}
+        test.addCleanup(_delete_created, session, created)
+        for level in self.levels:
+            if len(level) == 1:
+                _run_step(test, level[0], context, session, created)
+                continue
+            with ThreadPoolExecutor(max_workers=min(len(level), config.POOL_SIZE)) as pool:
+                futures = [pool.submit(_run_step, test, step, context, session, created) for step in level]
+            # Surface the first failure in step order so reports are stable
+            for future in futures:
+                future.result()
+
+
+def _run_step(test, step, context, session, created):
+    path = resolve(step.path, context)
+    if step.kind == "at_least":
+        test.assertTrue(at_least(path, session=session), f"{path} is empty")
+        return
+    if step.kind == "contains":
+        entity_id = resolve(step.entity_id, context)
+        test.assertTrue(contains_id(path, entity_id, session=session), f"{path} does not list {entity_id}")
+        return
+    payload = resolve(step.json, context) if step.json is not None else None
+    response = session.request(step.kind.upper(), path, json=payload)
+    test.assertEqual(response.status_code, step.expect, f"{step.kind.upper()} {path}: {response.text}")
+    if step.kind == "delete":
+        created.pop(path, None)
+    if not (step.fields or step.min_items is not None or step.save):
+        logging.debug("%s %s -> %s", step.kind.upper(), path, response.status_code)
+        return
+    data = response.json()
+    for field, expected in step.fields.items():
+        test.assertEqual(data[field], resolve(expected, context), f"{path} field {field}")
+    if step.min_items is not None:
+        test.assertGreaterEqual(len(data), step.min_items, f"{path} lists too few records")
+    for name, field in step.save.items():
+        context[name] = data[field]
+    if step.kind == "post" and "id" in data:
+        created[f"{path}/{data['id']}"] = True
+    logging.debug("%s %s -> %s: %s", step.kind.upper(), path, response.status_code, data)
+
+
+def _delete_created(session, created):
+    # Records no delete step removed: sub-resources of scenarios without one,
+    # and whatever a scenario that failed part way had created
+    for path in reversed(list(created)):
+        response = session.delete(path)
+        if response.status_code not in (204, 404):
+            logging.warning("Cleaning up %s failed with HTTP %s", path, response.status_code)
+        else:
+            logging.debug("Deleted %s created by the scenario", path)
+
+
+def load(name):
+    """Read a scenario file by path, or by name from Test/scenarios (.yaml, .yml or .json)."""
+    candidates = [name] if os.path.splitext(name)[1] else [
+        os.path.join(SCENARIO_DIR, name + extension) for extension in (".yaml", ".yml", ".json")]
+    for path in candidates:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".json"):
+                return json.load(f)
+            if yaml is None:
+                raise ScenarioError(f"PyYAML is needed to read {path}; install it or use a .json scenario")
+            return yaml.safe_load(f)
+    raise ScenarioError(f"no scenario file for {name!r}")
+
+
+def compile_fixtures(spec):
+    """Fixture objects for ``spec["fixtures"]`` plus the built-in ones.
+
+    A fixture's ``requires`` maps placeholder names to other fixtures, whose
+    IDs fill those placeholders in its payload.
+    """
+    declared = spec.get("fixtures") or {}
+    fixtures = dict(BUILTIN_FIXTURES)
+
+    def build(name, chain=()):
+        if name in fixtures:
+            return fixtures[name]
+        if name not in declared:
+            raise ScenarioError(f"undefined fixture {name!r}")
+        if name in chain:
+            raise ScenarioError(f"fixture {name} requires itself through {' -> '.join(chain)}")
+        data = declared[name]
+        requires = {key: build(dependency, chain + (name,)) for key, dependency in (data.get("requires") or {}).items()}
+        fixtures[name] = Fixture(name, data["path"], lambda payload=data["payload"], **ids: resolve(payload, ids),
+                                 scope=data.get("scope", "class"), requires=requires)
+        return fixtures[name]
+
+    for name in declared:
+        build(name)
+    return fixtures
+
+
+def compile_plans(spec):
+    """``{class_name: {test_name: TestPlan}}`` for every case in ``spec``."""
+    plans = {}
+    for class_name, case in (spec.get("cases") or {}).items():
+        tests = {}
+        for test_name, test in case.get("tests", {}).items():
+            if isinstance(test, list):
+                test = {"steps": test}
+            try:
+                tests[test_name] = TestPlan(test_name, test["steps"], test.get("isolated", False))
+            except (KeyError, TypeError, ScenarioError) as e:
+                raise ScenarioError(f"{class_name}.{test_name}: {e}") from e
+        plans[class_name] = tests
+    return plans
+
+
+def _test_method(plan):
+    def test(self):
+        context = {attribute: getattr(self, attribute) for attribute in self.fixtures}
+        plan.run(self, context, get_session())
+    test.__name__ = plan.name
+    return isolated(test) if plan.isolated else test
+
+
+def build_cases(spec, module):
+    """FixtureTestCase classes for ``spec``, a parsed scenario file or the same shape as Python data.
+
+    Classes are attributed to ``module`` so the runner's discovery, shards and
+    load-mix names treat them like hand-written suites.
+    """
+    fixtures = compile_fixtures(spec)
+    cases = {}
+    for class_name, tests in compile_plans(spec).items():
+        declared = spec["cases"][class_name].get("fixtures", {})
+        missing = [name for name in declared.values() if name not in fixtures]
+        if missing:
+            raise ScenarioError(f"{class_name} uses undefined fixtures: {', '.join(missing)}")
+        namespace = {"__module__": module, "__qualname__": class_name,
+                     "fixtures": {attribute: fixtures[name] for attribute, name in declared.items()}}
+        namespace.update((name, _test_method(plan)) for name, plan in tests.items())
+        cases[class_name] = type(class_name, (FixtureTestCase,), namespace)
+    return cases
+
+
+def load_cases(name, module):
+    return build_cases(load(name), module)
+
+
+def describe(spec):
+    """Human readable plan: the concurrent levels of every test."""
+    lines = []
+    for class_name, tests in compile_plans(spec).items():
+        lines.append(class_name)
+        for test_name, plan in tests.items():
+            lines.append(f"  {test_name}{' (isolated)' if plan.isolated else ''}: "
+                         f"{len(plan.steps)} steps in {len(plan.levels)} levels")
+            for depth, level in enumerate(plan.levels):
+                lines.append(f"    {depth}: {' | '.join(step.name for step in level)}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m harness.scenarios",
+                                     description="Print the compiled execution plan of scenario files.")
+    parser.add_argument("names", nargs="*", help="scenario names or paths (default: all in Test/scenarios)")
+    args = parser.parse_args(argv)
+    names = args.names or sorted(os.path.splitext(entry)[0] for entry in os.listdir(SCENARIO_DIR))
+    try:
+        for name in names:
+            print(f"# {name}\n{describe(load(name))}\n")
+    except ScenarioError as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
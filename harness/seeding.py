@@ -0,0 +1,188 @@
+import itertools
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from harness import config
+from harness.fixtures import FixtureError
+from harness.httpClient import get_session
+from harness.latency import ID_SEGMENT
+
+# Servers answer these when a batch endpoint does not exist for a resource
+BATCH_UNSUPPORTED = (404, 405, 501)
+
+BATCH_SIZE = 100
+
+# (base URL, collection pattern) -> whether its batch endpoints exist
+_batch_support = {}
+_batch_support_lock = threading.Lock()
+
+
+class SeedError(FixtureError):
+    """Some records could not be created; ``ids`` holds what was, with None for failures."""
+
+    def __init__(self, message, ids):
+        super().__init__(message)
+        self.ids = ids
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _support_key(session, resource):
+    """``customers/7/notes`` on a session -> ``(base_url, "customers/{id}/notes")``.
+
+    Every customer's notes share one answer, and one environment's answer
+    never decides for another's.
+    """
+    pattern = "/".join("{id}" if ID_SEGMENT.match(segment) else segment for segment in resource.split("/"))
+    return getattr(session, "base_url", config.BASE_URL), pattern
+
+
+def _batch_supported(key, status_code):
+    """Remember per key whether the batch endpoint exists, from its first answer."""
+    with _batch_support_lock:
+        if key not in _batch_support:
+            _batch_support[key] = status_code not in BATCH_UNSUPPORTED
+        return _batch_support[key]
+
+
+def _create_one(session, resource, payload):
+    try:
+        response = session.post(f"/{resource}", json=payload)
+    except requests.exceptions.RequestException as e:
+        logging.warning("Creating %s failed: %s", resource, e)
+        return None
+    if response.status_code != 201:
+        logging.warning("Creating %s failed with HTTP %s: %s", resource, response.status_code, response.text)
+        return None
+    return response.json()["id"]
+
+
+def _delete_one(session, resource, entity_id):
+    response = session.delete(f"/{resource}/{entity_id}")
+    # Already gone counts as cleaned up
+    return response.status_code in (204, 404)
+
+
+def _create_batch(session, resource, payloads):
+    """Return created IDs for ``payloads``, or None when the batch endpoint is missing."""
+    key = _support_key(session, resource)
+    if _batch_support.get(key) is False:
+        return None
+    try:
+        response = session.post(f"/{resource}/batch", json=payloads)
+    except requests.exceptions.RequestException as e:
+        logging.warning("Batch create of %s failed: %s", resource, e)
+        return [None] * len(payloads)
+    if not _batch_supported(key, response.status_code):
+        return None
+    if response.status_code != 201:
+        logging.warning("Batch create of %s failed with HTTP %s: %s", resource, response.status_code, response.text)
+        return [None] * len(payloads)
+    records = response.json()
+    if isinstance(records, dict):
+        records = records.get("items", [])
+    ids = [record["id"] for record in records]
+    if len(ids) != len(payloads):
+        # IDs could no longer be matched to the payloads that produced them
+        raise SeedError(f"Batch create of {resource} returned {len(ids)} records for {len(payloads)} payloads", ids)
+    return ids
+
+
+def _delete_batch(session, resource, ids):
+    """Return True when the batch delete succeeded, or None when the endpoint is missing."""
+    key = _support_key(session, resource)
+    if _batch_support.get(key) is False:
+        return None
+    response = session.post(f"/{resource}/batch_delete", json={"ids": ids})
+    if not _batch_supported(key, response.status_code):
+        return None
+    return response.status_code in (200, 204)
+
+
+def seed(resource, payloads, session=None, batch_size=BATCH_SIZE, concurrency=None):
+    """Create one ``resource`` record per payload and return their IDs in input order.
+
+    Uses ``POST /<resource>/batch`` when the server has it and otherwise
+    falls back to concurrent single POSTs over the shared pooled session.
+    A failed chunk does not stop the others. Raises SeedError if any record
+    fails, carrying the IDs of every chunk with None for failures, so the
+    caller can tear down whatever was created.
+    """
+    session = session or get_session()
+    payloads = list(payloads)
+    chunks = list(_chunks(payloads, batch_size))
+    errors = []
+    with ThreadPoolExecutor(max_workers=concurrency or config.POOL_SIZE) as pool:
+        ids = []
+        for chunk in chunks:
+            try:
+                created = _create_batch(session, resource, chunk)
+            except SeedError as e:
+                # Created but unmatched to their payloads; still handed back for teardown
+                errors.append(str(e))
+                created = e.ids + [None] * (len(chunk) - len(e.ids))
+            if created is None:
+                created = list(pool.map(lambda payload: _create_one(session, resource, payload), chunk))
+            ids.extend(created)
+    failed = sum(entity_id is None for entity_id in ids)
+    if failed:
+        errors.append(f"{failed} of {len(payloads)} {resource} records could not be created")
+    if errors:
+        raise SeedError("; ".join(errors), ids)
+    logging.info("Seeded %s %s records", len(ids), resource)
+    return ids
+
+
+def _create_chunk(session, resource, chunk):
+    created = _create_batch(session, resource, chunk)
+    if created is None:
+        created = [_create_one(session, resource, payload) for payload in chunk]
+    return created
+
+
+def seed_stream(resource, payloads, session=None, batch_size=BATCH_SIZE, concurrency=None):
+    """Create records from an iterable too large to hold and yield their IDs in input order.
+
+    ``payloads`` is consumed lazily: at most ``concurrency`` chunks of
+    ``batch_size`` are in flight, so memory stays bounded however many
+    records there are. Each chunk uses the batch endpoint where the server has
+    one. Failed records yield None instead of raising, so the caller decides
+    whether a partial load is usable.
+    """
+    session = session or get_session()
+    concurrency = concurrency or config.POOL_SIZE
+    payloads = iter(payloads)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            chunk = list(itertools.islice(payloads, batch_size))
+            if chunk:
+                pending.append(pool.submit(_create_chunk, session, resource, chunk))
+            if pending and (len(pending) >= concurrency or not chunk):
+                yield from pending.popleft().result()
+            elif not chunk:
+                return
+
+
+def teardown(resource, ids, session=None, batch_size=BATCH_SIZE, concurrency=None):
+    """Delete ``ids`` of ``resource`` in reverse creation order, batched where possible."""
+    session = session or get_session()
+    ids = [entity_id for entity_id in reversed(list(ids)) if entity_id is not None]
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency or config.POOL_SIZE) as pool:
+        for chunk in _chunks(ids, batch_size):
+            deleted = _delete_batch(session, resource, chunk)
+            if deleted is None:
+                failed += list(pool.map(lambda entity_id: _delete_one(session, resource, entity_id), chunk)).count(False)
+            elif not deleted:
+                failed += len(chunk)
+    if failed:
+        raise FixtureError(f"{failed} of {len(ids)} {resource} records could not be deleted")
+    logging.info("Tore down %s %s records", len(ids), resource)
@@ -0,0 +1,329 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import config
+from harness.latency import Histogram, LatencyRecorder, format_summary, recorder
+from harness.load import Pacer, resolve_task, run_task
+
+# Full CRUD flows of the inventory, order and customer suites. Creates are
+# balanced by deletes, so a healthy server's collections stay the same size
+SOAK_MIX = {
+    "Test.inventoryManagementTest.InventoryManagementTestCase.test_add_inventory": 10,
+    "Test.inventoryManagementTest.InventoryManagementTestCase.test_update_inventory": 10,
+    "Test.inventoryManagementTest.InventoryManagementTestCase.test_delete_inventory": 5,
+    "Test.inventoryManagementTest.InventoryManagementTestCase.test_list_inventory": 2,
+    "Test.orderManagerTest.OrderManagementTestCase.test_create_order": 10,
+    "Test.orderManagerTest.OrderManagementTestCase.test_update_order": 10,
+    "Test.orderManagerTest.OrderManagementTestCase.test_delete_order": 5,
+    "Test.orderManagerTest.OrderManagementTestCase.test_list_orders": 2,
+    "Test.crmAutoTest.CRMTestCase.test_get_customer": 10,
+    "Test.crmAutoTest.CRMTestCase.test_update_customer": 5,
+    "Test.crmAutoTest.CRMTestCase.test_delete_customer": 5,
+    "Test.crmAutoTest.CRMTestCase.test_update_customer_status": 5,
+    "Test.crmAutoTest.CRMTestCase.test_assign_task_to_customer": 5,
+    "Test.crmAutoTest.CRMTestCase.test_customer_notes": 5,
+    "Test.crmAutoTest.CRMTestCase.test_list_customers": 1,
+}
+
+# Smallest rise across a trend window worth reporting, per metric suffix;
+# below it a large relative growth is just noise on a tiny value
+MIN_RISE = {"_ms": 1.0, "error_rate": 0.01, "rss_mb": 5.0, "sockets": 2, "fds": 4, "threads": 2}
+
+# A trend must explain at least this much of the variance in its window
+MIN_R2 = 0.6
+
+
+def rss_mb():
+    """Resident set size of this process in MB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def open_descriptors():
+    """``(file descriptors, sockets)`` open in this process, or ``(None, None)`` without /proc."""
+    try:
+        names = os.listdir("/proc/self/fd")
+    except OSError:
+        return None, None
+    sockets = 0
+    for name in names:
+        try:
+            sockets += os.readlink(f"/proc/self/fd/{name}").startswith("socket:")
+        except OSError:
+            # Closed between listing and reading
+            pass
+    return len(names), sockets
+
+
+class TimeSeries:
+    """Rolling store of soak samples: the newest ``capacity`` in memory, all of them on disk.
+
+    Each sample is a flat ``{metric: value}`` dict with a ``t`` (seconds
+    since the start). With ``path`` every sample is also appended to a JSON
+    lines file as it is taken, so a run that is stopped or crashes after
+    hours still leaves its history.
+    """
+
+    def __init__(self, capacity=None, path=None):
+        self.samples = deque(maxlen=capacity or config.SOAK_HISTORY)
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def append(self, sample):
+        self.samples.append(sample)
+        if self._file is not None:
+            self._file.write(json.dumps(sample) + "\n")
+            self._file.flush()
+
+    def metrics(self):
+        names = {}
+        for sample in self.samples:
+            names.update(dict.fromkeys(sample))
+        names.pop("t", None)
+        return list(names)
+
+    def window(self, metric, size):
+        """``(t, value)`` points of ``metric`` in the last ``size`` samples that have it."""
+        points = [(sample["t"], sample.get(metric)) for sample in list(self.samples)[-size:]]
+        return [(t, value) for t, value in points if value is not None]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def fit(points):
+    """Least-squares line through ``points``; returns ``(slope, intercept, r2)``."""
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in points)
+    var_v = sum((v - mean_v) ** 2 for _, v in points)
+    if not var_t:
+        return 0.0, mean_v, 0.0
+    slope = sum((t - mean_t) * (v - mean_v) for t, v in points) / var_t
+    r2 = slope * slope * var_t / var_v if var_v else 0.0
+    return slope, mean_v - slope * mean_t, r2
+
+
+def _min_rise(metric):
+    return next((rise for suffix, rise in MIN_RISE.items() if metric.endswith(suffix)), 0.0)
+
+
+def detect_trends(series, window=None, threshold=None):
+    """Metrics that rose steadily over the last ``window`` samples.
+
+    A line is fitted to each metric. It is an upward trend when the fit
+    explains most of the variance (r² of at least MIN_R2), and the fitted rise
+    across the window is above the metric's MIN_RISE and above ``threshold``
+    times its fitted starting level. Error rate starts at zero on a healthy
+    server, so only its absolute rise counts. Returns ``{metric: trend}``.
+    """
+    window = window or config.SOAK_WINDOW
+    threshold = config.SOAK_TREND_THRESHOLD if threshold is None else threshold
+    trends = {}
+    for metric in series.metrics():
+        points = series.window(metric, window)
+        if len(points) < max(6, window // 2):
+            continue
+        slope, intercept, r2 = fit(points)
+        start, end = intercept + slope * points[0][0], intercept + slope * points[-1][0]
+        rise = end - start
+        if slope <= 0 or r2 < MIN_R2 or rise <= _min_rise(metric):
+            continue
+        relative = rise / start if start > 0 else None
+        if metric != "error_rate" and (relative is None or relative <= threshold):
+            continue
+        trends[metric] = {"start": start, "end": end, "per_hour": slope * 3600, "r2": r2, "relative": relative}
+    return trends
+
+
+class SoakWindow:
+    """Task outcomes of the current sample interval; swapped out by the sampler."""
+
+    def __init__(self):
+        self.tasks = Histogram()
+        self.errors = 0
+
+
+class Soak:
+    """Runs the mix at a fixed rate and samples a TimeSeries every ``interval`` seconds."""
+
+    def __init__(self, mix, rate, users, interval=None, series=None):
+        self.mix = mix
+        self.rate = rate
+        self.users = users
+        self.interval = interval or config.SOAK_INTERVAL
+        self.series = series or TimeSeries()
+        # Everything the per-interval snapshots took out of the shared recorder
+        self.totals = LatencyRecorder()
+        self.trends = {}
+        self.flagged = {}
+        self._window = SoakWindow()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.start = None
+
+    def record_task(self, seconds, ok):
+        with self._lock:
+            self._window.tasks.record(seconds * 1_000_000)
+            self._window.errors += 0 if ok else 1
+
+    def sample(self):
+        with self._lock:
+            window, self._window = self._window, SoakWindow()
+        endpoints = recorder.snapshot(reset=True)
+        self.totals.merge(endpoints)
+        fds, sockets = open_descriptors()
+        tasks = window.tasks.count
+        sample = {
+            "t": round(time.monotonic() - self.start, 3),
+            "tasks": tasks,
+            "error_rate": window.errors / tasks if tasks else None,
+            "task_p50_ms": window.tasks.percentile(50) / 1000 if tasks else None,
+            "task_p95_ms": window.tasks.percentile(95) / 1000 if tasks else None,
+            "rss_mb": rss_mb(),
+            "fds": fds,
+            "sockets": sockets,
+            "threads": threading.active_count(),
+        }
+        for key, data in sorted(endpoints.items()):
+            sample[f"{key} p95_ms"] = Histogram.from_dict(data).percentile(95) / 1000
+        self.series.append(sample)
+        self.trends = detect_trends(self.series)
+        for metric, trend in self.trends.items():
+            if metric not in self.flagged:
+                self.flagged[metric] = dict(trend, first_seen=sample["t"])
+                logging.warning("Upward trend in %s: %.2f -> %.2f over the last %d samples (%+.2f/hour)",
+                                metric, trend["start"], trend["end"], config.SOAK_WINDOW, trend["per_hour"])
+        return sample
+
+    def _sampler(self):
+        while not self._stop.wait(self.interval):
+            sample = self.sample()
+            sys.stderr.write(_format_sample(sample) + "\n")
+
+    def run(self, duration):
+        """Soak for ``duration`` seconds; returns the report."""
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        tasks = {name: resolve_task(name) for name in names}
+        # Per-request progress messages are noise over hours; trends and failures are logged as warnings
+        logging.getLogger().setLevel(logging.WARNING)
+        classes = {cls for cls, _ in tasks.values()}
+        for cls in classes:
+            cls.setUpClass()
+        pacer = Pacer(self.rate)
+        self.start = time.monotonic()
+        deadline = self.start + duration
+        recorder.snapshot(reset=True)
+
+        def virtual_user(index):
+            rng = random.Random(index)
+            while not self._stop.is_set():
+                pacer.wait()
+                if time.monotonic() >= deadline:
+                    return
+                name = rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                ok = run_task(*tasks[name])
+                self.record_task(time.perf_counter() - start, ok)
+
+        sampler = threading.Thread(target=self._sampler, name="crm-soak-sampler", daemon=True)
+        sampler.start()
+        pool = ThreadPoolExecutor(max_workers=self.users, thread_name_prefix="crm-soak")
+        try:
+            for future in [pool.submit(virtual_user, index) for index in range(self.users)]:
+                future.result()
+        except KeyboardInterrupt:
+            logging.warning("Soak interrupted; reporting what was sampled")
+        finally:
+            # Users finish their current task and stop; the pool cannot be left while they loop
+            self._stop.set()
+            pool.shutdown()
+            sampler.join()
+            self.sample()
+            for cls in classes:
+                cls.doClassCleanups()
+            self.series.close()
+        return self.report()
+
+    def report(self):
+        samples = list(self.series.samples)
+        return {"elapsed": samples[-1]["t"] if samples else 0.0, "samples": len(samples),
+                "trends": self.flagged, "endpoints": self.totals.summary(),
+                "first": samples[0] if samples else None, "last": samples[-1] if samples else None}
+
+
+def _format_sample(sample):
+    def number(key, spec):
+        return format(sample[key], spec) if sample.get(key) is not None else "-"
+    return (f"{sample['t']:>8.0f}s tasks={sample['tasks']} errors={number('error_rate', '.1%')} "
+            f"p50={number('task_p50_ms', '.1f')}ms p95={number('task_p95_ms', '.1f')}ms "
+            f"rss={number('rss_mb', '.1f')}MB sockets={number('sockets', 'd')} threads={sample['threads']}")
+
+
+def print_report(report, stream=sys.stderr):
+    stream.write("\n" + format_summary(report["endpoints"]))
+    first, last = report["first"], report["last"]
+    if first and last:
+        stream.write(f"\nSoaked {report['elapsed']:.0f}s in {report['samples']} samples; "
+                     f"RSS {first['rss_mb'] or 0:.1f} -> {last['rss_mb'] or 0:.1f} MB, "
+                     f"sockets {first['sockets']} -> {last['sockets']}\n")
+    if not report["trends"]:
+        stream.write("No upward trends\n")
+        return
+    stream.write(f"\n{'upward trend':<50} {'start':>9} {'end':>9} {'per hour':>10} {'r2':>5} {'since':>8}\n")
+    for metric, trend in report["trends"].items():
+        stream.write(f"{metric:<50} {trend['start']:>9.2f} {trend['end']:>9.2f} {trend['per_hour']:>+10.2f} "
+                     f"{trend['r2']:>5.2f} {trend['first_seen']:>7.0f}s\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m harness.soak",
+        description="Loop the inventory, order and customer CRUD flows at a fixed rate for hours and flag "
+                    "latency, error, memory and connection trends.")
+    parser.add_argument("-d", "--duration", type=float, default=3600, help="seconds to soak (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=5, help="task starts per second (default: %(default)s)")
+    parser.add_argument("-u", "--users", type=int, default=10,
+                        help="most tasks in flight at once (default: %(default)s)")
+    parser.add_argument("--interval", type=float, default=config.SOAK_INTERVAL,
+                        help="seconds per sample (default: %(default)s)")
+    parser.add_argument("--window", type=int, default=config.SOAK_WINDOW,
+                        help="samples each trend is fitted over (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=config.SOAK_TREND_THRESHOLD,
+                        help="growth across the window that flags a trend (default: %(default)s)")
+    parser.add_argument("--series", help="append every sample to this JSON lines file")
+    parser.add_argument("--mix", nargs="*", metavar="TASK=WEIGHT", help="override the soak mix")
+    parser.add_argument("--report", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    config.SOAK_WINDOW = args.window
+    config.SOAK_TREND_THRESHOLD = args.threshold
+    # Size the shared pool for the concurrency before the suites create it
+    config.POOL_SIZE = max(config.POOL_SIZE, args.users)
+    mix = SOAK_MIX
+    if args.mix:
+        mix = {name: float(weight) for name, weight in (item.rsplit("=", 1) for item in args.mix)}
+    soak = Soak(mix, args.rate, args.users, args.interval, TimeSeries(path=args.series))
+    report = soak.run(args.duration)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["trends"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
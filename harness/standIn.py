@@ -0,0 +1,463 @@
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from harness import config
+from harness.resilience import IDEMPOTENCY_HEADER
+
+# Top-level resources and the per-customer sub-resources the suites exercise
+COLLECTIONS = ("customers", "users", "products", "inventory", "orders", "opportunities")
+CUSTOMER_CHILDREN = ("tasks", "complaints", "interactions", "notes", "attachments", "custom_fields")
+
+ROUTES = [
+    (re.compile(r"^/(?P<collection>[a-z_]+)/batch$"), "batch"),
+    (re.compile(r"^/(?P<collection>[a-z_]+)/batch_delete$"), "batch_delete"),
+    (re.compile(r"^/(?P<collection>[a-z_]+)$"), "collection"),
+    (re.compile(r"^/(?P<collection>[a-z_]+)/(?P<id>\d+)$"), "item"),
+    (re.compile(r"^/customers/(?P<id>\d+)/status$"), "status"),
+    (re.compile(r"^/customers/(?P<id>\d+)/(?P<child>[a-z_]+)$"), "children"),
+    (re.compile(r"^/customers/(?P<id>\d+)/(?P<child>[a-z_]+)/(?P<child_id>\d+)$"), "child"),
+]
+
+UPLOAD_ROUTE = re.compile(r"^/customers/(?P<id>\d+)/attachments$")
+
+UPLOAD_BLOCK_SIZE = 64 * 1024
+
+
+class CRMStore:
+    """In-memory CRM data keyed by primary key, with a username index for users."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self.collections = {name: {} for name in COLLECTIONS}
+        self.children = {}
+        self.usernames = {}
+        # Idempotency-Key -> (status, payload) of the first answer, so retried creates are not duplicated
+        self.idempotent = {}
+
+    def next_id(self):
+        return next(self._ids)
+
+
+def conditional(method, status, payload, if_none_match=None):
+    """Add an ETag to successful GETs and answer 304 when the client already holds that version.
+
+    Returns ``(status, payload, headers)``.
+    """
+    if method != "GET" or status != 200:
+        return status, payload, {}
+    tag = f'"{zlib.crc32(payload):08x}-{len(payload)}"'
+    if if_none_match == tag:
+        return 304, b"", {"ETag": tag}
+    return status, payload, {"ETag": tag}
+
+
+def iter_body(body):
+    """Yield a request body as bytes blocks, whether it is bytes, a file-like object or an iterable."""
+    if body is None:
+        return
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        yield bytes(body)
+        return
+    if hasattr(body, "read"):
+        while True:
+            block = body.read(UPLOAD_BLOCK_SIZE)
+            if not block:
+                return
+            yield block.encode("utf-8") if isinstance(block, str) else bytes(block)
+    for block in body:
+        yield block.encode("utf-8") if isinstance(block, str) else bytes(block)
+
+
+class StandInApp:
+    """Implements the subset of the CRM API used by the suites.
+
+    ``latency`` seconds are added to every call and ``error_rate`` of calls
+    fail with 503, so resilience and load code can be exercised offline.
+    ``POST /<collection>/batch`` and ``POST /<collection>/batch_delete`` model
+    the batch endpoints harness.seeding prefers when a server offers them.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, prefix="/api", store=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.prefix = prefix
+        self.store = store or CRMStore()
+
+    def handle(self, method, path, query="", body=None, content_type=None, idempotency_key=None):
+        """Return ``(status, payload)`` where payload is bytes (possibly empty).
+
+        ``body`` is bytes or an iterable of byte blocks. Non-JSON bodies are
+        only accepted as attachment uploads and are consumed without being
+        buffered whole. A repeated ``idempotency_key`` gets the first answer
+        again instead of being applied twice.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            return self._json(503, {"error": "injected failure"})
+        if not idempotency_key:
+            return self._handle(method, path, query, body, content_type)
+        with self.store.lock:
+            answer = self.store.idempotent.get(idempotency_key)
+            if answer is None:
+                answer = self._handle(method, path, query, body, content_type)
+                if answer[0] < 500:
+                    self.store.idempotent[idempotency_key] = answer
+            return answer
+
+    def _handle(self, method, path, query, body, content_type):
+        if self.prefix and path.startswith(self.prefix):
+            path = path[len(self.prefix):]
+        if content_type and not content_type.startswith("application/json"):
+            match = UPLOAD_ROUTE.match(path)
+            if match is None or method != "POST":
+                return self._json(415, {"error": f"{content_type} is only accepted for attachment uploads"})
+            return self._upload(iter_body(body), content_type, parse_qs(query), **match.groupdict())
+        if body is not None and not isinstance(body, (bytes, str)):
+            body = b"".join(iter_body(body))
+        for pattern, route in ROUTES:
+            match = pattern.match(path)
+            if match:
+                try:
+                    data = json.loads(body) if body else None
+                except ValueError:
+                    return self._json(400, {"error": "body is not valid JSON"})
+                handler = getattr(self, f"_{route}_{method.lower()}", None)
+                if handler is None:
+                    return self._json(405, {"error": f"{method} not allowed on {path}"})
+                with self.store.lock:
+                    return handler(data, parse_qs(query, keep_blank_values=True), **match.groupdict())
+        return self._json(404, {"error": f"no route for {path}"})
+
+    @staticmethod
+    def _json(status, payload=None):
+        return status, b"" if payload is None else json.dumps(payload).encode("utf-8")
+
+    def _records(self, collection):
+        return self.store.collections.get(collection)
+
+    def _collection_get(self, data, query, collection):
+        records = self._records(collection)
+        if records is None:
+            return self._json(404, {"error": f"unknown collection {collection}"})
+        return self._page(list(records.values()), query)
+
+    def _page(self, records, query):
+        """Plain array by default; ``offset``/``limit`` slice it and ``cursor`` wraps it in an envelope."""
+        try:
+            limit = int(query.get("limit", [len(records) or 1])[0])
+            start = int(query["cursor"][0] or 0) if "cursor" in query else int(query.get("offset", ["0"])[0])
+        except ValueError:
+            return self._json(400, {"error": "limit, offset and cursor must be integers"})
+        if limit < 0 or start < 0:
+            return self._json(400, {"error": "limit, offset and cursor must not be negative"})
+        if "cursor" in query:
+            items = records[start:start + limit]
+            next_cursor = str(start + limit) if start + limit < len(records) else None
+            return self._json(200, {"items": items, "next_cursor": next_cursor})
+        return self._json(200, records[start:start + limit])
+
+    def _collection_post(self, data, query, collection):
+        records = self._records(collection)
+        if records is None:
+            return self._json(404, {"error": f"unknown collection {collection}"})
+        if not isinstance(data, dict):
+            return self._json(400, {"error": "expected a JSON object"})
+        if collection == "users" and data.get("username") in self.store.usernames:
+            return self._json(409, {"error": f"username {data['username']} already exists"})
+        record = dict(data, id=self.store.next_id())
+        records[record["id"]] = record
+        if collection == "users":
+            self.store.usernames[record.get("username")] = record["id"]
+        return self._json(201, record)
+
+    def _batch_post(self, data, query, collection):
+        records = self._records(collection)
+        if records is None:
+            return self._json(404, {"error": f"unknown collection {collection}"})
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            return self._json(400, {"error": "expected a JSON array of objects"})
+        if collection == "users":
+            usernames = [item.get("username") for item in data]
+            if len(set(usernames)) != len(usernames) or any(name in self.store.usernames for name in usernames):
+                return self._json(409, {"error": "duplicate username in batch"})
+        created = [json.loads(self._collection_post(item, query, collection)[1]) for item in data]
+        return self._json(201, created)
+
+    def _batch_delete_post(self, data, query, collection):
+        records = self._records(collection)
+        if records is None:
+            return self._json(404, {"error": f"unknown collection {collection}"})
+        if not isinstance(data, dict) or not isinstance(data.get("ids"), list):
+            return self._json(400, {"error": "expected {\"ids\": [...]}"})
+        try:
+            ids = [int(entity_id) for entity_id in data["ids"]]
+        except (TypeError, ValueError):
+            return self._json(400, {"error": "ids must be integers"})
+        for entity_id in ids:
+            if entity_id in records:
+                self._item_delete(None, query, collection, entity_id)
+        return self._json(204)
+
+    def _item_get(self, data, query, collection, id):
+        record = (self._records(collection) or {}).get(int(id))
+        if record is None:
+            return self._json(404, {"error": f"{collection} {id} not found"})
+        return self._json(200, record)
+
+    def _item_put(self, data, query, collection, id):
+        record = (self._records(collection) or {}).get(int(id))
+        if record is None:
+            return self._json(404, {"error": f"{collection} {id} not found"})
+        if not isinstance(data, dict):
+            return self._json(400, {"error": "expected a JSON object"})
+        if collection == "users" and "username" in data and data["username"] != record.get("username"):
+            if data["username"] in self.store.usernames:
+                return self._json(409, {"error": f"username {data['username']} already exists"})
+            self.store.usernames.pop(record.get("username"), None)
+            self.store.usernames[data["username"]] = record["id"]
+        record.update(data, id=record["id"])
+        return self._json(200, record)
+
+    _item_patch = _item_put
+
+    def _item_delete(self, data, query, collection, id):
+        record = (self._records(collection) or {}).pop(int(id), None)
+        if record is None:
+            return self._json(404, {"error": f"{collection} {id} not found"})
+        if collection == "users":
+            self.store.usernames.pop(record.get("username"), None)
+        if collection == "customers":
+            for child in CUSTOMER_CHILDREN:
+                self.store.children.pop((record["id"], child), None)
+        return self._json(204)
+
+    def _status_patch(self, data, query, id):
+        record = self.store.collections["customers"].get(int(id))
+        if record is None:
+            return self._json(404, {"error": f"customers {id} not found"})
+        if not isinstance(data, dict) or "status" not in data:
+            return self._json(400, {"error": "expected {\"status\": ...}"})
+        record["status"] = data["status"]
+        return self._json(200, record)
+
+    def _children(self, id, child):
+        if child not in CUSTOMER_CHILDREN or int(id) not in self.store.collections["customers"]:
+            return None
+        return self.store.children.setdefault((int(id), child), {})
+
+    def _children_get(self, data, query, id, child):
+        records = self._children(id, child)
+        if records is None:
+            return self._json(404, {"error": f"customers {id}/{child} not found"})
+        return self._page(list(records.values()), query)
+
+    def _children_post(self, data, query, id, child):
+        records = self._children(id, child)
+        if records is None:
+            return self._json(404, {"error": f"customers {id}/{child} not found"})
+        if not isinstance(data, dict):
+            return self._json(400, {"error": "expected a JSON object"})
+        record = dict(data, id=self.store.next_id(), customer_id=int(id))
+        if child == "attachments" and isinstance(record.get("content"), str):
+            # Like streamed uploads, keep only the decoded size rather than echoing the file back
+            content = record.pop("content")
+            record["size"] = len(content) * 3 // 4 - len(content) + len(content.rstrip("="))
+        records[record["id"]] = record
+        return self._json(201, record)
+
+    def _upload(self, blocks, content_type, query, id):
+        """Store an attachment's name, type and size; the content itself is discarded.
+
+        Multipart bodies are expected to carry a single file part, as
+        harness.attachments sends them; raw bodies take the name from ``?filename=``.
+        """
+        size = 0
+        if content_type.startswith("multipart/form-data"):
+            boundary = content_type.partition("boundary=")[2].strip('"').encode("ascii")
+            head = b""
+            for block in blocks:
+                head += block
+                if b"\r\n\r\n" in head:
+                    break
+            part_headers, _, rest = head.partition(b"\r\n\r\n")
+            headers = part_headers.decode("utf-8", "replace")
+            filename = re.search(r'filename="([^"]*)"', headers)
+            filetype = re.search(r"(?im)^content-type:\s*(\S+)", headers)
+            filename = filename.group(1) if filename else None
+            filetype = filetype.group(1) if filetype else "application/octet-stream"
+            size = len(rest) + sum(len(block) for block in blocks) - len(b"\r\n--" + boundary + b"--\r\n")
+        else:
+            filename = query.get("filename", [None])[0]
+            filetype = content_type
+            size = sum(len(block) for block in blocks)
+        if not filename or size < 0:
+            return self._json(400, {"error": "upload has no filename or is malformed"})
+        with self.store.lock:
+            records = self._children(id, "attachments")
+            if records is None:
+                return self._json(404, {"error": f"customers {id}/attachments not found"})
+            record = {"id": self.store.next_id(), "customer_id": int(id), "filename": filename,
+                      "filetype": filetype, "size": size}
+            records[record["id"]] = record
+        return self._json(201, record)
+
+    def _child_get(self, data, query, id, child, child_id):
+        record = (self._children(id, child) or {}).get(int(child_id))
+        if record is None:
+            return self._json(404, {"error": f"customers {id}/{child}/{child_id} not found"})
+        return self._json(200, record)
+
+    def _child_delete(self, data, query, id, child, child_id):
+        record = (self._children(id, child) or {}).pop(int(child_id), None)
+        if record is None:
+            return self._json(404, {"error": f"customers {id}/{child}/{child_id} not found"})
+        return self._json(204)
+
+
+class StandInAdapter(BaseAdapter):
+    """requests transport that answers from a StandInApp without opening sockets."""
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        url = urlsplit(request.url)
+        status, payload = self.app.handle(request.method, url.path, url.query, request.body,
+                                          request.headers.get("Content-Type"),
+                                          request.headers.get(IDEMPOTENCY_HEADER))
+        status, payload, headers = conditional(request.method, status, payload,
+                                               request.headers.get("If-None-Match"))
+        response = requests.Response()
+        response.status_code = status
+        response.reason = HTTPStatus(status).phrase
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json",
+                                                "Content-Length": str(len(payload)), **headers})
+        response._content = payload
+        # Lets iter_content() replay the body for streamed reads
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this small responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def _read_chunked(self):
+        while True:
+            size = int(self.rfile.readline().split(b";", 1)[0], 16)
+            if not size:
+                # Skip trailers up to the blank line that ends the body
+                while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            yield self.rfile.read(size)
+            self.rfile.readline()
+
+    def _read_length(self, length):
+        while length:
+            block = self.rfile.read(min(length, UPLOAD_BLOCK_SIZE))
+            if not block:
+                return
+            length -= len(block)
+            yield block
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        content_type = self.headers.get("Content-Type")
+        length = int(self.headers.get("Content-Length") or 0)
+        if "chunked" in self.headers.get("Transfer-Encoding", ""):
+            body = self._read_chunked()
+        elif length and content_type and not content_type.startswith("application/json"):
+            body = self._read_length(length)
+        else:
+            body = self.rfile.read(length) if length else None
+        status, payload = self.server.app.handle(self.command, url.path, url.query, body, content_type,
+                                                 self.headers.get(IDEMPOTENCY_HEADER))
+        # Drain whatever a rejected upload left unread so the connection stays usable
+        if not isinstance(body, (bytes, type(None))):
+            for _ in body:
+                pass
+        status, payload, headers = conditional(self.command, status, payload, self.headers.get("If-None-Match"))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(app=None, host="127.0.0.1", port=0):
+    """Start a threaded HTTP server for ``app`` in the background and return it."""
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.app = app or get_app()
+    threading.Thread(target=server.serve_forever, name="crm-stand-in", daemon=True).start()
+    return server
+
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_app():
+    """Return the process-wide StandInApp configured from CRM_STANDIN_* settings."""
+    global _app
+    with _app_lock:
+        if _app is None:
+            _app = StandInApp(latency=config.STANDIN_LATENCY, error_rate=config.STANDIN_ERROR_RATE)
+        return _app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the in-memory CRM stand-in over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=config.STANDIN_LATENCY, help="seconds added to every call")
+    parser.add_argument("--error-rate", type=float, default=config.STANDIN_ERROR_RATE,
+                        help="fraction of calls that fail with 503")
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer((args.host, args.port), StandInHandler)
+    server.daemon_threads = True
+    server.app = StandInApp(latency=args.latency, error_rate=args.error_rate)
+    print(f"CRM stand-in listening on http://{args.host}:{server.server_port}/api", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    main()
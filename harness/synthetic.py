@@ -0,0 +1,283 @@
+import argparse
+import itertools
+import json
+import logging
+import math
+import random
+import sys
+import time
+from array import array
+
+from harness import config
+from harness.logConfig import configure_logging
+
+# Creation order; every kind only references kinds before it
+KINDS = ("customers", "users", "products", "inventory", "orders", "opportunities")
+
+FIRST_NAMES = ("Wei", "Fang", "Li", "Na", "Min", "Jing", "Lei", "Yan", "Jun", "Hui", "Alice", "Bob", "Carol",
+               "David", "Emma", "Frank", "Grace", "Henry", "Irene", "Jack")
+LAST_NAMES = ("Wang", "Li", "Zhang", "Liu", "Chen", "Yang", "Zhao", "Huang", "Zhou", "Wu", "Smith", "Jones",
+              "Brown", "Taylor", "Wilson")
+COMPANY_SUFFIXES = ("Trading", "Technology", "Logistics", "Retail", "Manufacturing", "Consulting", "Holdings")
+CATEGORIES = ("Electronics", "Gadgets", "Office", "Home", "Outdoor", "Toys", "Misc")
+PRODUCT_WORDS = ("Smart", "Portable", "Wireless", "Compact", "Pro", "Ultra", "Classic", "Eco")
+PRODUCT_NOUNS = ("Speaker", "Lamp", "Router", "Camera", "Keyboard", "Monitor", "Charger", "Backpack", "Kettle")
+LOCATIONS = ("Warehouse A", "Warehouse B", "Warehouse C", "Warehouse D", "Warehouse E")
+ROLES = (("user", 0.85), ("manager", 0.12), ("admin", 0.03))
+ORDER_STATUSES = (("Delivered", 0.6), ("Confirmed", 0.2), ("Pending", 0.15), ("Cancelled", 0.05))
+OPPORTUNITY_STATUSES = (("Open", 0.5), ("Won", 0.2), ("Lost", 0.3))
+
+
+def skewed_rank(rng, n, s):
+    """A rank in ``[0, n)`` from a Zipf-like power law with exponent ``s``, in O(1) memory.
+
+    Inverse-transform sampling of the continuous power law on ``[1, n + 1)``,
+    so rank 0 is drawn most often and the tail is long. ``s = 0`` is uniform.
+    """
+    u = rng.random()
+    if s == 0:
+        return int(u * n)
+    if s == 1:
+        x = (n + 1) ** u
+    else:
+        x = ((1 - u) + u * (n + 1) ** (1 - s)) ** (1 / (1 - s))
+    return min(n - 1, int(x) - 1)
+
+
+def _choice(rng, weighted):
+    u = rng.random()
+    for value, weight in weighted:
+        u -= weight
+        if u < 0:
+            return value
+    return weighted[-1][0]
+
+
+def _stride(n):
+    """A multiplier coprime to ``n``: ``rank * stride % n`` scatters the hot ranks over the whole range."""
+    stride = 2654435761 % n or 1
+    while math.gcd(stride, n) != 1:
+        stride += 1
+    return stride
+
+
+class Dataset:
+    """Seeded description of a CRM dataset whose records are generated on demand.
+
+    Record ``i`` of a kind depends only on the seed, the kind and ``i``, so the
+    same seed always gives the same data, any record can be regenerated
+    without the others, and nothing is held in memory. Cardinalities default
+    to ratios of ``customers``: one sales user per 50 customers, a product
+    per 10, one to three inventory rows per product, five orders and half an
+    opportunity per customer. Orders and opportunities pick customers and
+    products from a power law with exponent ``skew``, giving a few whale
+    customers and hot products and a long tail. Users are not referenced by
+    the other kinds.
+
+    References are indices into the referenced kind. The ``ids`` mapping the
+    generators take turns them into server IDs (``ids["customers"][i]``);
+    without it they become ``i + 1``.
+    """
+
+    def __init__(self, seed=0, customers=1000, users=None, products=None, orders=None, opportunities=None,
+                 skew=1.1, tag=""):
+        self.seed = seed
+        self.skew = skew
+        # Appended to usernames and emails so a second load into the same server does not collide
+        self.tag = tag
+        self.counts = {
+            "customers": customers,
+            "users": users if users is not None else max(1, customers // 50),
+            "products": products if products is not None else max(1, customers // 10),
+            "orders": orders if orders is not None else customers * 5,
+            "opportunities": opportunities if opportunities is not None else customers // 2,
+        }
+        # Rows per product are drawn per product; the total is the sum of 1-3 rows for each
+        self.counts["inventory"] = sum(self._locations(i) for i in range(self.counts["products"]))
+        self._strides = {kind: _stride(self.counts[kind]) for kind in ("customers", "products") if self.counts[kind]}
+
+    def _rng(self, kind, index):
+        return random.Random(f"{self.seed}/{kind}/{index}")
+
+    def _hot(self, rng, kind):
+        """Index of a referenced record, drawn with skew and scattered so hot records are not all the oldest."""
+        n = self.counts[kind]
+        return skewed_rank(rng, n, self.skew) * self._strides[kind] % n
+
+    def _locations(self, product):
+        return 1 + random.Random(f"{self.seed}/locations/{product}").randrange(3)
+
+    def _suffix(self, index):
+        return f"{index}{'-' + self.tag if self.tag else ''}"
+
+    def customer(self, i):
+        rng = self._rng("customers", i)
+        last = rng.choice(LAST_NAMES)
+        return {"name": f"{last} {rng.choice(COMPANY_SUFFIXES)} {i}",
+                "email": f"contact{self._suffix(i)}@{last.lower()}.example.com",
+                "phone": f"1{rng.randrange(3000000000, 9999999999)}"}
+
+    def user(self, i):
+        rng = self._rng("users", i)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        username = f"{first.lower()}.{last.lower()}{self._suffix(i)}"
+        return {"username": username, "email": f"{username}@example.com",
+                "password": f"pw-{rng.getrandbits(48):012x}", "role": _choice(rng, ROLES)}
+
+    def product(self, i):
+        rng = self._rng("products", i)
+        # Log-normal prices: many cheap products, a few expensive ones
+        price = round(min(20000.0, rng.lognormvariate(4, 1)), 2)
+        return {"name": f"{rng.choice(PRODUCT_WORDS)} {rng.choice(PRODUCT_NOUNS)} {i}",
+                "description": f"Synthetic product {i}", "price": max(0.99, price),
+                "stock": rng.randrange(0, 1000), "category": rng.choice(CATEGORIES)}
+
+    def price(self, product):
+        return self.product(product)["price"]
+
+    def inventory_rows(self, product):
+        rng = self._rng("inventory", product)
+        for location in rng.sample(LOCATIONS, self._locations(product)):
+            yield {"product_index": product, "quantity": rng.randrange(0, 500), "location": location}
+
+    def order(self, i):
+        rng = self._rng("orders", i)
+        customer, product = self._hot(rng, "customers"), self._hot(rng, "products")
+        quantity = 1 + min(99, int(rng.expovariate(0.5)))
+        return {"customer_index": customer, "product_index": product, "quantity": quantity,
+                "total_price": round(self.price(product) * quantity, 2), "status": _choice(rng, ORDER_STATUSES)}
+
+    def opportunity(self, i):
+        rng = self._rng("opportunities", i)
+        customer = self._hot(rng, "customers")
+        return {"customer_index": customer, "title": f"Opportunity {i}", "description": "Synthetic opportunity",
+                "value": round(rng.paretovariate(1.5) * 5000, 2), "status": _choice(rng, OPPORTUNITY_STATUSES)}
+
+    def records(self, kind, ids=None):
+        """Lazily yield the payloads of ``kind`` with references resolved through ``ids``."""
+        def resolve(referenced, index):
+            return ids[referenced][index] if ids else index + 1
+
+        if kind == "inventory":
+            for product in range(self.counts["products"]):
+                for row in self.inventory_rows(product):
+                    yield {"product_id": resolve("products", row.pop("product_index")), **row}
+            return
+        make = {"customers": self.customer, "users": self.user, "products": self.product,
+                "orders": self.order, "opportunities": self.opportunity}[kind]
+        for i in range(self.counts[kind]):
+            record = make(i)
+            if "customer_index" in record:
+                record["customer_id"] = resolve("customers", record.pop("customer_index"))
+            if "product_index" in record:
+                record["product_id"] = resolve("products", record.pop("product_index"))
+            yield record
+
+
+def push(dataset, kinds=KINDS, session=None, batch_size=None, concurrency=None):
+    """Create ``dataset`` on the server kind by kind; returns ``{kind: array of IDs}``.
+
+    Records stream through harness.seeding.seed_stream, so only the created
+    IDs are kept: 8 bytes per record, which is what resolves the references
+    of later kinds. Raises SeedError if any record of a kind fails, because
+    the kinds after it would reference a record that does not exist.
+    """
+    # Imported here: seeding pulls in the session, which a dump to file does not need
+    from harness.seeding import BATCH_SIZE, SeedError, seed_stream
+
+    ids = {}
+    for kind in kinds:
+        start = time.perf_counter()
+        created = array("q")
+        failed = 0
+        for entity_id in seed_stream(kind, dataset.records(kind, ids), session, batch_size or BATCH_SIZE,
+                                     concurrency):
+            failed += entity_id is None
+            created.append(-1 if entity_id is None else entity_id)
+        ids[kind] = created
+        elapsed = time.perf_counter() - start
+        logging.info("Created %s %s in %.1fs (%.0f/s)", len(created), kind, elapsed, len(created) / elapsed)
+        if failed:
+            raise SeedError(f"{failed} of {len(created)} {kind} records could not be created",
+                            [None if entity_id == -1 else entity_id for entity_id in created])
+    return ids
+
+
+def dump(dataset, path, kinds=KINDS):
+    """Write ``dataset`` as JSON lines of ``{"kind": ..., "record": ...}`` with 1-based references."""
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for kind in kinds:
+            for record in dataset.records(kind):
+                f.write(json.dumps({"kind": kind, "record": record}) + "\n")
+                written += 1
+    return written
+
+
+def probe(dataset, ids, lookups=200, session=None):
+    """Look up ``lookups`` skewed records and read five list pages of every loaded kind, timed by the latency recorder."""
+    from harness.httpClient import get_session
+    from harness.listing import PAGE_SIZE, iter_records
+
+    session = session or get_session()
+    rng = random.Random(f"{dataset.seed}/probe")
+    for kind, created in ids.items():
+        if not created:
+            continue
+        for _ in range(lookups):
+            session.get(f"/{kind}/{created[skewed_rank(rng, len(created), dataset.skew)]}")
+        for _ in itertools.islice(iter_records(f"/{kind}", session=session), PAGE_SIZE * 5):
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m harness.synthetic",
+        description="Generate a reproducible synthetic CRM dataset and load it into CRM_BASE_URL or a file.")
+    parser.add_argument("--seed", type=int, default=0, help="same seed, same data (default: %(default)s)")
+    parser.add_argument("--customers", type=int, default=1000, help="scales every other kind (default: %(default)s)")
+    for kind in ("users", "products", "orders", "opportunities"):
+        parser.add_argument(f"--{kind}", type=int, help=f"number of {kind} instead of the ratio to customers")
+    parser.add_argument("--skew", type=float, default=1.1,
+                        help="power-law exponent for picking customers and products; 0 is uniform (default: %(default)s)")
+    parser.add_argument("--tag", default="", help="suffix for usernames and emails, to load the same seed twice")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS),
+                        help="only these kinds (referenced kinds are needed when loading)")
+    parser.add_argument("--out", help="write JSON lines to this file instead of loading them")
+    parser.add_argument("--batch-size", type=int, help="records per batch create")
+    parser.add_argument("--concurrency", type=int, help="batches in flight (default: CRM_POOL_SIZE)")
+    parser.add_argument("--probe", type=int, default=0, metavar="N",
+                        help="after loading, time N skewed lookups and a few list pages per kind")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    dataset = Dataset(args.seed, args.customers, args.users, args.products, args.orders, args.opportunities,
+                      args.skew, args.tag)
+    kinds = [kind for kind in KINDS if kind in args.kinds]
+    print(", ".join(f"{dataset.counts[kind]} {kind}" for kind in kinds))
+    start = time.perf_counter()
+    if args.out:
+        written = dump(dataset, args.out, kinds)
+        print(f"wrote {written} records to {args.out} in {time.perf_counter() - start:.1f}s")
+        return 0
+
+    from harness.latency import recorder
+    from harness.seeding import SeedError
+    try:
+        ids = push(dataset, kinds, batch_size=args.batch_size, concurrency=args.concurrency)
+    except (SeedError, KeyError) as e:
+        # KeyError: a kind was loaded without the kinds it references
+        print(f"loading failed: {e}", file=sys.stderr)
+        return 1
+    print(f"loaded {sum(len(created) for created in ids.values())} records into {config.BASE_URL} "
+          f"in {time.perf_counter() - start:.1f}s")
+    if args.probe:
+        # Only the probe's calls, not the creates
+        recorder.snapshot(reset=True)
+        probe(dataset, ids, args.probe)
+        print(recorder.format_table())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,6 @@
-import Test.crmAutoTest
+import sys
+
+from harness.runner import main
 
 if __name__ == '__main__':
-    test_assign_task_to_customer()
\ No newline at end of file
+    sys.exit(main())